@@ -1,11 +1,78 @@
 from config import Config
 from database import Database
+from stages import run_stages
+from log_config import Preview
+from metrics import job_metrics
+from lineage import LineageSpec, contains, dotted_name, filled, insert_frame, one_line, run_lineage, unused_rows
 import logging
 import os
 import csv
+from itertools import chain
 
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
+# Key columns of the agg frames by domain. The columns of a domain share one categorical
+# dictionary (see `share_key_categories`), so merges between frames compare integer codes
+KEY_DOMAINS = {
+    'project': ('NameProject',),
+    'job': ('NameJob',),
+    'component': ('composant', 'aud_componentValue', 'aud_componentName'),
+    'row': ('rowName',),
+    'column': ('nameColumnInput', 'NameRowInput', 'NameColumnInput', 'aud_nameColumnInput'),
+}
+
+# Key columns loaded as pandas categoricals by the agg queries
+CATEGORICAL_COLUMNS = tuple(chain.from_iterable(KEY_DOMAINS.values()))
+
+# Keys of the tMap input columns used by an expression, as read by `_tmap_column_unused`
+USED_COLUMN_KEYS = ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob']
+
+# Stages of AUD_405_AGG_TMAP returning used column keys, and the column of their rows holding the
+# input column name (see `_used_columns`)
+TMAP_USED_COLUMN_STAGES = {
+    'input_output': 'NameRowInput',
+    'input_filter_output': 'NameRowInput',
+    'input_join_input': 'NameColumnInput',
+    'input_filter_input': 'NameColumnInput',
+    'input_var': 'NameColumnInput',
+}
+
+# Keys of the tXMLMap input columns used by an expression, as read by AUD_405_AGG_TXMLMAP
+TXMLMAP_USED_COLUMN_KEYS = ['aud_nameColumnInput', 'rowName', 'aud_componentName', 'NameProject', 'NameJob']
+
+# Tables of `TXMLMAP_LINEAGE` whose rows are used input columns, and the columns of their rows holding
+# the input column name, row name and component (see `_txmlmap_used_columns`)
+TXMLMAP_USED_COLUMN_TABLES = {
+    'aud_agg_txmlmapinputinoutput': ('nameColumnInput', 'nameRowInput', 'componentName'),
+    'aud_agg_txmlmapinputinfilteroutput': ('nameRowInput', 'rowName', 'componentName'),
+    'aud_agg_txmlmapinputinjoininput': ('NameColumnInput', 'rowName', 'aud_componentName'),
+    'aud_agg_txmlmapinputinfilterinput': ('NameColumnInput', 'rowName', 'composant'),
+    'aud_agg_txmlmapinputinvar': ('NameColumnInput', 'rowName', 'composant'),
+}
+
+# Prefix of the components whose GROUPBYS/OPERATIONS tables feed aud_agg_aggregate, the parameter
+# of the `aud_componentName LIKE ?` filter of the aud_agg query (AGGREGATE_COMPONENT_PREFIX of Local_to_brut)
+AGGREGATE_COMPONENT_PREFIX = 'tAggregate'
+
+# Columns of the aud_agg query: the tAggregate GROUPBYS and OPERATIONS element values
+AGGREGATE_ELEMENT_COLUMNS = [
+    'NameProject', 'NameJob', 'aud_componentValue', 'aud_typeField', 'aud_id', 'aud_elementRef', 'aud_valueElementRef'
+]
+
+# Tables filled by AUD_405_AGG_TXMLMAP (the AUD_405_AGG_TMAP stages each name the table they fill)
+TXMLMAP_AGG_TABLES = (
+    'aud_agg_txmlmapinputinoutput', 'aud_agg_txmlmapinputinfilteroutput', 'aud_agg_txmlmapinputinjoininput',
+    'aud_agg_txmlmapinputinfilterinput', 'aud_agg_txmlmapinputinvar', 'aud_agg_txmlmapcolumunused',
+    'aud_agg_txmlmapinput',
+)
+
+# Job key columns of the aud_agg_* tables (and of their agg_queries) not named NameProject/NameJob
+AGG_JOB_COLUMNS = {
+    'aud_agg_txmlmapinputinoutput': ('output_nameproject', 'output_namejob'),
+}
+
 
 
 
@@ -24,7 +91,7 @@ def delete_files_in_directory(directory_path: str, file_extension: str = None):
     try:
         # Check if the directory exists
         if not os.path.exists(directory_path):
-            logging.error(f"The directory {directory_path} does not exist.")
+            logger.error("The directory %s does not exist.", directory_path)
             return
 
         # Iterate through all files in the directory
@@ -34,13 +101,163 @@ def delete_files_in_directory(directory_path: str, file_extension: str = None):
             # If it's a file and matches the file extension (if specified)
             if os.path.isfile(file_path) and (file_extension is None or filename.endswith(file_extension)):
                 os.remove(file_path)
-                logging.info(f"Deleted file: {file_path}")
+                logger.info("Deleted file: %s", file_path)
         
-        logging.info("File deletion process completed.")
+        logger.info("File deletion process completed.")
 
     except Exception as e:
-        logging.error(f"An error occurred while deleting files: {str(e)}", exc_info=True)
+        logger.error("An error occurred while deleting files: %s", e, exc_info=True)
+
+class ChangedJobs(list):
+    """
+    The (NameProject, NameJob) pairs returned by `changed_jobs`, along with the `Incremental.changed_jobs`
+    query and the date they were selected with, so `agg_query` can join the agg_queries against
+    that query instead of listing the jobs.
+    """
+
+    def __init__(self, jobs, query, since):
+        super().__init__(jobs)
+        self.query = query
+        self.since = since
+
+
+def changed_jobs(config: Config, db: Database, execution_date: str):
+    """
+    Return the jobs an agg job has to recompute.
+
+    With `Incremental.enabled`, these are the (NameProject, NameJob) pairs returned by the
+    `Incremental.changed_jobs` query for `execution_date`: the jobs whose `.item` file changed since
+    that date, as recorded in aud_jobchange by AUD_300_ALIMJOBCHANGE of Local_to_brut. Otherwise
+    every job is recomputed.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance for executing the query.
+        execution_date (str): Date of the last aggregation.
+
+    Returns:
+        ChangedJobs or None: The changed (NameProject, NameJob) pairs, or None to recompute every job.
+    """
+    if not config.get_param('Incremental', 'enabled'):
+        return None
+
+    changed_jobs_query = config.get_param('Incremental', 'changed_jobs')
+    logger.info("Executing query: %s", changed_jobs_query)
+    jobs = sorted({tuple(row) for row in chain.from_iterable(db.stream_query(changed_jobs_query, (execution_date,)))})
+    logger.info("%s jobs changed since %s.", len(jobs), execution_date)
+    return ChangedJobs(jobs, changed_jobs_query, execution_date)
+
+
+def agg_query(config: Config, query_name: str, jobs=None, params=()):
+    """
+    Return an `agg_queries` query, restricted to the rows of the given jobs.
+
+    The query is joined against the `Incremental.changed_jobs` query the jobs were selected with,
+    so its parameters do not grow with the number of changed jobs.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        query_name (str): Name of the query in the `agg_queries` section.
+        jobs (ChangedJobs, optional): The jobs returned by `changed_jobs`. Defaults to None (every job).
+        params (tuple, optional): Parameters of the `agg_queries` query itself. Defaults to ().
+
+    Returns:
+        tuple: The query and its parameters (None when there is none).
+    """
+    query = config.get_param('agg_queries', query_name)
+    if jobs is None:
+        return query, tuple(params) or None
+
+    project_column, job_column = AGG_JOB_COLUMNS.get(query_name, ('NameProject', 'NameJob'))
+    scoped_query = (
+        f"SELECT scoped.* FROM ({query}) scoped "
+        f"JOIN ({jobs.query}) changed "
+        f"ON changed.NameProject = scoped.{project_column} AND changed.NameJob = scoped.{job_column}"
+    )
+    return scoped_query, (*params, jobs.since)
+
+
+def delete_agg_rows(db: Database, table_names, jobs):
+    """
+    Delete the rows of the given jobs from aud_agg_* tables before they are recomputed.
+
+    Called inside the `transaction()` that inserts the recomputed rows, so the old rows are only
+    gone once the new ones are committed.
+
+    Args:
+        db (Database): Database instance for executing the deletes.
+        table_names (iterable of str): The aud_agg_* tables.
+        jobs (list of tuples): (NameProject, NameJob) pairs, see `changed_jobs`.
+    """
+    for table_name in table_names:
+        project_column, job_column = AGG_JOB_COLUMNS.get(table_name, ('NameProject', 'NameJob'))
+        db.delete_records_batch(table_name, [
+            {project_column: project_name, job_column: job_name} for project_name, job_name in jobs
+        ])
+        logger.info("Deleted the rows of %s jobs from %s.", len(jobs), table_name)
+
+
+def _pivot_aggregate_elements(elements_df):
+    """
+    Pair the INPUT_COLUMN, OUTPUT_COLUMN and FUNCTION element values of the tAggregate tables.
+
+    The values of one row of a GROUPBYS or OPERATIONS table share their `aud_id` (a counter of the
+    job's table rows), so the rows are pivoted on the component, table and `aud_id`. Rows missing a
+    value are dropped; group by columns get 'GROUPBY' as function.
+
+    Args:
+        elements_df (pd.DataFrame): The `AGGREGATE_ELEMENT_COLUMNS` rows of the aud_agg query.
+
+    Returns:
+        pd.DataFrame: The aud_agg_aggregate rows (NameProject, NameJob, aud_componentValue,
+            aud_valueElementRef_input, aud_valueElementRef_output, aud_valueElementRef_function).
+    """
+    key_columns = ['NameProject', 'NameJob', 'aud_componentValue', 'aud_typeField', 'aud_id']
+    pivot_df = (
+        elements_df.drop_duplicates(subset=key_columns + ['aud_elementRef'])
+        .set_index(key_columns + ['aud_elementRef'])['aud_valueElementRef']
+        .unstack('aud_elementRef')
+        .reindex(columns=['INPUT_COLUMN', 'OUTPUT_COLUMN', 'FUNCTION'])
+        .reset_index()
+    )
+    pivot_df.loc[pivot_df['aud_typeField'] == 'GROUPBYS', 'FUNCTION'] = 'GROUPBY'
+    pivot_df = pivot_df.dropna(subset=['INPUT_COLUMN', 'OUTPUT_COLUMN', 'FUNCTION'])
+    return pivot_df.rename(columns={
+        'INPUT_COLUMN': 'aud_valueElementRef_input',
+        'OUTPUT_COLUMN': 'aud_valueElementRef_output',
+        'FUNCTION': 'aud_valueElementRef_function',
+    })[[
+        'NameProject', 'NameJob', 'aud_componentValue', 'aud_valueElementRef_input',
+        'aud_valueElementRef_output', 'aud_valueElementRef_function'
+    ]]
+
+
+def share_key_categories(*frames):
+    """
+    Convert the key columns of frames about to be merged to categoricals with a common dictionary.
+
+    The columns of a `KEY_DOMAINS` domain (e.g. composant and aud_componentValue) get the same
+    categories in every frame, so merges and reject joins on them run on the integer codes instead
+    of hashing the strings again. The frames are modified in place.
+
+    Args:
+        *frames (pd.DataFrame): The frames.
+    """
+    for domain_columns in KEY_DOMAINS.values():
+        columns = [(df, column) for df in frames for column in domain_columns if column in df.columns]
+        if not columns:
+            continue
+
+        categories = pd.Index(list(chain.from_iterable(
+            df[column].cat.categories if isinstance(df[column].dtype, pd.CategoricalDtype) else df[column].dropna().unique()
+            for df, column in columns
+        ))).unique()
+        dtype = pd.CategoricalDtype(categories)
+        for df, column in columns:
+            df[column] = df[column].astype(dtype)
+
 
+@job_metrics
 def AUD_404_AGG_TAGGREGATE(
     config: Config,
     db: Database,
@@ -50,706 +267,375 @@ def AUD_404_AGG_TAGGREGATE(
     """
     Perform aggregation operations for AUD 404 data.
 
-    This function executes a query to retrieve aggregated AUD 404 data
-    from the database and inserts it into the aud_agg_aggregate table
-    in batches.
+    This function fetches the tAggregate element values in a single pass,
+    pairs their input column, output column and function (see
+    `_pivot_aggregate_elements`) and inserts them into the aud_agg_aggregate
+    table in batches. It does nothing when `Lineage.aggregate_from_xml` is set:
+    AUD_311_ALIMAGGREGATE of Local_to_brut then owns aud_agg_aggregate.
 
     Args:
         config (Config): Configuration instance for retrieving parameters.
         db (Database): Database instance for executing agg_queries.
-        execution_date (str): The execution date to use in data insertion.
+        execution_date (str): The execution date to use in data insertion. In incremental mode,
+            only the jobs changed since this date are recomputed (see `changed_jobs`).
         batch_size (int, optional): Number of rows to insert in each batch. Defaults to 100.
     """
     try:
-        # Execute AUD aggregation query
-        aud_agg_query = config.get_param('agg_queries', 'aud_agg')
-        logging.info(f"Executing query: {aud_agg_query}")
-        aud_agg_results = db.execute_query(aud_agg_query)
-        logging.debug(f"AUD aggregation results: {aud_agg_results}")
+        if config.get_param('Lineage', 'aggregate_from_xml'):
+            logger.info("aud_agg_aggregate is loaded by AUD_311_ALIMAGGREGATE, nothing to do.")
+            return
 
-        # Prepare batch insert
-        batch_insert = []
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_aggregate')
+        jobs = changed_jobs(config, db, execution_date)
+        if jobs is not None and not jobs:
+            logger.info("No changed job, aud_agg_aggregate is up to date.")
+            return
 
-        for result in aud_agg_results:
-            # Unpack result tuple
-            (NameProject, NameJob, aud_componentValue, aud_valueElementRef_input,
-             aud_valueElementRef_output, aud_valueElementRef_function) = result
+        # The rows of the changed jobs are replaced in one transaction
+        with db.transaction():
+            if jobs is not None:
+                delete_agg_rows(db, ['aud_agg_aggregate'], jobs)
 
-            # Add result to batch insert list
-            batch_insert.append(result)
+            # Fetch the tAggregate element values once and pair them in memory
+            aud_agg_query, params = agg_query(config, 'aud_agg', jobs, params=(f"{AGGREGATE_COMPONENT_PREFIX}%",))
+            logger.info("Executing query: %s", aud_agg_query)
+            elements_df = db.fetch_dataframe(aud_agg_query, columns=AGGREGATE_ELEMENT_COLUMNS, params=params)
+            logger.info("Retrieved %s tAggregate element values.", len(elements_df))
 
-            # Insert batch if batch size is reached
-            if len(batch_insert) >= batch_size:
-                db.insert_data_batch(insert_query, 'aud_agg_aggregate', batch_insert)
-                batch_insert.clear()
+            aggregate_df = _pivot_aggregate_elements(elements_df)
+            logger.info("Paired %s tAggregate group by columns and operations.", len(aggregate_df))
 
-        # Insert remaining data in the batch
-        if batch_insert:
-            db.insert_data_batch(insert_query, 'aud_agg_aggregate', batch_insert)
+            insert_frame(config, db, batch_size, 'aud_agg_aggregate', aggregate_df)
 
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
-            logging.info("Processing complete.")
+            logger.info("Processing complete.")
 
 
 
     
-def AUD_405_AGG_TMAP(config: Config, db: Database, execution_date: str, batch_size=100):
+def _used_columns(mapped_df, column_name='NameRowInput'):
     """
-    This function:
-    - Deletes existing files in a specified directory.
-    - Executes two agg_queries (inputtable  and outputtable ), writes results to CSVs.
-    - Performs two different joins:
-        - One for inserting into `aud_agg_tmapinputinoutput`.
-        - Another for inserting into `aud_agg_tmapinputinfilteroutput`.
+    Return the distinct used column keys (`USED_COLUMN_KEYS`) of the rows mapped by a tMap stage.
 
     Args:
-        config (Config): Configuration instance for retrieving parameters.
-        db (Database): Database instance for executing agg_queries.
-        execution_date (str): Execution date used in data insertion.
-        batch_size (int, optional): Number of rows to insert in each batch. Defaults to 100.
+        mapped_df (pd.DataFrame): The rows inserted by the stage.
+        column_name (str, optional): Column holding the input column name. Defaults to 'NameRowInput'.
+
+    Returns:
+        pd.DataFrame: The used column keys, without duplicates.
     """
-    
-    try:
-        # ==============================================================================================
-        #     write into  aud_inputtable.csv & outputtable.csv  
-        # ==============================================================================================
-        # Step 1: Clean the directory by deleting existing files
-        directory_path = config.get_param('Directories', 'delete_files')
-        delete_files_in_directory(directory_path)
+    used_df = mapped_df.rename(columns={column_name: 'NameRowInput'})[USED_COLUMN_KEYS]
+    return used_df.drop_duplicates(ignore_index=True)
 
-        # Step 2: Execute inputtable  query and write to CSV
-        aud_inputtable_query = config.get_param('agg_queries', 'aud_inputtable')
-        logging.info(f"Executing query: {aud_inputtable_query}")
-        aud_inputtable_results = db.execute_query(aud_inputtable_query)
-
-        input_csv_path = os.path.join(directory_path, "aud_inputtable.csv")
-        input_csv_header = [
-            "rowName", "nameColumnInput", "expressionJoin", "expressionFilterInput", 
-            "composant", "innerJoin", "NameProject", "NameJob"
-        ]
-
-        with open(input_csv_path, mode='w', newline='', encoding='utf-8') as input_csvfile:
-            writer = csv.writer(input_csvfile)
-            writer.writerow(input_csv_header)
-            writer.writerows(aud_inputtable_results)
-
-        logging.info(f"Input table results written to {input_csv_path}")
-
-        # Step 3: Execute outputtable  query and write to CSV
-        aud_outputtable_query = config.get_param('agg_queries', 'aud_outputtable')
-        logging.info(f"Executing query: {aud_outputtable_query}")
-        outputtable_results = db.execute_query(aud_outputtable_query)
-
-        output_csv_path = os.path.join(directory_path, "aud_outputtable.csv")
-        output_csv_header = ["aud_componentName","aud_OutputName", "aud_sizeState","aud_activateCondensedTool", "aud_reject", 
-                             "aud_rejectInnerJoin", "aud_expressionOutput", "aud_nameColumnOutput", "aud_type", "aud_nullable",
-                             "aud_activateExpressionFilter", "aud_expressionFilterOutput", "aud_componentValue", "NameProject", "NameJob" ]
-
-        with open(output_csv_path, mode='w', newline='', encoding='utf-8') as output_csvfile:
-            writer = csv.writer(output_csvfile)
-            writer.writerow(output_csv_header)
-            writer.writerows(outputtable_results)
-
-        logging.info(f"Output table results written to {output_csv_path}")
-        # ==============================================================================================
-        #  Join aud_aud_inputtable.csv & unique outputtable.csv for `aud_agg_tmapinputinoutput`
-        # ==============================================================================================
-        logging.info("Reading input and output CSV files...")
-
-        # Read CSV files
-        input_df = pd.read_csv(input_csv_path, encoding='utf-8')
-        output_df = pd.read_csv(output_csv_path, encoding='utf-8')
-        logging.info(len(output_df))
-
-        logging.info(f"Input DataFrame columns: {input_df.columns}")
-        logging.info(f"Output DataFrame columns: {output_df.columns}")
-
-        logging.info("Successfully read CSV files. Performing inner join...")
-
-        # Perform inner join
-        joined_df = pd.merge(
-            input_df,
-            output_df,
-            left_on=['composant', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame columns: {joined_df.columns}")
-        logging.info(f"Inner join resulted in {len(joined_df)} rows.")
-
-        # Apply the condition and filter the rows before mapping
-        filtered_df = joined_df[
-            joined_df['aud_expressionOutput'].notna() &  # Ensure aud_expressionOutput is not NaN
-            joined_df.apply(
-                lambda row: isinstance(row['aud_expressionOutput'], str) and  # Check if it's a string
-                            f"{row['rowName']}.{row['nameColumnInput']}" in row['aud_expressionOutput'], axis=1  # Check if expression contains the specific rowName.NameColumnInput
-            )
-        ]
-
-        #Log the filtered rows
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if len(filtered_df) > 0:
-            logging.info(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column to its source for insertion into 'aud_agg_tmapinputinoutput' table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName'],  # From input_df
-            'NameRowInput': filtered_df['nameColumnInput'],  # From input_df
-            'composant': filtered_df['composant'],  # From input_df
-            'expressionOutput': filtered_df['aud_expressionOutput'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),  # From output_df
-            'nameColumnOutput': filtered_df['aud_nameColumnOutput'],  # From output_df
-            'OutputName': filtered_df['aud_OutputName'],  # From output_df
-            'reject': filtered_df['aud_reject'],  # From output_df
-            'rejectInnerJoin': filtered_df['aud_rejectInnerJoin'].map(
-                lambda x: 1 if x == 'True' else 0 if x == 'False' else None
-            ),  # Mapping to bit(1)
-            'NameProject': filtered_df['NameProject'],  # Common column
-            'NameJob': filtered_df['NameJob']  # Common column
-        })
-
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Drop rows with NaN in critical columns
-        critical_columns = [
-            'rowName', 'NameRowInput', 'composant', 'expressionOutput',
-            'nameColumnOutput', 'OutputName', 'reject',
-            'rejectInnerJoin', 'NameProject', 'NameJob'
-        ]
-        # Fill NaN values in critical columns with None (NULL in MySQL)
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after removing NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Insert rows into the database in batches
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapinputinoutput')
-        data_batch = []
-
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_tmapinputinoutput', data_batch)
-                    logging.info(f"Inserted batch of {batch_size} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-   
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_tmapinputinoutput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
-
-        logging.info("Data successfully inserted into `aud_agg_tmapinputinoutput` table.")
-
-
-        # ==============================================================================================
-        #  Join aud_aud_inputtable.csv & unique outputtable.csv for `aud_agg_tmapinputinfilteroutput`
-        # ==============================================================================================
-        # Ensure unique rows in output_df based on the combination of columns
-        # Drop duplicate rows based on the specified columns, keeping only the first occurrence
-        unique_output_df = output_df.drop_duplicates(subset=['aud_OutputName', 'aud_componentValue', 'NameProject', 'NameJob'], keep='first')
-
-        # Print or inspect the unique DataFrame
-        logging.info("Unique rows in output DataFrame:")
-        logging.info(len(unique_output_df))
-        logging.info(unique_output_df.head(200))
-        # Perform inner join
-        joined_df = pd.merge(
-            input_df,
-            unique_output_df,
-            left_on=['composant', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame columns: {joined_df.columns}")
-        logging.info(f"Inner join resulted in {len(joined_df)} rows.")
-
-        # Apply the condition and filter the rows before mapping
-        filtered_df = joined_df[
-            joined_df['aud_expressionFilterOutput'].notna() &  # Ensure aud_expressionFilterOutput is not NaN
-            joined_df.apply(
-                lambda row: isinstance(row['aud_expressionFilterOutput'], str) and  # Check if it's a string
-                            f"{row['rowName']}.{row['nameColumnInput']}" in row['aud_expressionFilterOutput'], axis=1  # Check if expression contains the specific rowName.NameColumnInput
-            )
-        ]
-
-        # Log the filtered rows
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if len(filtered_df) > 0:
-            logging.info(f"Sample of filtered rows:\n{filtered_df.head(5)}")
-
-        # Map each column to its source for insertion into 'aud_agg_tmapinputinoutput' table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName'],  # From input_df
-            'NameRowInput': filtered_df['nameColumnInput'],  # From input_df
-            'composant': filtered_df['composant'],  # From input_df
-            'expressionFilterOutput': filtered_df['aud_expressionFilterOutput'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),  # From output_df
-            'OutputName': filtered_df['aud_OutputName'],  # From output_df
-            'reject': filtered_df['aud_reject'],  # From output_df
-            'rejectInnerJoin': filtered_df['aud_rejectInnerJoin'],  # Mapping to bit(1)
-            'NameProject': filtered_df['NameProject'],  # Common column
-            'NameJob': filtered_df['NameJob']  # Common column
-        })
-
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Drop rows with NaN in critical columns
-        critical_columns = [
-            'rowName', 'NameRowInput', 'composant', 'expressionFilterOutput',
-             'OutputName', 'reject',
-            'rejectInnerJoin', 'NameProject', 'NameJob'
-        ]
-        # Fill NaN values in critical columns with None (NULL in MySQL)
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after removing NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Insert rows into the database in batches
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapinputinfilteroutput')
-        data_batch = []
-
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_tmapinputinfilteroutput', data_batch)
-                    logging.info(f"Inserted batch of {batch_size} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-   
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_tmapinputinfilteroutput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
 
-        logging.info("Data successfully inserted into `aud_agg_tmapinputinfilteroutput` table.")
+def _txmlmap_used_columns(mapped_df, table_name):
+    """
+    Return the distinct used column keys (`TXMLMAP_USED_COLUMN_KEYS`) of the rows of a tXMLMap lineage table.
 
+    Args:
+        mapped_df (pd.DataFrame): The rows inserted into the table.
+        table_name (str): The table, a key of `TXMLMAP_USED_COLUMN_TABLES`.
 
+    Returns:
+        pd.DataFrame: The used column keys, without duplicates.
+    """
+    column_name, row_name, component_name = TXMLMAP_USED_COLUMN_TABLES[table_name]
+    used_df = mapped_df.rename(columns={
+        column_name: 'aud_nameColumnInput', row_name: 'rowName', component_name: 'aud_componentName'
+    })[TXMLMAP_USED_COLUMN_KEYS]
+    return used_df.drop_duplicates(ignore_index=True)
 
 
-#         # ==============================================================================================
-#         #  Join aud_aud_inputtable.csv & aud_aud_inputtable.csv for `aud_agg_tmapinputinjoininput`
-#         # ==============================================================================================
-        # Filter the input DataFrame for valid rows where expressionJoin is not NaN or empty
-        filtered_input_df = input_df[
-        input_df['expressionJoin'].notna() &  # Ensure expressionJoin is not NaN
-        input_df['expressionJoin'].apply(lambda x: isinstance(x, str) and len(x.strip()) != 0)  # Ensure expressionJoin is not empty
+def _tmap_load_input(config: Config, db: Database, batch_size: int, jobs=None):
+    """
+    Write the aud_inputtable query results to aud_inputtable.csv and read them back.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance (connection) used by the stage.
+        batch_size (int): Number of rows of the first insert batch.
+        jobs (list of tuples, optional): Jobs to load, see `changed_jobs`. Defaults to None (every job).
+
+    Returns:
+        pd.DataFrame: The tMap input columns.
+    """
+    directory_path = config.get_param('Directories', 'delete_files')
+
+    # Step 2: Execute inputtable  query and write to CSV
+    aud_inputtable_query, params = agg_query(config, 'aud_inputtable', jobs)
+    logger.info("Executing query: %s", aud_inputtable_query)
+
+    input_csv_path = os.path.join(directory_path, "aud_inputtable.csv")
+    input_csv_header = [
+        "rowName", "nameColumnInput", "expressionJoin", "expressionFilterInput", 
+        "composant", "innerJoin", "NameProject", "NameJob"
     ]
 
+    with open(input_csv_path, mode='w', newline='', encoding='utf-8') as input_csvfile:
+        writer = csv.writer(input_csvfile)
+        writer.writerow(input_csv_header)
+        for rows in db.stream_query(aud_inputtable_query, params):
+            writer.writerows(rows)
 
-        logging.info(f"Filtered input DataFrame has {len(filtered_input_df)} rows before merging.")
+    logger.info("Input table results written to %s", input_csv_path)
 
+    input_df = pd.read_csv(input_csv_path, encoding='utf-8')
+    logger.info("Input DataFrame columns: %s", input_df.columns)
 
-         # Merge the input DataFrames
-        joined_df = pd.merge(
-            input_df,
-            filtered_input_df,
-            left_on=['composant', 'NameJob', 'NameProject'],
-            right_on=['composant', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame columns: {joined_df.columns}")
-        logging.info(f"Inner join resulted in {len(joined_df)} rows.")
+    return input_df
 
-        # Apply the condition and filter the rows before mapping
-        filtered_df = joined_df[
-            joined_df['expressionJoin_x'].notna() &  # Ensure expressionJoin_x is not NaN
-            joined_df.apply(
-                lambda row: isinstance(row['expressionJoin_x'], str) and len(row['expressionJoin_x']) != 0 , axis=1  # Corrected check
-            )
-        ]
-
-        # Log the filtered rows
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if len(filtered_df) > 0:
-            logging.info(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column to its source for insertion into 'aud_agg_tmapinputinoutput' table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName_x'],  # From input_df
-            'NameColumnInput': filtered_df['nameColumnInput_x'],  # From input_df
-            'expressionJoin': filtered_df['expressionJoin_x'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),  # From output_df
-            'composant': filtered_df['composant'],  # From input_df
-            'InnerJoin': filtered_df['innerJoin_x'],  # From output_df
-            'NameProject': filtered_df['NameProject'],  # Common column
-            'NameJob': filtered_df['NameJob'],  # Common column
-            'is_columnjoined': filtered_df.apply(
-                lambda row: 1 if pd.notna(row['expressionJoin_y']) and f"{row['rowName_x']}.{row['nameColumnInput_x']}" in row['expressionJoin_y'] else 0, axis=1
-            ),  # Conditional check for column join based on expressionJoin_x
-            'rowName_join': filtered_df['rowName_y'], 
-            'NameColumnInput_join': filtered_df['nameColumnInput_y'],  
-        })
-
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Drop rows with NaN in critical columns
-        critical_columns = [
-            'rowName', 'NameColumnInput', 'expressionJoin', 'composant',
-            'InnerJoin', 'NameProject', 'NameJob',
-            'is_columnjoined', 'rowName_join', 'NameColumnInput_join'
-        ]
-
-        # Fill NaN values in critical columns with None (NULL in MySQL)
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after removing NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Insert rows into the database in batches
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapinputinjoininput')
-        data_batch = []
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_tmapinputinjoininput', data_batch)
-                    logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_tmapinputinjoininput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
-        logging.info("Data successfully inserted into `aud_agg_tmapinputinjoininput` table.")
 
-#         # ==============================================================================================
-#         # insert aud_aud_inputtable.csv in `aud_agg_tmapinputinfilterinput`
-#         # ==============================================================================================
-        # Filter the input DataFrame for valid rows where expressionFilterInput is not NaN or empty
-        filtered_input_df = input_df[
-            input_df['expressionFilterInput'].notna() &  # Ensure expressionFilterInput is not NaN
-            input_df.apply(
-                lambda row: f"{row['rowName']}.{row['nameColumnInput']}" in str(row['expressionFilterInput']), axis=1
-            )  # Ensure expressionFilterInput contains the required pattern
-        ]
-
-        logging.info(f"Filtered input DataFrame has {len(filtered_input_df)} rows before merging.")
-
-        # Apply the condition and filter rows for mapping
-        filtered_df = filtered_input_df[
-            filtered_input_df['expressionFilterInput'].notna() &  # Ensure expressionFilterInput is not NaN
-            filtered_input_df['expressionFilterInput'].apply(
-                lambda x: isinstance(x, str) and len(x.strip()) > 0  # Ensure expressionFilterInput is not empty
-            )
-        ]
-
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if len(filtered_df) > 0:
-            logging.info(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column to its source for insertion into the target table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName'],  # From input_df
-            'NameColumnInput': filtered_df['nameColumnInput'],  # From input_df
-            'expressionFilterInput': filtered_df['expressionFilterInput'].apply(
-                lambda x: x.replace("\n", " ") if pd.notna(x) else x
-            ),  # Clean up line breaks
-            'composant': filtered_df['composant'],  # From input_df
-            'NameProject': filtered_df['NameProject'],  # Common column
-            'NameJob': filtered_df['NameJob'],  # Common column
-        })
-
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Drop rows with NaN in critical columns
-        critical_columns = [
-            'rowName', 'NameColumnInput', 'expressionFilterInput', 'composant',
-            'NameProject', 'NameJob'
-        ]
-
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Insert rows into the database in batches
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapinputinfilterinput')
-        data_batch = []
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_tmapinputinfilterinput', data_batch)
-                    logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_tmapinputinfilterinput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
+def _tmap_load_output(config: Config, db: Database, batch_size: int, jobs=None):
+    """
+    Write the aud_outputtable query results to aud_outputtable.csv and read them back.
 
-        logging.info("Data successfully inserted into `aud_agg_tmapinputinfilterinput` table.")
-  # ==============================================================================================
-#         # Join aud_aud_inputtable.csv &  aud_vartable for aud_agg_tmapinputinvar
-#         # ==============================================================================================
-        # Step 1: Execute aud_vartable query to retrieve data
-        aud_vartable_query = config.get_param('agg_queries', 'aud_vartable')
-        logging.info(f"Executing query: {aud_vartable_query}")
-        aud_vartable_results = db.execute_query(aud_vartable_query)
-
-        # Convert the query results into a DataFrame
-        vartable_df = pd.DataFrame(aud_vartable_results, columns=[
-            'aud_componentValue', 'aud_Var', 'aud_nameVar', 'aud_expressionVar', 'NameProject', 'NameJob'
-        ])
-        logging.info(f"Retrieved {len(vartable_df)} rows from aud_vartable.")
-        logging.debug(f"Sample from aud_vartable DataFrame:\n{vartable_df.head()}")
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance (connection) used by the stage.
+        batch_size (int): Number of rows of the first insert batch.
+        jobs (list of tuples, optional): Jobs to load, see `changed_jobs`. Defaults to None (every job).
 
-        
+    Returns:
+        pd.DataFrame: The tMap output columns.
+    """
+    directory_path = config.get_param('Directories', 'delete_files')
 
-        # Step 3: Perform an inner join between input_df and vartable_df
-        joined_df = pd.merge(
-            input_df,
-            vartable_df,
-            left_on=['composant', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame has {len(joined_df)} rows.")
-        logging.debug(f"Sample of joined DataFrame:\n{joined_df.head()}")
-
-        # Step 4: Apply additional filtering on the joined DataFrame
-        filtered_df = joined_df[
-            joined_df['aud_expressionVar'].notna() &
-            joined_df.apply(
-                lambda row: f"{row['rowName']}.{row['nameColumnInput']}" in str(row['aud_expressionVar']),
-                axis=1
-            )
-        ]
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if not filtered_df.empty:
-            logging.debug(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column for insertion into the 'aud_agg_tmapinputinvar' table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName'],
-            'NameColumnInput': filtered_df['nameColumnInput'],
-            'composant': filtered_df['composant'],
-            'expressionOutput': filtered_df['aud_expressionVar'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),
-            'nameColumnOutput': filtered_df.apply(lambda row: f"{row['aud_Var']}.{row['aud_nameVar']}", axis=1),
-            'NameProject': filtered_df['NameProject'],
-            'NameJob': filtered_df['NameJob']
-        })
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Handle NaN values in critical columns
-        critical_columns = ['rowName', 'NameColumnInput', 'composant', 'expressionOutput', 'nameColumnOutput', 'NameProject', 'NameJob']
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after handling NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Batch insertion into the database
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapinputinvar')
-        data_batch = []
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_tmapinputinvar', data_batch)
-                    logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_tmapinputinvar', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
+    # Step 3: Execute outputtable  query and write to CSV
+    aud_outputtable_query, params = agg_query(config, 'aud_outputtable', jobs)
+    logger.info("Executing query: %s", aud_outputtable_query)
+
+    output_csv_path = os.path.join(directory_path, "aud_outputtable.csv")
+    output_csv_header = ["aud_componentName","aud_OutputName", "aud_sizeState","aud_activateCondensedTool", "aud_reject", 
+                         "aud_rejectInnerJoin", "aud_expressionOutput", "aud_nameColumnOutput", "aud_type", "aud_nullable",
+                         "aud_activateExpressionFilter", "aud_expressionFilterOutput", "aud_componentValue", "NameProject", "NameJob" ]
+
+    with open(output_csv_path, mode='w', newline='', encoding='utf-8') as output_csvfile:
+        writer = csv.writer(output_csvfile)
+        writer.writerow(output_csv_header)
+        for rows in db.stream_query(aud_outputtable_query, params):
+            writer.writerows(rows)
+
+    logger.info("Output table results written to %s", output_csv_path)
+
+    output_df = pd.read_csv(output_csv_path, encoding='utf-8')
+    logger.info("Read %s rows from %s", len(output_df), output_csv_path)
+    logger.info("Output DataFrame columns: %s", output_df.columns)
+
+    return output_df
+
+
+def _tmap_load_vartable(config: Config, db: Database, batch_size: int, jobs=None):
+    """
+    Load the tMap var tables.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance (connection) used by the stage.
+        batch_size (int): Number of rows of the first insert batch.
+        jobs (list of tuples, optional): Jobs to load, see `changed_jobs`. Defaults to None (every job).
+
+    Returns:
+        pd.DataFrame: The aud_vartable rows.
+    """
+    # Step 1: Execute aud_vartable query to retrieve data
+    aud_vartable_query, params = agg_query(config, 'aud_vartable', jobs)
+    logger.info("Executing query: %s", aud_vartable_query)
+    # Fetch the query results straight into a typed DataFrame
+    vartable_df = db.fetch_dataframe(aud_vartable_query, params=params, columns=[
+        'aud_componentValue', 'aud_Var', 'aud_nameVar', 'aud_expressionVar', 'NameProject', 'NameJob'
+    ], categorical=CATEGORICAL_COLUMNS)
+    logger.info("Retrieved %s rows from aud_vartable.", len(vartable_df))
+    logger.debug("Sample from aud_vartable DataFrame:\n%s", Preview(vartable_df))
+
+    return vartable_df
+
+
+def _tmap_key_frames(input_df, output_df, vartable_df):
+    """
+    Give the key columns of the tMap frames a common categorical dictionary (see `share_key_categories`).
+
+    Args:
+        input_df (pd.DataFrame): The tMap input columns.
+        output_df (pd.DataFrame): The tMap output columns.
+        vartable_df (pd.DataFrame): The tMap var tables.
+    """
+    share_key_categories(input_df, output_df, vartable_df)
+
+
+# The aud_agg_tmap* lineage tables computed from the tMap frames, by AUD_405_AGG_TMAP stage.
+# var_output_df is output_df joined with vartable_df (see `_tmap_join_var_output`)
+TMAP_LINEAGE = {
+    # Input columns used by output expressions
+    'input_output': LineageSpec(
+        'aud_agg_tmapinputinoutput', 'input_df', right='output_df',
+        keys=(('composant', 'aud_componentValue'), 'NameJob', 'NameProject'),
+        predicate=contains('aud_expressionOutput', 'rowName', 'nameColumnInput'),
+        projection={
+            'rowName': 'rowName',
+            'NameRowInput': 'nameColumnInput',
+            'composant': 'composant',
+            'expressionOutput': one_line('aud_expressionOutput'),
+            'nameColumnOutput': 'aud_nameColumnOutput',
+            'OutputName': 'aud_OutputName',
+            'reject': 'aud_reject',
+            'rejectInnerJoin': 'aud_rejectInnerJoin',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+        bits=('rejectInnerJoin',),
+    ),
+    # Input columns used by output filters, once per output
+    'input_filter_output': LineageSpec(
+        'aud_agg_tmapinputinfilteroutput', 'input_df', right='output_df',
+        keys=(('composant', 'aud_componentValue'), 'NameJob', 'NameProject'),
+        right_unique=('aud_OutputName', 'aud_componentValue', 'NameProject', 'NameJob'),
+        predicate=contains('aud_expressionFilterOutput', 'rowName', 'nameColumnInput'),
+        projection={
+            'rowName': 'rowName',
+            'NameRowInput': 'nameColumnInput',
+            'composant': 'composant',
+            'expressionFilterOutput': one_line('aud_expressionFilterOutput'),
+            'OutputName': 'aud_OutputName',
+            'reject': 'aud_reject',
+            'rejectInnerJoin': 'aud_rejectInnerJoin',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+    # Input columns having a join expression, paired with the joined inputs of the component
+    'input_join_input': LineageSpec(
+        'aud_agg_tmapinputinjoininput', 'input_df', right='input_df',
+        keys=('composant', 'NameJob', 'NameProject'),
+        right_filter=filled('expressionJoin', strip=True),
+        predicate=filled('expressionJoin_x'),
+        projection={
+            'rowName': 'rowName_x',
+            'NameColumnInput': 'nameColumnInput_x',
+            'expressionJoin': one_line('expressionJoin_x'),
+            'composant': 'composant',
+            'InnerJoin': 'innerJoin_x',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+            'is_columnjoined': lambda df: contains('expressionJoin_y', 'rowName_x', 'nameColumnInput_x')(df).astype(int),
+            'rowName_join': 'rowName_y',
+            'NameColumnInput_join': 'nameColumnInput_y',
+        },
+    ),
+    # Input columns used by their input filter
+    'input_filter_input': LineageSpec(
+        'aud_agg_tmapinputinfilterinput', 'input_df',
+        predicate=contains('expressionFilterInput', 'rowName', 'nameColumnInput'),
+        projection={
+            'rowName': 'rowName',
+            'NameColumnInput': 'nameColumnInput',
+            'expressionFilterInput': one_line('expressionFilterInput'),
+            'composant': 'composant',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+    # Input columns used by var expressions
+    'input_var': LineageSpec(
+        'aud_agg_tmapinputinvar', 'input_df', right='vartable_df',
+        keys=(('composant', 'aud_componentValue'), 'NameJob', 'NameProject'),
+        predicate=contains('aud_expressionVar', 'rowName', 'nameColumnInput'),
+        projection={
+            'rowName': 'rowName',
+            'NameColumnInput': 'nameColumnInput',
+            'composant': 'composant',
+            'expressionOutput': one_line('aud_expressionVar'),
+            'nameColumnOutput': dotted_name('aud_Var', 'aud_nameVar'),
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+    # Vars used by output expressions
+    'var_output': LineageSpec(
+        'aud_agg_tmapvarinoutput', 'var_output_df',
+        predicate=contains('aud_expressionOutput', 'aud_Var', 'aud_nameVar'),
+        projection={
+            'NameRowInput': dotted_name('aud_Var', 'aud_nameVar'),
+            'composant': 'aud_componentValue',
+            'expressionOutput': 'aud_expressionOutput',
+            'nameColumnOutput': 'aud_nameColumnOutput',
+            'OutputName': 'aud_OutputName',
+            'reject': 'aud_reject',
+            'rejectInnerJoin': 'aud_rejectInnerJoin',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+    # Vars used by output filters
+    'var_filter': LineageSpec(
+        'aud_agg_tmapvarinfilter', 'var_output_df',
+        predicate=contains('aud_expressionFilterOutput', 'aud_Var', 'aud_nameVar'),
+        projection={
+            'NameRowInput': dotted_name('aud_Var', 'aud_nameVar'),
+            'composant': 'aud_componentValue',
+            'expressionFilterOutput': 'aud_expressionFilterOutput',
+            'OutputName': 'aud_OutputName',
+            'reject': 'aud_reject',
+            'rejectInnerJoin': 'aud_rejectInnerJoin',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+}
+
+
+def _tmap_lineage(config: Config, db: Database, batch_size: int, spec, used_column=None, **frames):
+    """
+    Compute a tMap lineage table (see `run_lineage`).
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance (connection) used by the stage.
+        batch_size (int): Number of rows of the first insert batch.
+        spec (LineageSpec): The spec of the table, from `TMAP_LINEAGE`.
+        used_column (str, optional): Column holding the input column name, when the stage returns
+            used column keys. Defaults to None.
+        **frames: The frames of the spec.
+
+    Returns:
+        pd.DataFrame: The used column keys of the inserted rows (see `_used_columns`), or None
+        without `used_column`.
+    """
+    mapped_df = run_lineage(config, db, batch_size, spec, **frames)
+    if used_column is not None:
+        return _used_columns(mapped_df, used_column)
 
-        logging.info("Filtered and joined data successfully inserted into the 'aud_agg_tmapinputinvar' table.")
 
 #         # ==============================================================================================
 #         #  Join aud_vartable &  outputtable.csv for `aud_agg_tmapvarinoutput`
 #         # ==============================================================================================
-        # Step 3: Perform an inner join between output_df and vartable_df
-        joined_df = pd.merge(
-            output_df,
-            vartable_df,
-            left_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame has {len(joined_df)} rows.")
-        logging.debug(f"Sample of joined DataFrame:\n{joined_df.head()}")
-
-        # Step 4: Apply additional filtering on the joined DataFrame
-        filtered_df = joined_df[
-            joined_df['aud_expressionOutput'].notna() & 
-            joined_df.apply(
-                lambda row: f"{row['aud_Var']}.{row['aud_nameVar']}" in str(row['aud_expressionOutput']),
-                axis=1
-            )
-        ]
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if not filtered_df.empty:
-            logging.debug(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column for insertion into the 'aud_agg_tmapvarinoutput' table
-        mapped_df = pd.DataFrame({
-            'NameRowInput': filtered_df.apply(lambda row: f"{row['aud_Var']}.{row['aud_nameVar']}", axis=1),
-            'composant': filtered_df['aud_componentValue'],
-            'expressionOutput': filtered_df['aud_expressionOutput'],
-            'nameColumnOutput': filtered_df['aud_nameColumnOutput'],
-            'OutputName': filtered_df['aud_OutputName'],
-            'reject': filtered_df['aud_reject'],
-            'rejectInnerJoin': filtered_df['aud_rejectInnerJoin'],
-            'NameProject': filtered_df['NameProject'],
-            'NameJob': filtered_df['NameJob']
-        })
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Handle NaN values in critical columns
-        critical_columns = ['NameRowInput','composant', 'expressionOutput',  'nameColumnOutput','OutputName', 'reject', 'rejectInnerJoin', 'NameProject', 'NameJob']
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after handling NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Batch insertion into the database
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapvarinoutput')
-        data_batch = []
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_tmapvarinoutput', data_batch)
-                    logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_tmapvarinoutput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
+def _tmap_join_var_output(output_df, vartable_df):
+    """
+    Join the tMap outputs with the var tables of the same component.
 
-        logging.info("Filtered joined data successfully inserted into aud_agg_tmapvarinoutput table.")
+    Args:
+        output_df (pd.DataFrame): The tMap output columns.
+        vartable_df (pd.DataFrame): The tMap var tables.
 
+    Returns:
+        pd.DataFrame: The joined rows, shared by the var→output and var→filter stages.
+    """
+    # Step 3: Perform an inner join between output_df and vartable_df
+    var_output_df = pd.merge(
+        output_df,
+        vartable_df,
+        left_on=['aud_componentValue', 'NameJob', 'NameProject'],
+        right_on=['aud_componentValue', 'NameJob', 'NameProject'],
+        how='inner'
+    )
+    logger.info("Joined DataFrame has %s rows.", len(var_output_df))
+    logger.debug("Sample of joined DataFrame:\n%s", Preview(var_output_df))
 
-#         # ==============================================================================================
-#         #  Join aud_vartable &  outputtable.csv for `aud_agg_tmapvarinfilter`
-#         # ==============================================================================================
-#      # Step 4: Apply additional filtering on the joined DataFrame
-        filtered_df = joined_df[
-            joined_df['aud_expressionFilterOutput'].notna() & 
-            joined_df.apply(
-                lambda row: f"{row['aud_Var']}.{row['aud_nameVar']}" in str(row['aud_expressionFilterOutput']),
-                axis=1
-            )
-        ]
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if not filtered_df.empty:
-            logging.debug(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column for insertion into the 'aud_agg_tmapvarinoutput' table
-        mapped_df = pd.DataFrame({
-            'NameRowInput': filtered_df.apply(lambda row: f"{row['aud_Var']}.{row['aud_nameVar']}", axis=1),
-            'composant': filtered_df['aud_componentValue'],
-            'expressionFilterOutput': filtered_df['aud_expressionFilterOutput'],
-            'OutputName': filtered_df['aud_OutputName'],
-            'reject': filtered_df['aud_reject'],
-            'rejectInnerJoin': filtered_df['aud_rejectInnerJoin'],
-            'NameProject': filtered_df['NameProject'],
-            'NameJob': filtered_df['NameJob']
-        })
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Handle NaN values in critical columns
-        critical_columns = ['NameRowInput','composant', 'expressionFilterOutput', 'OutputName',  'reject', 'rejectInnerJoin', 'NameProject', 'NameJob']
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after handling NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Batch insertion into the database
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapvarinfilter')
-        data_batch = []
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_tmapvarinfilter', data_batch)
-                    logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_tmapvarinfilter', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
+    return var_output_df
 
 
-        logging.info("Data successfully inserted into `aud_agg_tmapvarinfilter` table.")
 # =========================================================================================================================
 # Description:
 # This script processes several tables and queries for detecting lookup inner join rejects and aggregations.
@@ -770,219 +656,168 @@ def AUD_405_AGG_TMAP(config: Config, db: Database, execution_date: str, batch_si
 # - `NameProject`: Name of the project.
 # - `NameJob`: Name of the job.
 # =========================================================================================================================
-    
-        # Step 1: Execute aud_agg_tmapinputinoutput query to retrieve data
-        aud_agg_tmapinputinoutput_query = config.get_param('agg_queries', 'aud_agg_tmapinputinoutput')
-        logging.info(f"Executing query: {aud_agg_tmapinputinoutput_query}")
-        aud_agg_tmapinputinoutput_results = db.execute_query(aud_agg_tmapinputinoutput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_tmapinputinoutput_df = pd.DataFrame(
-            aud_agg_tmapinputinoutput_results,
-            columns=['rowName', 'NameRowInput', 'composant', 'NameProject','NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_tmapinputinoutput_df)} rows from aud_agg_tmapinputinoutput.")
-        logging.debug(f"Sample from aud_agg_tmapinputinoutput DataFrame:\n{aud_agg_tmapinputinoutput_df.head()}")
-
-        # Step 2: Execute aud_agg_tmapinputinfilteroutput query to retrieve data
-        aud_agg_tmapinputinfilteroutput_query = config.get_param('agg_queries', 'aud_agg_tmapinputinfilteroutput')
-        logging.info(f"Executing query: {aud_agg_tmapinputinfilteroutput_query}")
-        aud_agg_tmapinputinfilteroutput_results = db.execute_query(aud_agg_tmapinputinfilteroutput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_tmapinputinfilteroutput_df = pd.DataFrame(
-            aud_agg_tmapinputinfilteroutput_results,
-            columns=['rowName', 'NameRowInput', 'composant', 'NameProject','NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_tmapinputinfilteroutput_df)} rows from aud_agg_tmapinputinfilteroutput.")
-        logging.debug(f"Sample from aud_agg_tmapinputinfilteroutput DataFrame:\n{aud_agg_tmapinputinfilteroutput_df.head()}")
-
-        # Step 3: Execute aud_agg_tmapinputinjoininput query to retrieve data
-        aud_agg_tmapinputinjoininput_query = config.get_param('agg_queries', 'aud_agg_tmapinputinjoininput')
-        logging.info(f"Executing query: {aud_agg_tmapinputinjoininput_query}")
-        aud_agg_tmapinputinjoininput_results = db.execute_query(aud_agg_tmapinputinjoininput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_tmapinputinjoininput_df = pd.DataFrame(
-            aud_agg_tmapinputinjoininput_results,
-            columns=['rowName', 'NameRowInput', 'composant', 'NameProject','NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_tmapinputinjoininput_df)} rows from aud_agg_tmapinputinjoininput.")
-        logging.debug(f"Sample from aud_agg_tmapinputinjoininput DataFrame:\n{aud_agg_tmapinputinjoininput_df.head()}")
-
-        # Step 4: Execute aud_agg_tmapinputinfilterinput query to retrieve data
-        aud_agg_tmapinputinfilterinput_query = config.get_param('agg_queries', 'aud_agg_tmapinputinfilterinput')
-        logging.info(f"Executing query: {aud_agg_tmapinputinfilterinput_query}")
-        aud_agg_tmapinputinfilterinput_results = db.execute_query(aud_agg_tmapinputinfilterinput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_tmapinputinfilterinput_df = pd.DataFrame(
-            aud_agg_tmapinputinfilterinput_results,
-            columns=['rowName', 'NameRowInput', 'composant', 'NameProject','NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_tmapinputinfilterinput_df)} rows from aud_agg_tmapinputinfilterinput.")
-        logging.debug(f"Sample from aud_agg_tmapinputinfilterinput DataFrame:\n{aud_agg_tmapinputinfilterinput_df.head()}")
-
-        # Step 5: Execute aud_agg_tmapinputinvar query to retrieve data
-        aud_agg_tmapinputinvar_query = config.get_param('agg_queries', 'aud_agg_tmapinputinvar')
-        logging.info(f"Executing query: {aud_agg_tmapinputinvar_query}")
-        aud_agg_tmapinputinvar_results = db.execute_query(aud_agg_tmapinputinvar_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_tmapinputinvar_df = pd.DataFrame(
-            aud_agg_tmapinputinvar_results,
-            columns=['rowName', 'NameRowInput', 'composant', 'NameProject','NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_tmapinputinvar_df)} rows from aud_agg_tmapinputinvar.")
-        logging.debug(f"Sample from aud_agg_tmapinputinfilterinput DataFrame:\n{aud_agg_tmapinputinvar_df.head()}")
- 
-
-      
-
-
-
-        def catch_inner_join_rejects(left_df, right_df, left_join_keys, right_join_keys):
-            """
-            Detects rows rejected from the left DataFrame during an inner join.
-
-            Parameters:
-                left_df (pd.DataFrame): The left DataFrame for the join.
-                right_df (pd.DataFrame): The right DataFrame for the join.
-                left_join_keys (list or str): The columns to use as join keys from the left DataFrame.
-                right_join_keys (list or str): The columns to use as join keys from the right DataFrame.
-
-            Returns:
-                pd.DataFrame: A DataFrame containing all rejected rows from the left DataFrame.
-            """
-            logging.info("Starting inner join rejection detection.")
-            logging.debug(f"Left DataFrame shape: {left_df.shape}")
-            logging.debug(f"Left DataFrame preview:\n{left_df.head()}")
-
-            logging.debug(f"Right DataFrame shape: {right_df.shape}")
-            logging.debug(f"Right DataFrame preview:\n{right_df.head()}")
-
-            # Perform a left join to detect left rejects
-            logging.info("Performing left join to detect rows rejected from the left DataFrame.")
-            left_join_df = pd.merge(
-                left_df,
-                right_df,
-                left_on=left_join_keys,
-                right_on=right_join_keys,
-                how='outer',
-                indicator=True  # Adds a '_merge' column to indicate join status
-            )
-
-            # Detect left rejects (rows that don't match the right DataFrame)
-            left_rejects = left_join_df[left_join_df['_merge'] == 'left_only'].drop(columns=['_merge'])
-            
-            # Optionally, remove duplicates if you expect overlaps
-            all_rejects = left_rejects.drop_duplicates()
-
-            logging.debug(f"Total rejects detected: {len(all_rejects)}.")
-            logging.debug(f"Rejects sample:\n{all_rejects.head()}")
+def _tmap_column_unused(config: Config, db: Database, batch_size: int, input_df, jobs=None, **used_columns):
+    """
+    Insert the input columns used nowhere into `aud_agg_tmapcolumunused`.
 
-            logging.info("Finished inner join rejection detection.")
-            return all_rejects
+    The columns used by the other stages are the key frames those stages returned in this run; a
+    frame is only read back from its aud_agg_* table when it is missing (e.g. when the stage is
+    rerun on its own).
 
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance (connection) used by the stage.
+        batch_size (int): Number of rows of the first insert batch.
+        input_df (pd.DataFrame): The tMap input columns.
+        jobs (list of tuples, optional): Jobs being recomputed, see `changed_jobs`. Defaults to None (every job).
+        **used_columns: Stage name -> used column keys, as returned by `_tmap_lineage` for the
+            stages of `TMAP_USED_COLUMN_STAGES`.
+    """
+    used = {}
+    for stage_name in TMAP_USED_COLUMN_STAGES:
+        table_name = TMAP_LINEAGE[stage_name].target
+        used_df = used_columns.get(stage_name)
+        if used_df is None:
+            # Not computed in this run: read the keys back from the table
+            query, params = agg_query(config, table_name, jobs)
+            logger.info("Executing query: %s", query)
+            used_df = db.fetch_dataframe(query, columns=USED_COLUMN_KEYS, categorical=CATEGORICAL_COLUMNS, params=params)
+        logger.info("%s used columns from %s.", len(used_df), table_name)
+        used[table_name] = used_df
+
+    # Step 1: Prepare input DataFrame
+    input_df = input_df[['rowName', 'nameColumnInput', 'composant', 'NameProject', 'NameJob']]
+    input_df = input_df.rename(columns={"nameColumnInput": "NameRowInput"})
+    share_key_categories(input_df, *used.values())
+
+    # Step 2: Detect the input columns matching none of the used columns
+    final = unused_rows(input_df, used.values(), USED_COLUMN_KEYS)
+    logger.info("Reject detection completed. Rejects: %s rows.", len(final))
+
+    # Step 3: Insert rejects into aud_agg_tmapcolumunused
+    if final.empty:
+        logger.info("No data to insert into aud_agg_tmapcolumunused.")
+    else:
+        insert_frame(config, db, batch_size, 'aud_agg_tmapcolumunused', final)
 
- # =========================================================================================================================
-# input_df + aud_agg_tmapinputinoutput_df --> rejects + aud_agg_tmapinputinfilteroutput_df --> rejects 
-# + aud_agg_tmapinputinjoininput_df --> rejects + aud_agg_tmapinputinfilterinput_df --> rejects 
-# + aud_agg_tmapinputinvar_df --> insert in aud_agg_tmapcolumunused
-# =========================================================================================================================
 
-        # Step 1: Prepare input DataFrame
-        input_df = input_df[['rowName', 'nameColumnInput', 'composant', 'NameProject', 'NameJob']]
-        input_df = input_df.rename(columns={"nameColumnInput": "NameRowInput"})
-
-        # Step 2: Sequential joins to detect rejects
-        logging.info("Starting the sequential reject detection process.")
-        df = catch_inner_join_rejects(
-            input_df, aud_agg_tmapinputinoutput_df, 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject','NameJob'], 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject','NameJob']
-        )
-        logging.info(f"First join completed. Rejects: {len(df)} rows.")
-
-        df1 = catch_inner_join_rejects(
-            df, aud_agg_tmapinputinfilteroutput_df, 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob'], 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Second join completed. Rejects: {len(df1)} rows.")
-
-        df2 = catch_inner_join_rejects(
-            df1, aud_agg_tmapinputinjoininput_df, 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob'], 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Third join completed. Rejects: {len(df2)} rows.")
-
-        df3 = catch_inner_join_rejects(
-            df2, aud_agg_tmapinputinfilterinput_df, 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob'], 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Fourth join completed. Rejects: {len(df3)} rows.")
-
-        final = catch_inner_join_rejects(
-            df3, aud_agg_tmapinputinvar_df, 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob'], 
-            ['rowName', 'NameRowInput', 'composant', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Final join completed. Rejects: {len(final)} rows.")
-
-        # Step 3: Insert rejects into aud_agg_tmapcolumunused
-        if final.empty:
-            logging.info("No data to insert into aud_agg_tmapcolumunused.")
-        else:
-            try:
-                # Adjust insert_query as needed
-                insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapcolumunused')
-                # Convert final DataFrame to list of tuples for batch insertion
-                data_batch = final.to_records(index=False).tolist()
-                
-                db.insert_data_batch(insert_query, 'aud_agg_tmapcolumunused', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows into aud_agg_tmapcolumunused.")
-            except Exception as e:
-                logging.warning(f"Error inserting final batch into aud_agg_tmapcolumunused: {str(e)}")
 # =========================================================================================================================
 # Execute aud_inputtable_nb query and insert into aud_agg_tmapinput
 # =========================================================================================================================
+def _tmap_input_count(config: Config, db: Database, batch_size: int, jobs=None):
+    """
+    Insert the aud_inputtable_nb counts into `aud_agg_tmapinput`.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance (connection) used by the stage.
+        batch_size (int): Number of rows of the first insert batch.
+        jobs (list of tuples, optional): Jobs to load, see `changed_jobs`. Defaults to None (every job).
+    """
+    # Step 1: Execute the query
+    aud_inputtable_nb_query, params = agg_query(config, 'aud_inputtable_nb', jobs)
+    logger.info("Executing query: %s", aud_inputtable_nb_query)
 
-        # Step 1: Execute the query
-        aud_inputtable_nb_query = config.get_param('agg_queries', 'aud_inputtable_nb')
-        logging.info(f"Executing query: {aud_inputtable_nb_query}")
-
-        try:
-            # Execute the query and fetch results
-            aud_inputtable_nb_results = db.execute_query(aud_inputtable_nb_query)
-            logging.info(f"Query executed successfully. Number of rows retrieved: {len(aud_inputtable_nb_results)}")
-        except Exception as e:
-            logging.error(f"Error executing query aud_inputtable_nb: {str(e)}")
-            raise
-
-        # Step 2: Insert query results into aud_agg_tmapinput
-        if len(aud_inputtable_nb_results)==0 :
-            logging.info("No data to insert into aud_agg_tmapinput.")
-        else:
+    try:
+        # Execute the query and fetch results
+        aud_inputtable_nb_results = db.execute_query(aud_inputtable_nb_query, params)
+        logger.info("Query executed successfully. Number of rows retrieved: %s", len(aud_inputtable_nb_results))
+    except Exception as e:
+        logger.error("Error executing query aud_inputtable_nb: %s", e)
+        raise
+
+    # Step 2: Insert query results into aud_agg_tmapinput
+    if len(aud_inputtable_nb_results)==0 :
+        logger.info("No data to insert into aud_agg_tmapinput.")
+    else:
+        # Fetch the insert query dynamically
+        insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapinput')
+        logger.info("Using insert query: %s", insert_query)
+
+        # Perform batch insertion
+        data_batch = db.batcher(insert_query, 'aud_agg_tmapinput', initial_size=batch_size)
+        data_batch.extend(aud_inputtable_nb_results)
+        data_batch.flush()
+        logger.info("Inserted %s rows into aud_agg_tmapinput successfully.", len(aud_inputtable_nb_results))
+
+
+@job_metrics
+def AUD_405_AGG_TMAP(config: Config, db: Database, execution_date: str, batch_size=100):
+    """
+    Compute the tMap lineage tables (aud_agg_tmap*).
+
+    The work is split into stages run by `run_stages`: the aud_inputtable, aud_outputtable and
+    aud_vartable frames are loaded once, then every aud_agg_tmap* table is computed as soon as the
+    frames it needs are there, stages running concurrently on their own database connection.
+    The key columns of the three frames are first given a common categorical dictionary.
+    The aud_agg_tmap* tables are described by the specs of `TMAP_LINEAGE`, computed by `run_lineage`.
+    `aud_agg_tmapcolumunused` is computed from the used column keys returned by five of them.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance for executing agg_queries.
+        execution_date (str): Execution date used in data insertion. In incremental mode, only the
+            jobs changed since this date are recomputed (see `changed_jobs`).
+        batch_size (int, optional): Number of rows to insert in each batch. Defaults to 100.
+    """
+    
+    def stage(func, *requires, connect=True, after=('key_frames',), target=None, **options):
+        """
+        Bind a stage function to the job arguments, with a connection of its own when `connect`.
+        The stage also waits for the stages in `after`, whose results are not passed to it.
+        A stage filling the `target` table replaces the rows of the changed jobs in one transaction
+        of its connection, so a failed stage leaves the table as it was.
+        """
+        after = tuple(name for name in after if name not in requires)
+
+        def run(**inputs):
+            for name in after:
+                del inputs[name]
+            if not connect:
+                return func(**inputs)
+            stage_db = db.clone()
             try:
-                # Fetch the insert query dynamically
-                insert_query = config.get_param('insert_agg_queries', 'aud_agg_tmapinput')
-                logging.info(f"Using insert query: {insert_query}")
+                if target is None:
+                    return func(config, stage_db, batch_size, **options, **inputs)
+                with stage_db.transaction():
+                    if jobs is not None:
+                        delete_agg_rows(stage_db, [target], jobs)
+                    return func(config, stage_db, batch_size, **options, **inputs)
+            finally:
+                stage_db.close()
+        return run, requires + after
 
-                # Convert the query results to a list of tuples for batch insertion
-                
-                # Perform batch insertion
-                db.insert_data_batch(insert_query, 'aud_agg_tmapinput', aud_inputtable_nb_results)
-                logging.info(f"Inserted {len(aud_inputtable_nb_results)} rows into aud_agg_tmapinput successfully.")
-            except Exception as e:
-                logging.error(f"Error inserting data into aud_agg_tmapinput: {str(e)}")
+    try:
+        # Step 1: Clean the directory by deleting existing files
+        directory_path = config.get_param('Directories', 'delete_files')
+        delete_files_in_directory(directory_path)
 
-            
+        jobs = changed_jobs(config, db, execution_date)
+        if jobs is not None and not jobs:
+            logger.info("No changed job, the aud_agg_tmap* tables are up to date.")
+            return
 
-    except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        stages = {
+            'input_df': stage(_tmap_load_input, after=(), jobs=jobs),
+            'output_df': stage(_tmap_load_output, after=(), jobs=jobs),
+            'vartable_df': stage(_tmap_load_vartable, after=(), jobs=jobs),
+            'key_frames': stage(_tmap_key_frames, 'input_df', 'output_df', 'vartable_df', connect=False, after=()),
+            'var_output_df': stage(_tmap_join_var_output, 'output_df', 'vartable_df', connect=False),
+            'column_unused': stage(
+                _tmap_column_unused, 'input_df', *TMAP_USED_COLUMN_STAGES, target='aud_agg_tmapcolumunused', jobs=jobs
+            ),
+            'input_count': stage(_tmap_input_count, after=(), target='aud_agg_tmapinput', jobs=jobs),
+        }
+        for name, spec in TMAP_LINEAGE.items():
+            stages[name] = stage(
+                _tmap_lineage, *spec.frames, target=spec.target, spec=spec, used_column=TMAP_USED_COLUMN_STAGES.get(name)
+            )
+        run_stages(stages, max_workers=config.get_param('Stages', 'max_workers'))
+
+
+    except Exception as e:
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
 
 
 
@@ -1010,6 +845,92 @@ def AUD_405_AGG_TMAP(config: Config, db: Database, execution_date: str, batch_si
 
 
 
+# The aud_agg_txmlmap* lineage tables computed from the tXMLMap frames by AUD_405_AGG_TXMLMAP
+TXMLMAP_LINEAGE = (
+    # Input columns used by output expressions
+    LineageSpec(
+        'aud_agg_txmlmapinputinoutput', 'inputxml_df', right='outputxml_df',
+        keys=('aud_componentValue', 'NameJob', 'NameProject'),
+        predicate=contains('expression_y', 'rowName', 'aud_nameColumnInput_x'),
+        projection={
+            'nameColumnInput': 'aud_nameColumnInput_x',
+            'nameRowInput': 'rowName',
+            'componentName': 'aud_componentName_x',
+            'expressionOutput': one_line('expression_y'),
+            'output_nameColumnInput': 'aud_nameColumnInput_y',
+            'nameRowOutput': 'aud_nameRowOutput',
+            'NameJob': 'NameJob',
+            'NameProject': 'NameProject',
+        },
+    ),
+    # Input columns used by output filters, once per component
+    LineageSpec(
+        'aud_agg_txmlmapinputinfilteroutput', 'inputxml_df', right='outputxml_df',
+        keys=('aud_componentValue', 'NameJob', 'NameProject'),
+        right_filter=lambda df: df['expressionFilter'].notna(),
+        right_unique=('aud_componentValue', 'NameProject', 'NameJob'),
+        predicate=contains('expressionFilter_y', 'rowName', 'aud_nameColumnInput_x'),
+        projection={
+            'rowName': 'rowName',
+            'nameRowInput': 'aud_nameColumnInput_x',
+            'componentName': 'aud_componentName_x',
+            'expressionFilterOutput': one_line('expressionFilter_y'),
+            'nameRowOutput': 'aud_nameRowOutput',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+    # Input columns having a join expression, paired with the inputs whose xpath uses them
+    LineageSpec(
+        'aud_agg_txmlmapinputinjoininput', 'inputxml_df', right='inputxml_df',
+        keys=('aud_componentValue', 'NameJob', 'NameProject'),
+        predicate=(filled('expression_x'), contains('aud_xpathColumnInput_y', 'rowName_x', 'aud_nameColumnInput_x')),
+        projection={
+            'rowName': 'rowName_x',
+            'NameColumnInput': 'aud_nameColumnInput_x',
+            'aud_componentName': 'aud_componentName_x',
+            'expressionJoin': one_line('expression_x'),
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+            'is_columnjoined': lambda df: (
+                filled('expression_y')(df) & contains('aud_xpathColumnInput_y', 'rowName_x', 'aud_nameColumnInput_x')(df)
+            ).astype(int),
+            'rowName_join': 'rowName_y',
+            'NameColumnInput_join': 'aud_nameColumnInput_y',
+        },
+    ),
+    # Input columns used by their input filter
+    LineageSpec(
+        'aud_agg_txmlmapinputinfilterinput', 'inputxml_df',
+        predicate=contains('expressionFilter', 'rowName', 'aud_nameColumnInput'),
+        projection={
+            'rowName': 'rowName',
+            'NameColumnInput': 'aud_nameColumnInput',
+            'expressionFilterInput': one_line('expressionFilter'),
+            'composant': 'aud_componentName',
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+    # Input columns used by var expressions
+    LineageSpec(
+        'aud_agg_txmlmapinputinvar', 'inputxml_df', right='vartablexml_df',
+        keys=('aud_componentValue', 'NameJob', 'NameProject'),
+        predicate=contains('aud_expressionVar', 'rowName', 'aud_nameColumnInput'),
+        projection={
+            'rowName': 'rowName',
+            'NameColumnInput': 'aud_nameColumnInput',
+            'composant': 'aud_componentName_x',
+            'expressionOutput': one_line('aud_expressionVar'),
+            'nameColumnOutput': dotted_name('aud_Var', 'aud_nameVar'),
+            'NameProject': 'NameProject',
+            'NameJob': 'NameJob',
+        },
+    ),
+)
+
+
+@job_metrics
 def AUD_405_AGG_TXMLMAP(config: Config, db: Database, execution_date: str, batch_size=100):
     """
     This function:
@@ -1018,706 +939,169 @@ def AUD_405_AGG_TXMLMAP(config: Config, db: Database, execution_date: str, batch
     - Performs two different joins:
         - One for inserting into `aud_agg_txmlmapinputinoutput`.
         - Another for inserting into `aud_agg_txmlmapinputinfilteroutput`.
+    The aud_agg_txmlmap* tables are described by the specs of `TXMLMAP_LINEAGE`, computed by `run_lineage`.
 
     Args:
         config (Config): Configuration instance for retrieving parameters.
         db (Database): Database instance for executing agg_queries.
-        execution_date (str): Execution date used in data insertion.
+        execution_date (str): Execution date used in data insertion. In incremental mode, only the
+            jobs changed since this date are recomputed (see `changed_jobs`).
         batch_size (int, optional): Number of rows to insert in each batch. Defaults to 100.
     """
     
     try:
+        jobs = changed_jobs(config, db, execution_date)
+        if jobs is not None and not jobs:
+            logger.info("No changed job, the aud_agg_txmlmap* tables are up to date.")
+            return
 
-        # ==============================================================================================
-        #     Write into aud_inputtable_xml.csv & aud_outputtable_xml.csv  
-        # ==============================================================================================
-
-        # Step 1: Clean the directory by deleting existing files
-        directory_path = config.get_param('Directories', 'delete_files')
-        # delete_files_in_directory(directory_path)
-
-        # Step 2: Execute inputtable_xml XML query and write to CSV
-        aud_inputtable_xml_query = config.get_param('agg_queries', 'aud_inputtable_xml')
-        logging.info(f"Executing query: {aud_inputtable_xml_query}")
-        aud_inputtable_xml_results = db.execute_query(aud_inputtable_xml_query)
-
-        inputxml_csv_path = os.path.join(directory_path, "inputtable_xml.csv")
-        input_csv_header = [
-            'aud_nameColumnInput', 'aud_type', 'aud_xpathColumnInput', 'rowName', 
-            'aud_componentName', 'aud_componentValue', 'filterOutGoingConnections', 
-            'lookupOutgoingConnections', 'outgoingConnections', 'NameJob', 'NameProject', 
-            'exec_date', 'lookupIncomingConnections', 'expression', 'lookupMode', 
-            'matchingMode', 'activateCondensedTool', 'activateExpressionFilter', 
-            'activateGlobalMap', 'expressionFilter', 'filterIncomingConnections', 'lookup'
-        ]
-
-        with open(inputxml_csv_path, mode='w', newline='', encoding='utf-8') as input_csvfile:
-            writer = csv.writer(input_csvfile)
-            writer.writerow(input_csv_header)
-            writer.writerows(aud_inputtable_xml_results)
-
-        logging.info(f"Input table results written to {inputxml_csv_path}")
-
-        # Step 3: Execute outputtable XML query and write to CSV
-        aud_outputtable_xml_query = config.get_param('agg_queries', 'aud_outputtable_xml')
-        logging.info(f"Executing query: {aud_outputtable_xml_query}")
-        aud_outputtable_xml_results = db.execute_query(aud_outputtable_xml_query)
-
-        outputxml_csv_path = os.path.join(directory_path, "outputtable_xml.csv")
-        output_csv_header = [
-            'aud_nameColumnInput', 'aud_type', 'aud_xpathColumnInput', 'aud_nameRowOutput', 
-            'aud_componentName', 'aud_componentValue', 'filterOutGoingConnections', 
-            'outgoingConnections', 'NameJob', 'NameProject', 'exec_date', 'expression', 
-            'activateCondensedTool', 'activateExpressionFilter', 'expressionFilter', 
-            'filterIncomingConnections'
-        ]
-
-        with open(outputxml_csv_path, mode='w', newline='', encoding='utf-8') as output_csvfile:
-            writer = csv.writer(output_csvfile)
-            writer.writerow(output_csv_header)
-            writer.writerows(aud_outputtable_xml_results)
-
-        logging.info(f"Output table results written to {outputxml_csv_path}")
-
-
-
-        logging.info("Reading input and output CSV files...")
-
-        # Read CSV files
-        inputxml_df = pd.read_csv(inputxml_csv_path, encoding='utf-8')
-        outputxml_df = pd.read_csv(outputxml_csv_path, encoding='utf-8')
-        logging.info(f"Input xml DataFrame columns: {inputxml_df.columns}")
-        logging.info(f"Output xml DataFrame columns: {outputxml_df.columns}")
-
-        logging.info("Successfully read CSV files. Performing inner join...")
-
-
-        # ==============================================================================================
-        # Join `aud_inputtable_xml.csv` & `aud_outputtable_xml.csv` for `aud_agg_txmlmapinputinoutput`
-        # ==============================================================================================
-        # Perform inner join
-        joined_df = pd.merge(
-            inputxml_df,
-            outputxml_df,
-            left_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame columns: {joined_df.columns}")
-        logging.info(f"Inner join resulted in {len(joined_df)} rows.")
-
-        # Apply the condition and filter the rows before mapping
-        filtered_df = joined_df[
-            joined_df['expression_y'].notna() &  # Ensure aud_expressionOutput is not NaN
-            joined_df.apply(
-                lambda row: isinstance(row['expression_y'], str) and  # Check if it's a string
-                            f"{row['rowName']}.{row['aud_nameColumnInput_x']}" in row['expression_y'], axis=1  # Check if expression contains the specific rowName.NameColumnInput
-            )
-        ]
-
-        #Log the filtered rows
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if len(filtered_df) > 0:
-            logging.info(f"Sample of filtered rows:\n{filtered_df.head()}")
-        # Map each column to its source for insertion into 'aud_agg_tmapinputinoutput' table
-        mapped_df = pd.DataFrame({
-            'nameColumnInput': filtered_df['aud_nameColumnInput_x'],  # From input_df
-            'nameRowInput': filtered_df['rowName'],  # From input_df
-            'componentName': filtered_df['aud_componentName_x'],  # From input_df
-            'expressionOutput': filtered_df['expression_y'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),  # From output_df
-            'output_nameColumnInput': filtered_df['aud_nameColumnInput_y'],  # From output_df
-            'nameRowOutput': filtered_df['aud_nameRowOutput'],  # From output_df
-            'NameJob': filtered_df['NameJob'] , # Common column
-            'NameProject': filtered_df['NameProject'],  # Common column
-        })
-
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Drop rows with NaN in critical columns
-        critical_columns = [
-            'nameColumnInput','nameRowInput','componentName',
-            'expressionOutput','output_nameColumnInput',
-            'nameRowOutput', 'NameProject',  'NameJob'
-        ]
-        # Fill NaN values in critical columns with None (NULL in MySQL)
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after removing NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Insert rows into the database in batches
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_txmlmapinputinoutput')
-        data_batch = []
-
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinoutput', data_batch)
-                    logging.info(f"Inserted batch of {batch_size} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-   
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinoutput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
-
-        logging.info("Data successfully inserted into `aud_agg_txmlmapinputinoutput` table.")
-
-
-
-       
-
-    #     # ==============================================================================================
-    #     # Join `aud_inputtable_xml.csv` & unique `aud_outputtable_xml.csv` for `aud_agg_txmlmapinputinfilteroutput`
-    #     # ==============================================================================================
-        # Ensure unique rows in output_df based on the combination of columns
-        # Drop duplicate rows based on the specified columns, keeping only the first occurrence
-        outputxml_df = outputxml_df[outputxml_df['expressionFilter'].notna()]
-        unique_outputxml_df = outputxml_df.drop_duplicates([ 'aud_componentValue', 'NameProject', 'NameJob'], keep='first')
-
-        # Print or inspect the unique DataFrame
-        logging.info("Unique rows in output DataFrame:")
-        logging.info(len(unique_outputxml_df))
-        logging.info(unique_outputxml_df.head())
-        # Perform inner join
-        joined_df = pd.merge(
-            inputxml_df,
-            unique_outputxml_df,
-            left_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame columns: {joined_df.columns}")
-        logging.info(f"Inner join resulted in {len(joined_df)} rows.")
-
-        # Apply the condition and filter the rows before mapping
-        filtered_df = joined_df[
-            joined_df['expressionFilter_y'].notna() &  # Ensure aud_expressionFilterOutput is not NaN
-            joined_df.apply(
-                lambda row: isinstance(row['expressionFilter_y'], str) and  # Check if it's a string
-                            f"{row['rowName']}.{row['aud_nameColumnInput_x']}" in row['expressionFilter_y'], axis=1  # Check if expressionFilter contains the specific rowName.NameColumnInput
-            )
-        ]
-
-        #Log the filtered rows
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if len(filtered_df) > 0:
-            logging.info(f"Sample of filtered rows:\n{filtered_df.head()}")
-        # Map each column to its source for insertion into 'aud_agg_tmapinputinoutput' table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName'],  # From input_df
-            'nameRowInput': filtered_df['aud_nameColumnInput_x'],  # From input_df
-            'componentName': filtered_df['aud_componentName_x'],  # From input_df
-            'expressionFilterOutput': filtered_df['expressionFilter_y'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),  # From output_df
-            'nameRowOutput': filtered_df['aud_nameRowOutput'],  # From output_df
-            'NameProject': filtered_df['NameProject'],  # Common column
-            'NameJob': filtered_df['NameJob']  # Common column
-
-        })
-
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Drop rows with NaN in critical columns
-        critical_columns = [
-            'rowName', 'nameRowInput','componentName',
-            'expressionFilterOutput',
-            'nameRowOutput', 'NameProject',  'NameJob'
-        ]
-        # Fill NaN values in critical columns with None (NULL in MySQL)
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after removing NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Insert rows into the database in batches
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_txmlmapinputinfilteroutput')
-        data_batch = []
-
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinfilteroutput', data_batch)
-                    logging.info(f"Inserted batch of {batch_size} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-   
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinfilteroutput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
-
-        logging.info("Data successfully inserted into `aud_agg_txmlmapinputinfilteroutput` table.")
-
- 
-    #     # ==============================================================================================
-    #     # Join `aud_inputtable_xml.csv` with `aud_inputtable_xml.csv` for `aud_agg_txmlmapinputinjoininput`
-    #     # Filtering rows based on certain conditions and inserting filtered data into the database
-    #     # ==============================================================================================
-    
-        # Merge DataFrames
-        joined_df = pd.merge(
-            inputxml_df,
-            inputxml_df,
-            left_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Inner join resulted in {len(joined_df)} rows. Sample:\n{joined_df.head()}")
-
-        # Prepare concatenated column for filtering
-        joined_df['concatenated_name'] = joined_df['rowName_x'].astype(str) + "." + joined_df['aud_nameColumnInput_x'].astype(str)
-
-        # Filter rows
-        filtered_df = joined_df[
-            (joined_df['expression_x'].notna() & len(joined_df['expression_x'])!=0 )&
-            joined_df['aud_xpathColumnInput_y'].notna() &
-            joined_df['aud_xpathColumnInput_y'].str.contains(joined_df['concatenated_name'], regex=False, na=False)
-        ]
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows. Sample:\n{filtered_df.head()}")
-
-        if not filtered_df.empty:
-            # Map columns
-            mapped_df = pd.DataFrame({
-                'rowName': filtered_df['rowName_x'],
-                'NameColumnInput': filtered_df['aud_nameColumnInput_x'],
-                'aud_componentName': filtered_df['aud_componentName_x'],
-                'expressionJoin': filtered_df['expression_x'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),
-                'NameProject': filtered_df['NameProject'],
-                'NameJob': filtered_df['NameJob'],
-                'is_columnjoined': filtered_df.apply(
-                    lambda row: 1 if pd.notna(row['expressionJoin_y']) and f"{row['rowName_x']}.{row['aud_nameColumnInput_x']}" in row['aud_xpathColumnInput_y'] else 0,
-                    axis=1
-                ),
-                'rowName_join': filtered_df['rowName_y'],
-                'NameColumnInput_join': filtered_df['aud_nameColumnInput_y']
-            })
-
-            # Handle critical columns
-            critical_columns = [
-                'rowName', 'NameColumnInput', 'aud_componentName', 'expressionJoin',
-                'NameProject', 'NameJob', 'is_columnjoined', 'rowName_join', 'NameColumnInput_join'
+        # The rows of the changed jobs are replaced in one transaction
+        with db.transaction():
+            if jobs is not None:
+                delete_agg_rows(db, TXMLMAP_AGG_TABLES, jobs)
+
+            # ==============================================================================================
+            #     Write into aud_inputtable_xml.csv & aud_outputtable_xml.csv  
+            # ==============================================================================================
+
+            # Step 1: Clean the directory by deleting existing files
+            directory_path = config.get_param('Directories', 'delete_files')
+            # delete_files_in_directory(directory_path)
+
+            # Step 2: Execute inputtable_xml XML query and write to CSV
+            aud_inputtable_xml_query, params = agg_query(config, 'aud_inputtable_xml', jobs)
+            logger.info("Executing query: %s", aud_inputtable_xml_query)
+
+            inputxml_csv_path = os.path.join(directory_path, "inputtable_xml.csv")
+            input_csv_header = [
+                'aud_nameColumnInput', 'aud_type', 'aud_xpathColumnInput', 'rowName', 
+                'aud_componentName', 'aud_componentValue', 'filterOutGoingConnections', 
+                'lookupOutgoingConnections', 'outgoingConnections', 'NameJob', 'NameProject', 
+                'exec_date', 'lookupIncomingConnections', 'expression', 'lookupMode', 
+                'matchingMode', 'activateCondensedTool', 'activateExpressionFilter', 
+                'activateGlobalMap', 'expressionFilter', 'filterIncomingConnections', 'lookup'
             ]
-            mapped_df[critical_columns] = mapped_df[critical_columns].fillna(None)
-            logging.info(f"Mapped DataFrame has {len(mapped_df)} rows after cleaning.")
-
-            # Prepare rows for insertion
-            data_for_insertion = mapped_df.values.tolist()
-
-            # Batch insertion
-            insert_query = config.get_param('insert_agg_queries', 'aud_agg_txmlmapinputinjoininput')
-            data_batch = []
-
-            for row in data_for_insertion:
-                data_batch.append(row)
-                if len(data_batch) == batch_size:
-                    try:
-                        db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinjoininput', data_batch)
-                        logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                    except Exception as e:
-                        logging.warning(f"Error inserting batch: {str(e)} | Failed data: {data_batch}")
-                    data_batch.clear()
-
-            if data_batch:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinjoininput', data_batch)
-                    logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting remaining batch: {str(e)}")
-
-            logging.info("Data successfully inserted into `aud_agg_txmlmapinputinjoininput` table.")
-
-    #
-    #     # ==============================================================================================
-    #     # insert aud_inputtable_xml.csv in `aud_agg_txmlmapinputinfilterinput`
-    #     # ==============================================================================================
-    # Filter the input DataFrame for valid rows where expressionFilterInput is not NaN or empty
-        filtered_df = inputxml_df[
-            inputxml_df['expressionFilter'].notna() &  # Ensure expressionFilterInput is not NaN
-            inputxml_df.apply(
-                lambda row: f"{row['rowName']}.{row['aud_nameColumnInput']}" in str(row['expressionFilter']), axis=1
-            )  # Ensure expressionFilterInput contains the required pattern
-        ]
-
-        logging.info(f"Filtered input DataFrame has {len(filtered_df)} rows before merging.")
-
-
-
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if len(filtered_df) > 0:
-            logging.info(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column to its source for insertion into the target table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName'],  # From input_df
-            'NameColumnInput': filtered_df['aud_nameColumnInput'],  # From input_df
-            'expressionFilterInput': filtered_df['expressionFilter'].apply(
-                lambda x: x.replace("\n", " ") if pd.notna(x) else x
-            ),  # Clean up line breaks
-            'composant': filtered_df['aud_componentName'],  # From input_df
-            'NameProject': filtered_df['NameProject'],  # Common column
-            'NameJob': filtered_df['NameJob'],  # Common column
-        })
-
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Drop rows with NaN in critical columns
-        critical_columns = [
-            'rowName', 'NameColumnInput', 'expressionFilterInput', 'composant',
-            'NameProject', 'NameJob'
-        ]
-
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Insert rows into the database in batches
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_txmlmapinputinfilterinput')
-        data_batch = []
-
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinfilterinput', data_batch)
-                    logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinfilterinput', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
-
-        logging.info("Data successfully inserted into `aud_agg_txmlmapinputinfilterinput` table.")
-        # ==============================================================================================
-    #     # Join aud_inputtable_xml.csv & aud_vartable_xml for `aud_agg_txmlmapinputinvar`
-    #     # ==============================================================================================
-        aud_vartablexml_query = config.get_param('agg_queries', 'aud_vartable_xml')
-        logging.info(f"Executing query: {aud_vartablexml_query}")
-        aud_vartablexml_results = db.execute_query(aud_vartablexml_query)
-
-        # Convert the query results into a DataFrame
-        vartablexml_df = pd.DataFrame(aud_vartablexml_results, columns=[
-           'aud_componentName', 'aud_componentValue', 'aud_Var','aud_sizeState', 'aud_nameVar', 'aud_expressionVar', 'aud_type', 'NameProject', 'NameJob'
-        ])
-        logging.info(f"Retrieved {len(vartablexml_df)} rows from aud_vartable.")
-        logging.debug(f"Sample from aud_vartable DataFrame:\n{vartablexml_df.head()}")
-
-        
 
-        # Step 3: Perform an inner join between input_df and vartable_df
-        joined_df = pd.merge(
-            inputxml_df,
-            vartablexml_df,
-            left_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            right_on=['aud_componentValue', 'NameJob', 'NameProject'],
-            how='inner'
-        )
-        logging.info(f"Joined DataFrame has {len(joined_df)} rows.")
-        logging.debug(f"Sample of joined DataFrame:\n{joined_df.head()}")
-
-        # Step 4: Apply additional filtering on the joined DataFrame
-        filtered_df = joined_df[
-            joined_df['aud_expressionVar'].notna() &
-            joined_df.apply(
-                lambda row: f"{row['rowName']}.{row['aud_nameColumnInput']}" in str(row['aud_expressionVar']),
-                axis=1
-            )
-        ]
-        logging.info(f"Filtered DataFrame has {len(filtered_df)} rows.")
-        if not filtered_df.empty:
-            logging.debug(f"Sample of filtered rows:\n{filtered_df.head()}")
-
-        # Map each column for insertion into the 'aud_agg_tmapinputinvar' table
-        mapped_df = pd.DataFrame({
-            'rowName': filtered_df['rowName'],
-            'NameColumnInput': filtered_df['aud_nameColumnInput'],
-            'composant': filtered_df['aud_componentName_x'],
-            'expressionOutput': filtered_df['aud_expressionVar'].apply(lambda x: x.replace("\n", " ") if pd.notna(x) else x),
-            'nameColumnOutput': filtered_df.apply(lambda row: f"{row['aud_Var']}.{row['aud_nameVar']}", axis=1),
-            'NameProject': filtered_df['NameProject'],
-            'NameJob': filtered_df['NameJob']
-        })
-        logging.info(f"Mapped DataFrame has {len(mapped_df)} rows.")
-
-        # Handle NaN values in critical columns
-        critical_columns = ['rowName', 'NameColumnInput', 'composant', 'expressionOutput', 'nameColumnOutput', 'NameProject', 'NameJob']
-        for column in critical_columns:
-            mapped_df[column] = mapped_df[column].where(pd.notna(mapped_df[column]), None)
-        logging.info(f"Rows after handling NaN values: {len(mapped_df)}.")
-
-        # Prepare rows for database insertion
-        data_for_insertion = mapped_df.values.tolist()
-        logging.info(f"Prepared {len(data_for_insertion)} rows for database insertion.")
-
-        # Batch insertion into the database
-        insert_query = config.get_param('insert_agg_queries', 'aud_agg_txmlmapinputinvar')
-        data_batch = []
-        for row in data_for_insertion:
-            data_batch.append(row)
-            # logging.debug(f"Adding row to batch: {row}")
-            if len(data_batch) == batch_size:
-                try:
-                    db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinvar', data_batch)
-                    logging.info(f"Inserted batch of {len(data_batch)} rows.")
-                except Exception as e:
-                    logging.warning(f"Error inserting batch: {str(e)}")
-                data_batch.clear()
-
-        # Insert remaining rows
-        if data_batch:
-            try:
-                db.insert_data_batch(insert_query, 'aud_agg_txmlmapinputinvar', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows.")
-            except Exception as e:
-                logging.warning(f"Error inserting remaining batch: {str(e)}")
-
-        logging.info("Filtered and joined data successfully inserted into the 'aud_agg_txmlmapinputinvar' table.")
-
-      
-    # # ===================================================================================================
-    # # Catching lookup inner join reject for `aud_agg_txmlmapcolumunused`
-    # # ===================================================================================================
-        def catch_inner_join_rejects(left_df, right_df, left_join_keys, right_join_keys):
-            """
-            Detects rows rejected from the left DataFrame during an inner join.
-
-            Parameters:
-                left_df (pd.DataFrame): The left DataFrame for the join.
-                right_df (pd.DataFrame): The right DataFrame for the join.
-                left_join_keys (list or str): The columns to use as join keys from the left DataFrame.
-                right_join_keys (list or str): The columns to use as join keys from the right DataFrame.
-
-            Returns:
-                pd.DataFrame: A DataFrame containing all rejected rows from the left DataFrame.
-            """
-            logging.info("Starting inner join rejection detection.")
-            logging.debug(f"Left DataFrame shape: {left_df.shape}")
-            logging.debug(f"Left DataFrame preview:\n{left_df.head()}")
-
-            logging.debug(f"Right DataFrame shape: {right_df.shape}")
-            logging.debug(f"Right DataFrame preview:\n{right_df.head()}")
-
-            # Perform a left join to detect left rejects
-            logging.info("Performing left join to detect rows rejected from the left DataFrame.")
-            left_join_df = pd.merge(
-                left_df,
-                right_df,
-                left_on=left_join_keys,
-                right_on=right_join_keys,
-                how='outer',
-                indicator=True  # Adds a '_merge' column to indicate join status
-            )
+            with open(inputxml_csv_path, mode='w', newline='', encoding='utf-8') as input_csvfile:
+                writer = csv.writer(input_csvfile)
+                writer.writerow(input_csv_header)
+                for rows in db.stream_query(aud_inputtable_xml_query, params):
+                    writer.writerows(rows)
+
+            logger.info("Input table results written to %s", inputxml_csv_path)
+
+            # Step 3: Execute outputtable XML query and write to CSV
+            aud_outputtable_xml_query, params = agg_query(config, 'aud_outputtable_xml', jobs)
+            logger.info("Executing query: %s", aud_outputtable_xml_query)
+
+            outputxml_csv_path = os.path.join(directory_path, "outputtable_xml.csv")
+            output_csv_header = [
+                'aud_nameColumnInput', 'aud_type', 'aud_xpathColumnInput', 'aud_nameRowOutput', 
+                'aud_componentName', 'aud_componentValue', 'filterOutGoingConnections', 
+                'outgoingConnections', 'NameJob', 'NameProject', 'exec_date', 'expression', 
+                'activateCondensedTool', 'activateExpressionFilter', 'expressionFilter', 
+                'filterIncomingConnections'
+            ]
 
-            # Detect left rejects (rows that don't match the right DataFrame)
-            left_rejects = left_join_df[left_join_df['_merge'] == 'left_only'].drop(columns=['_merge'])
-            
-            # Optionally, remove duplicates if you expect overlaps
-            all_rejects = left_rejects.drop_duplicates()
-
-            logging.debug(f"Total rejects detected: {len(all_rejects)}.")
-            logging.debug(f"Rejects sample:\n{all_rejects.head()}")
-
-            logging.info("Finished inner join rejection detection.")
-            return all_rejects
-
-        # Step 1: Execute aud_agg_txmlmapinputinoutput query to retrieve data
-        aud_agg_txmlmapinputinoutput_query = config.get_param('agg_queries', 'aud_agg_txmlmapinputinoutput')
-        logging.info(f"Executing query: {aud_agg_txmlmapinputinoutput_query}")
-        aud_agg_txmlmapinputinoutput_results = db.execute_query(aud_agg_txmlmapinputinoutput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_txmlmapinputinoutput_df = pd.DataFrame(
-            aud_agg_txmlmapinputinoutput_results,
-            columns=['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_txmlmapinputinoutput_df)} rows from aud_agg_txmlmapinputinoutput.")
-        logging.debug(f"Sample from aud_agg_txmlmapinputinoutput DataFrame:\n{aud_agg_txmlmapinputinoutput_df.head()}")
-
-        # Step 2: Execute aud_agg_txmlmapinputinfilteroutput query to retrieve data
-        aud_agg_txmlmapinputinfilteroutput_query = config.get_param('agg_queries', 'aud_agg_txmlmapinputinfilteroutput')
-        logging.info(f"Executing query: {aud_agg_txmlmapinputinfilteroutput_query}")
-        aud_agg_txmlmapinputinfilteroutput_results = db.execute_query(aud_agg_txmlmapinputinfilteroutput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_txmlmapinputinfilteroutput_df = pd.DataFrame(
-            aud_agg_txmlmapinputinfilteroutput_results,
-            columns=['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_txmlmapinputinfilteroutput_df)} rows from aud_agg_txmlmapinputinfilteroutput.")
-        logging.debug(f"Sample from aud_agg_txmlmapinputinfilteroutput DataFrame:\n{aud_agg_txmlmapinputinfilteroutput_df.head()}")
-
-        # Step 3: Execute aud_agg_txmlmapinputinjoininput query to retrieve data
-        aud_agg_txmlmapinputinjoininput_query = config.get_param('agg_queries', 'aud_agg_txmlmapinputinjoininput')
-        logging.info(f"Executing query: {aud_agg_txmlmapinputinjoininput_query}")
-        aud_agg_txmlmapinputinjoininput_results = db.execute_query(aud_agg_txmlmapinputinjoininput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_txmlmapinputinjoininput_df = pd.DataFrame(
-            aud_agg_txmlmapinputinjoininput_results,
-            columns=['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_txmlmapinputinjoininput_df)} rows from aud_agg_txmlmapinputinjoininput.")
-        logging.debug(f"Sample from aud_agg_txmlmapinputinjoininput DataFrame:\n{aud_agg_txmlmapinputinjoininput_df.head()}")
-
-        # Step 4: Execute aud_agg_txmlmapinputinfilterinput query to retrieve data
-        aud_agg_txmlmapinputinfilterinput_query = config.get_param('agg_queries', 'aud_agg_txmlmapinputinfilterinput')
-        logging.info(f"Executing query: {aud_agg_txmlmapinputinfilterinput_query}")
-        aud_agg_txmlmapinputinfilterinput_results = db.execute_query(aud_agg_txmlmapinputinfilterinput_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_txmlmapinputinfilterinput_df = pd.DataFrame(
-            aud_agg_txmlmapinputinfilterinput_results,
-            columns=['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_txmlmapinputinfilterinput_df)} rows from aud_agg_txmlmapinputinfilterinput.")
-        logging.debug(f"Sample from aud_agg_txmlmapinputinfilterinput DataFrame:\n{aud_agg_txmlmapinputinfilterinput_df.head()}")
-
-        # Step 5: Execute aud_agg_txmlmapinputinvar query to retrieve data
-        aud_agg_txmlmapinputinvar_query = config.get_param('agg_queries', 'aud_agg_txmlmapinputinvar')
-        logging.info(f"Executing query: {aud_agg_txmlmapinputinvar_query}")
-        aud_agg_txmlmapinputinvar_results = db.execute_query(aud_agg_txmlmapinputinvar_query)
-
-        # Convert the query results into a DataFrame
-        aud_agg_txmlmapinputinvar_df = pd.DataFrame(
-            aud_agg_txmlmapinputinvar_results,
-            columns=['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Retrieved {len(aud_agg_txmlmapinputinvar_df)} rows from aud_agg_txmlmapinputinvar.")
-        logging.debug(f"Sample from aud_agg_txmlmapinputinfilterinput DataFrame:\n{aud_agg_txmlmapinputinvar_df.head()}")
- 
-# =========================================================================================================================
-# input_df + aud_agg_txmlmapinputinoutput_df --> rejects + aud_agg_txmlmapinputinfilteroutput_df --> rejects 
-# + aud_agg_txmlmapinputinjoininput_df --> rejects + aud_agg_txmlmapinputinfilterinput_df --> rejects 
-# + aud_agg_txmlmapinputinvar_df --> insert in aud_agg_txmlmapcolumunused
-# =========================================================================================================================
+            with open(outputxml_csv_path, mode='w', newline='', encoding='utf-8') as output_csvfile:
+                writer = csv.writer(output_csvfile)
+                writer.writerow(output_csv_header)
+                for rows in db.stream_query(aud_outputtable_xml_query, params):
+                    writer.writerows(rows)
+
+            logger.info("Output table results written to %s", outputxml_csv_path)
+
+
+
+            logger.info("Reading input and output CSV files...")
+
+            # Read CSV files
+            inputxml_df = pd.read_csv(inputxml_csv_path, encoding='utf-8')
+            outputxml_df = pd.read_csv(outputxml_csv_path, encoding='utf-8')
+            share_key_categories(inputxml_df, outputxml_df)
+            logger.info("Input xml DataFrame columns: %s", inputxml_df.columns)
+            logger.info("Output xml DataFrame columns: %s", outputxml_df.columns)
+
+            logger.info("Successfully read CSV files. Performing inner join...")
+
+            # ==============================================================================================
+            #     Read aud_vartable_xml
+            # ==============================================================================================
+            aud_vartablexml_query, params = agg_query(config, 'aud_vartable_xml', jobs)
+            logger.info("Executing query: %s", aud_vartablexml_query)
+            # Fetch the query results straight into a typed DataFrame
+            vartablexml_df = db.fetch_dataframe(aud_vartablexml_query, params=params, columns=[
+               'aud_componentName', 'aud_componentValue', 'aud_Var','aud_sizeState', 'aud_nameVar', 'aud_expressionVar', 'aud_type', 'NameProject', 'NameJob'
+            ], categorical=CATEGORICAL_COLUMNS)
+            logger.info("Retrieved %s rows from aud_vartable.", len(vartablexml_df))
+            logger.debug("Sample from aud_vartable DataFrame:\n%s", Preview(vartablexml_df))
+            share_key_categories(inputxml_df, vartablexml_df)
+
+            # ==============================================================================================
+            #     Compute the aud_agg_txmlmap* lineage tables of `TXMLMAP_LINEAGE`
+            # ==============================================================================================
+            frames = {'inputxml_df': inputxml_df, 'outputxml_df': outputxml_df, 'vartablexml_df': vartablexml_df}
+            used = []
+            for spec in TXMLMAP_LINEAGE:
+                mapped_df = run_lineage(config, db, batch_size, spec, **frames)
+                if spec.target in TXMLMAP_USED_COLUMN_TABLES:
+                    # The used columns are taken from the rows just inserted, not read back from the table
+                    used.append(_txmlmap_used_columns(mapped_df, spec.target))
+                    logger.info("%s used columns from %s.", len(used[-1]), spec.target)
+
+        # # ===================================================================================================
+        # # Catching lookup inner join reject for `aud_agg_txmlmapcolumunused`
+        # # ===================================================================================================
+            # Step 1: Prepare input DataFrame
+            inputxml_df = inputxml_df[TXMLMAP_USED_COLUMN_KEYS]
+            share_key_categories(inputxml_df, *used)
+
+            # Step 2: Detect the input columns matching none of the used columns
+            final = unused_rows(inputxml_df, used, TXMLMAP_USED_COLUMN_KEYS)
+            logger.info("Reject detection completed. Rejects: %s rows.", len(final))
+
+            # Step 3: Insert rejects into aud_agg_txmlmapcolumunused
+            if final.empty:
+                logger.info("No data to insert into aud_agg_txmlmapcolumunused.")
+            else:
+                insert_frame(config, db, batch_size, 'aud_agg_txmlmapcolumunused', final)
+
+
+    # =========================================================================================================================
+    # Execute aud_inputtable_nb query and insert into aud_agg_tmapinput
+    # =========================================================================================================================
+
+            # Step 1: Execute the query
+            aud_inputtable_xml_nb_query, params = agg_query(config, 'aud_inputtable_xml_nb', jobs)
+            logger.info("Executing query: %s", aud_inputtable_xml_nb_query)
 
-        # Step 1: Prepare input DataFrame
-        inputxml_df = inputxml_df[['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']]
-
-        # Step 2: Sequential joins to detect rejects
-        logging.info("Starting the sequential reject detection process.")
-        df = catch_inner_join_rejects(
-            inputxml_df, aud_agg_txmlmapinputinoutput_df, 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob'], 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"First join completed. Rejects: {len(df)} rows.")
-
-        df1 = catch_inner_join_rejects(
-            df, aud_agg_txmlmapinputinfilteroutput_df, 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob'], 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Second join completed. Rejects: {len(df1)} rows.")
-
-        df2 = catch_inner_join_rejects(
-            df1, aud_agg_txmlmapinputinjoininput_df, 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob'], 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Third join completed. Rejects: {len(df2)} rows.")
-
-        df3 = catch_inner_join_rejects(
-            df2, aud_agg_txmlmapinputinfilterinput_df, 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob'], 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Fourth join completed. Rejects: {len(df3)} rows.")
-
-        final = catch_inner_join_rejects(
-            df3, aud_agg_txmlmapinputinvar_df, 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob'], 
-            ['aud_nameColumnInput','rowName',  'aud_componentName', 'NameProject', 'NameJob']
-        )
-        logging.info(f"Final join completed. Rejects: {len(final)} rows.")
-
-        # Step 3: Insert rejects into aud_agg_txmlmapcolumunused
-        if final.empty:
-            logging.info("No data to insert into aud_agg_txmlmapcolumunused.")
-        else:
             try:
-                # Adjust insert_query as needed
-                insert_query = config.get_param('insert_agg_queries', 'aud_agg_txmlmapcolumunused')
-                # Convert final DataFrame to list of tuples for batch insertion
-                data_batch = final.to_records(index=False).tolist()
-                
-                db.insert_data_batch(insert_query, 'aud_agg_txmlmapcolumunused', data_batch)
-                logging.info(f"Inserted final batch of {len(data_batch)} rows into aud_agg_txmlmapcolumunused.")
+                # Execute the query and fetch results
+                aud_inputtable_xml_nb_results = db.execute_query(aud_inputtable_xml_nb_query, params)
+                logger.info("Query executed successfully. Number of rows retrieved: %s", len(aud_inputtable_xml_nb_results))
             except Exception as e:
-                logging.warning(f"Error inserting final batch into aud_agg_txmlmapcolumunused: {str(e)}")
+                logger.error("Error executing query aud_inputtable_xml_nb: %s", e)
+                raise
 
-
-# =========================================================================================================================
-# Execute aud_inputtable_nb query and insert into aud_agg_tmapinput
-# =========================================================================================================================
-
-        # Step 1: Execute the query
-        aud_inputtable_xml_nb_query = config.get_param('agg_queries', 'aud_inputtable_xml_nb')
-        logging.info(f"Executing query: {aud_inputtable_xml_nb_query}")
-
-        try:
-            # Execute the query and fetch results
-            aud_inputtable_xml_nb_results = db.execute_query(aud_inputtable_xml_nb_query)
-            logging.info(f"Query executed successfully. Number of rows retrieved: {len(aud_inputtable_xml_nb_results)}")
-        except Exception as e:
-            logging.error(f"Error executing query aud_inputtable_xml_nb: {str(e)}")
-            raise
-
-        # Step 2: Insert query results into aud_agg_txmlmapinput
-        if len(aud_inputtable_xml_nb_results)==0 :
-            logging.info("No data to insert into aud_agg_txmlmapinput.")
-        else:
-            try:
+            # Step 2: Insert query results into aud_agg_txmlmapinput
+            if len(aud_inputtable_xml_nb_results)==0 :
+                logger.info("No data to insert into aud_agg_txmlmapinput.")
+            else:
                 # Fetch the insert query dynamically
                 insert_query = config.get_param('insert_agg_queries', 'aud_agg_txmlmapinput')
-                logging.info(f"Using insert query: {insert_query}")
+                logger.info("Using insert query: %s", insert_query)
 
-                # Convert the query results to a list of tuples for batch insertion
-                
                 # Perform batch insertion
-                db.insert_data_batch(insert_query, 'aud_agg_txmlmapinput', aud_inputtable_xml_nb_results)
-                logging.info(f"Inserted {len(aud_inputtable_xml_nb_results)} rows into aud_agg_txmlmapinput successfully.")
-            except Exception as e:
-                logging.error(f"Error inserting data into aud_agg_txmlmapinput: {str(e)}")
+                data_batch = db.batcher(insert_query, 'aud_agg_txmlmapinput', initial_size=batch_size)
+                data_batch.extend(aud_inputtable_xml_nb_results)
+                data_batch.flush()
+                logger.info("Inserted %s rows into aud_agg_txmlmapinput successfully.", len(aud_inputtable_xml_nb_results))
 
 
 
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
 
 
 
@@ -2,7 +2,19 @@
 import jaydebeapi
 from config import Config  # Assuming Config class is defined in config.py
 import logging
+import metrics
 import csv
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import accumulate, islice
+
+logger = logging.getLogger(__name__)
+
+# Serializes the writes to the reject files, shared by the connections cloned for stage threads
+_reject_lock = threading.Lock()
+
 # import csv
 # import os
 # import glob
@@ -12,6 +24,128 @@ import csv
 # import sqlite3
 
 
+class InsertBatcher:
+    """
+    Accumulates the rows of one insert statement and sends them to the database in batches.
+
+    A batch is flushed as soon as it reaches the current row count, its estimated byte size
+    exceeds `max_bytes`, or its oldest row has waited `max_wait` seconds. After each flush the
+    row count is adapted to the measured round trip: it doubles while a batch takes less than half
+    of `target_latency` and halves when it takes longer, within [min_size, max_size]. The sizes
+    chosen for each table are kept in `metrics` (and in `Database.batch_metrics`).
+    """
+
+    def __init__(self, db, insert_query, table_name, initial_size=100, min_size=10, max_size=5000,
+                 max_bytes=4 * 1024 * 1024, target_latency=0.5, max_wait=5.0):
+        self.db = db
+        self.insert_query = insert_query
+        self.table_name = table_name
+        self.size = initial_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.max_wait = max_wait
+        self.rows = []
+        self.pending_bytes = 0
+        self.first_row_time = None
+        self.metrics = {
+            'rows': 0, 'batches': 0, 'bytes': 0, 'seconds': 0.0,
+            'initial_size': initial_size, 'min_size_used': None, 'max_size_used': None, 'last_size': initial_size,
+        }
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    @staticmethod
+    def _row_bytes(row):
+        """Rough size of a row on the wire: string lengths plus 8 bytes per other value."""
+        return sum(len(value) if isinstance(value, str) else 8 for value in row)
+
+    def _due(self):
+        """Whether the pending rows reached a flush threshold."""
+        return (
+            len(self.rows) >= self.size
+            or self.pending_bytes >= self.max_bytes
+            or time.monotonic() - self.first_row_time >= self.max_wait
+        )
+
+    def append(self, row):
+        """Add a row, flushing the pending rows first when a threshold is reached."""
+        if not self.rows:
+            self.first_row_time = time.monotonic()
+        self.rows.append(row)
+        self.pending_bytes += self._row_bytes(row)
+        if self._due():
+            self.flush()
+
+    def extend(self, rows):
+        """
+        Add several rows, see `append`. The rows are added by slices ending at the next flush
+        threshold instead of one at a time, so the batches are the same as with `append`.
+        """
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, max(self.size - len(self.rows), 1)))
+            if not chunk:
+                return
+            while chunk:
+                if not self.rows:
+                    self.first_row_time = time.monotonic()
+                sizes = list(accumulate(map(self._row_bytes, chunk)))
+                # Up to the row reaching max_bytes, within the rows left before the batch size
+                end = min(
+                    bisect_left(sizes, self.max_bytes - self.pending_bytes) + 1,
+                    max(self.size - len(self.rows), 1),
+                    len(chunk)
+                )
+                self.rows.extend(chunk[:end])
+                self.pending_bytes += sizes[end - 1]
+                chunk = chunk[end:]
+                if self._due():
+                    self.flush()
+
+    def flush(self):
+        """Insert the pending rows and adapt the batch size to the measured latency."""
+        if not self.rows:
+            return
+        batch_rows = len(self.rows)
+        start_time = time.monotonic()
+        self.db.insert_data_batch(self.insert_query, self.table_name, self.rows)
+        elapsed = time.monotonic() - start_time
+
+        metrics = self.metrics
+        metrics['rows'] += batch_rows
+        metrics['batches'] += 1
+        metrics['bytes'] += self.pending_bytes
+        metrics['seconds'] += elapsed
+        if metrics['min_size_used'] is None or batch_rows < metrics['min_size_used']:
+            metrics['min_size_used'] = batch_rows
+        if metrics['max_size_used'] is None or batch_rows > metrics['max_size_used']:
+            metrics['max_size_used'] = batch_rows
+
+        # Only full batches say something about the round trip of a batch of `size` rows
+        if batch_rows >= self.size:
+            if elapsed < self.target_latency / 2:
+                self.size = min(self.size * 2, self.max_size)
+            elif elapsed > self.target_latency:
+                self.size = max(self.size // 2, self.min_size)
+        metrics['last_size'] = self.size
+
+        self.rows = []
+        self.pending_bytes = 0
+        self.first_row_time = None
+
+
 class Database:
     def __init__(self, db_config):
         """
@@ -24,6 +158,10 @@ class Database:
         self.connection = None
         self.cursor = None
         self.jdbc_params = None  # Initialize jdbc_params
+        self.batch_metrics = {}  # table_name -> metrics of the InsertBatcher used for that table
+        self._transaction = None  # State of the unit of work opened by transaction(), if any
+        self.reject_file = None  # CSV file receiving the rows an insert rejected; logged when None
+        self.fetch_size = 10000  # Rows per chunk returned by stream_query
 
     def set_jdbc_parameters(self, jdbc_params):
         self.jdbc_params = jdbc_params
@@ -50,11 +188,13 @@ class Database:
             if not all([jdbc_driver, jdbc_url, jdbc_user, jdbc_password, jdbc_jar]):
                 raise ValueError("Missing one or more JDBC parameters")
 
-            # Print JDBC parameters for debugging
-            print(f"JDBC Driver: {jdbc_driver}")
-            print(f"JDBC URL: {jdbc_url}")
-            print(f"JDBC User: {jdbc_user}")
-            print(f"JDBC JAR: {jdbc_jar}")
+            fetch_size = jdbc_params.get('AUDIT_JDBC_fetchSize')
+            if fetch_size:
+                self.fetch_size = int(fetch_size)
+                # Let MySQL send result sets through a server-side cursor, `fetch_size` rows at a time
+                if 'useCursorFetch' not in jdbc_url:
+                    separator = '&' if '?' in jdbc_url else '?'
+                    jdbc_url = f"{jdbc_url}{separator}useCursorFetch=true&defaultFetchSize={self.fetch_size}"
 
             # Connect to the database
             self.connection = jaydebeapi.connect(jdbc_driver, jdbc_url, [jdbc_user, jdbc_password], jdbc_jar)
@@ -63,13 +203,27 @@ class Database:
 
 
         except ValueError as e:
-            print(f"Configuration error: {e}")
+            logger.error("JDBC configuration error: %s", e, exc_info=True)
             raise
         except Exception as e:
-            print(f"Error connecting to database: {e}")
+            logger.error("Error connecting to database: %s", e, exc_info=True)
             raise
         
    
+    def clone(self):
+        """
+        Opens a new connection with the same parameters, for work running in another thread.
+
+        Returns:
+        - Database: A connected Database sharing this one's reject file and batch metrics.
+        """
+        clone = Database(self.db_config)
+        clone.set_jdbc_parameters(self.jdbc_params)
+        clone.reject_file = self.reject_file
+        clone.batch_metrics = self.batch_metrics
+        clone.connect_JDBC()
+        return clone
+
     def insert_metadata(self, table_name, data_batch):
             """
         Insert data into the specified table in batches.
@@ -117,12 +271,12 @@ class Database:
                         try:
                             cursor.execute(insert_query, row)
                         except Exception as e:
-                            logging.warning(f"Skipping row due to error: {e}, row data: {row}")
+                            logger.warning("Skipping row due to error: %s, row data: %s", e, row)
                     self.connection.commit()  # Ensure the changes are committed
                     # logging.info(f"Batch inserted data into {table_name}: {len(data_batch)} rows.")
             except Exception as e:
                 self.connection.rollback()  # Rollback in case of a major error
-                logging.error(f"Error during batch insert into {table_name}: {e}", exc_info=True)
+                logger.error("Error during batch insert into %s: %s", table_name, e, exc_info=True)
 
                 
     def execute_query(self, query, params=None):
@@ -144,35 +298,123 @@ class Database:
             raise ValueError("Database connection is not established. Call connect() method first.")
 
         try:
-            self.cursor.execute(query, params or ())
-            return self.cursor.fetchall()
+            with metrics.timer('query_seconds', queries=1):
+                self.cursor.execute(query, params or ())
+                results = self.cursor.fetchall()
+            metrics.record(rows_read=len(results))
+            return results
 
         except Exception as e:
-            print(f"Error executing SELECT query: {e}")
+            logger.error("Error executing SELECT query: %s", e, exc_info=True)
             raise  # Re-raise the exception for further handling or debugging
 
 
 
+    def stream_query(self, query, params=None, chunk_size=None):
+        """
+        Executes a SELECT SQL query and yields its results chunk by chunk.
+
+        Unlike `execute_query`, the result set is never held whole in memory: rows are read with
+        `fetchmany` on a dedicated cursor and, when the connection was opened with a fetch size
+        (`AUDIT_JDBC_fetchSize`), MySQL keeps the result set on the server behind a cursor.
+
+        Args:
+        - query (str): SQL SELECT query to be executed.
+        - params (tuple, optional): Parameters to be used with the query, if applicable. Defaults to None.
+        - chunk_size (int, optional): Number of rows per chunk. Defaults to `fetch_size`.
+
+        Yields:
+        - list: The next chunk of result tuples.
+
+        Raises:
+        - ValueError: If the database connection is not established.
+        """
+        if not self.connection:
+            raise ValueError("Database connection is not established. Call connect() method first.")
+
+        chunk_size = chunk_size or self.fetch_size
+        cursor = self.connection.cursor()
+        # Only the time spent in the driver counts, not the time the caller spends on each chunk
+        seconds, rows_read = 0.0, 0
+        try:
+            start_time = time.perf_counter()
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                seconds += time.perf_counter() - start_time
+                if not rows:
+                    break
+                rows_read += len(rows)
+                yield rows
+                start_time = time.perf_counter()
+        except Exception as e:
+            logger.error("Error executing SELECT query: %s", e, exc_info=True)
+            raise
+        finally:
+            cursor.close()
+            metrics.record(queries=1, query_seconds=seconds, rows_read=rows_read)
+
+    def fetch_dataframe(self, query, columns, dtypes=None, categorical=(), params=None, chunk_size=None):
+        """
+        Executes a SELECT SQL query and returns its results as a pandas DataFrame.
+
+        The rows are streamed with `stream_query` and transposed chunk by chunk into one list per
+        column, so the result is never held as a list of row tuples; each column is then converted
+        once, to its declared dtype or a pandas categorical.
+
+        Args:
+        - query (str): SQL SELECT query to be executed.
+        - columns (list of str): Names of the columns returned by the query, in order.
+        - dtypes (dict, optional): Column name -> dtype. Columns left out get the inferred dtype.
+        - categorical (iterable of str, optional): Columns to load as categoricals (e.g. NameProject,
+          NameJob); names that are not in `columns` are ignored.
+        - params (tuple, optional): Parameters to be used with the query, if applicable. Defaults to None.
+        - chunk_size (int, optional): Number of rows per fetched chunk. Defaults to `fetch_size`.
+
+        Returns:
+        - DataFrame: The query results.
+
+        Raises:
+        - ValueError: If the query does not return as many columns as `columns` lists.
+        """
+        import pandas as pd  # Only needed by callers working with DataFrames
+
+        data = [[] for _ in columns]
+        for rows in self.stream_query(query, params, chunk_size):
+            if len(rows[0]) != len(columns):
+                raise ValueError(f"Query returned {len(rows[0])} columns, {len(columns)} expected: {columns}")
+            for values, column_values in zip(data, zip(*rows)):
+                values.extend(column_values)
+
+        dtypes = dict(dtypes or {})
+        dtypes.update(dict.fromkeys((column for column in categorical if column in columns), 'category'))
+        return pd.DataFrame({
+            column: pd.Series(values, dtype=dtypes.get(column)) for column, values in zip(columns, data)
+        }, columns=list(columns))
+
     def delete_records_batch(self, table_name, conditions_batch):
         try:
-            with self.connection.cursor() as cursor:
+            rows_deleted = 0
+            with metrics.timer('delete_seconds', table_name), self.connection.cursor() as cursor:
                 for conditions in conditions_batch:
                     condition_clauses = " AND ".join([f"{column} = '{value}'" for column, value in conditions.items()])
                     sql = f"DELETE FROM {table_name} WHERE {condition_clauses}"
                     
  
                     cursor.execute(sql)
+                    rows_deleted += max(cursor.rowcount, 0)  # -1 when the driver does not know
                     
-            self.connection.commit()
+            self._commit(len(conditions_batch))
+            metrics.record(table_name, rows_deleted=rows_deleted)
             
             # Logging successful batch delete
             # logging.info(f"Successfully deleted records from {table_name} for {len(conditions_batch)} conditions.")
         
         except Exception as e:
+            if not self._rollback():
+                raise
             # Logging error during batch delete
-            logging.error(f"Error during batch delete from {table_name}: {e}")
-            
-            self.connection.rollback()
+            logger.error("Error during batch delete from %s: %s", table_name, e)
 
 
 
@@ -196,33 +438,204 @@ class Database:
             else:
                 return None  # Handle case where no results are returned
         except Exception as e:
-            print(f"Error executing query to get execution date: {str(e)}")
+            logger.error("Error executing query to get execution date: %s", e, exc_info=True)
             return None
 
-            print(f"Error committing transaction: {str(e)}")
-
 
     def insert_data_batch(self, insert_query, table_name, data_batch):
             """
             Insert data into the specified table in batches.
 
+            The batch is sent with one `executemany` (a JDBC executeBatch). When it fails, it is rolled
+            back to a savepoint and split in two halves that are retried the same way, until the rows
+            failing on their own are isolated: those go to the reject file with their error while the
+            rest of the batch is inserted (k bad rows cost O(k log n) statements).
+
             Args:
                 insert_query (str): The SQL insert query.
                 table_name (str): The name of the table where data will be inserted.
                 data_batch (list of tuples): A list of tuples containing the data to be inserted.
             """
             try:
-                with self.connection.cursor() as cursor:
-                    for row in data_batch:
-                        try:
-                            cursor.execute(insert_query, row)
-                        except Exception as e:
-                            logging.warning(f"Skipping row due to error: {e}, row data: {row}")
-                    self.connection.commit()  # Ensure the changes are committed
-                    # logging.info(f"Batch inserted data into {table_name}: {len(data_batch)} rows.")
+                with metrics.timer('insert_seconds', table_name, batches=1), self.connection.cursor() as cursor:
+                    rejected = self._execute_bisecting(cursor, insert_query, list(data_batch))
+                if rejected:
+                    self._reject(table_name, rejected)
+                self._commit(len(data_batch) - len(rejected))  # Commit, or count the rows when inside a transaction
+                metrics.record(table_name, rows_inserted=len(data_batch) - len(rejected), rows_rejected=len(rejected))
+                # logging.info(f"Batch inserted data into {table_name}: {len(data_batch)} rows.")
             except Exception as e:
-                self.connection.rollback()  # Rollback in case of a major error
-                logging.error(f"Error during batch insert into {table_name}: {e}", exc_info=True)
+                if not self._rollback():  # Rollback in case of a major error
+                    raise
+                logger.error("Error during batch insert into %s: %s", table_name, e, exc_info=True)
+
+    def _execute_bisecting(self, cursor, insert_query, rows):
+        """
+        Execute an insert for all the rows, bisecting the batches that fail.
+
+        Args:
+            cursor: The cursor to execute the statements with.
+            insert_query (str): The SQL insert query.
+            rows (list of tuples): The rows to insert.
+
+        Returns:
+            list of tuples: (row, error) for every row that could not be inserted.
+        """
+        jconn = self.connection.jconn
+        rejected = []
+        pending = [rows]  # Chunks still to insert, the next one last
+        while pending:
+            chunk = pending.pop()
+            if not chunk:
+                continue
+            savepoint = jconn.setSavepoint()
+            try:
+                if len(chunk) == 1:
+                    cursor.execute(insert_query, chunk[0])
+                else:
+                    cursor.executemany(insert_query, chunk)
+            except Exception as e:
+                # Part of the chunk may have been executed before the failing row
+                jconn.rollback(savepoint)
+                if len(chunk) == 1:
+                    rejected.append((chunk[0], e))
+                else:
+                    middle = len(chunk) // 2
+                    pending.append(chunk[middle:])
+                    pending.append(chunk[:middle])
+            jconn.releaseSavepoint(savepoint)
+        return rejected
+
+    def _reject(self, table_name, rejected):
+        """
+        Record the rows an insert could not write.
+
+        The rows are appended to `reject_file` as CSV lines (table name, error, row values), or
+        logged one by one when no reject file is set. The rows of a batch are written under a
+        module-wide lock, so batches rejected by concurrent connections do not interleave.
+
+        Args:
+            table_name (str): The name of the table the rows were meant for.
+            rejected (list of tuples): (row, error) pairs returned by `_execute_bisecting`.
+        """
+        if not self.reject_file:
+            for row, error in rejected:
+                logger.warning("Skipping row due to error: %s, row data: %s", error, row)
+            return
+        with _reject_lock, open(self.reject_file, 'a', newline='', encoding='utf-8') as reject_file:
+            writer = csv.writer(reject_file)
+            writer.writerows([table_name, str(error), *row] for row, error in rejected)
+        logger.warning("%s rows rejected by %s, written to %s.", len(rejected), table_name, self.reject_file)
+
+    @contextmanager
+    def transaction(self, savepoint_rows=None):
+        """
+        Run the deletes and inserts of a job as one unit of work.
+
+        The batch methods (insert_data_batch, delete_records_batch, truncate_table and the
+        InsertBatcher flushes) stop committing on their own: everything is committed once when the
+        block exits, or rolled back if it raises or `rollback()` is called, so readers only ever see
+        the table before or after the job.
+
+        Args:
+            savepoint_rows (int, optional): When set, a savepoint is taken every `savepoint_rows`
+                written rows and a failing batch only rolls back to the last savepoint, keeping the
+                rows written before it. Defaults to None (a failing batch aborts the whole transaction).
+
+        Yields:
+            Database: This database, for `with db.transaction() as db:` style use.
+        """
+        if self._transaction is not None:
+            # Nested blocks join the enclosing transaction
+            yield self
+            return
+
+        savepoint = self.connection.jconn.setSavepoint() if savepoint_rows else None
+        self._transaction = {'savepoint_rows': savepoint_rows, 'rows': 0, 'savepoint': savepoint, 'failed': False}
+        try:
+            yield self
+            if self._transaction['failed']:
+                self.connection.rollback()
+                logger.warning("Transaction rolled back.")
+            else:
+                self.connection.commit()
+                metrics.record(commits=1)
+        except BaseException:
+            self.connection.rollback()
+            logger.warning("Transaction rolled back.")
+            raise
+        finally:
+            self._transaction = None
+
+    def rollback(self):
+        """
+        Roll back the current work.
+
+        Inside `transaction()` the whole transaction is rolled back and nothing more is committed
+        when its block exits; outside of it, the uncommitted changes of the connection are dropped.
+        """
+        self.connection.rollback()
+        if self._transaction is not None:
+            self._transaction.update(failed=True, rows=0, savepoint=None)
+
+    def _commit(self, rows=0):
+        """Commit, or inside a transaction count the written rows and move the savepoint."""
+        transaction = self._transaction
+        if transaction is None:
+            self.connection.commit()
+            metrics.record(commits=1)
+            return
+        transaction['rows'] += rows
+        if transaction['savepoint_rows'] and transaction['rows'] >= transaction['savepoint_rows']:
+            jconn = self.connection.jconn
+            # Only the last savepoint is ever rolled back to. It is released before the new one is
+            # set, since InnoDB also drops the savepoints set after a released one.
+            if transaction['savepoint'] is not None:
+                jconn.releaseSavepoint(transaction['savepoint'])
+            transaction['savepoint'] = jconn.setSavepoint()
+            transaction['rows'] = 0
+
+    def _rollback(self):
+        """
+        Undo a failed batch.
+
+        Returns:
+            bool: False when the failure has to abort the enclosing transaction (no savepoint to
+            roll back to), True once the batch has been rolled back.
+        """
+        transaction = self._transaction
+        if transaction is None:
+            self.connection.rollback()
+            return True
+        if transaction['savepoint'] is None:
+            return False
+        self.connection.jconn.rollback(transaction['savepoint'])
+        transaction['rows'] = 0
+        return True
+
+    def batcher(self, insert_query, table_name, initial_size=100, **options):
+        """
+        Create an InsertBatcher for the given insert statement.
+
+        Args:
+            insert_query (str): The SQL insert query.
+            table_name (str): The name of the table where data will be inserted.
+            initial_size (int): Number of rows of the first batch. Defaults to 100.
+            **options: Other InsertBatcher thresholds (min_size, max_size, max_bytes, target_latency, max_wait).
+
+        Returns:
+            InsertBatcher: A batcher to `append` rows to and `flush` at the end of the job.
+        """
+        batcher = InsertBatcher(self, insert_query, table_name, initial_size=initial_size, **options)
+        self.batch_metrics[table_name] = batcher.metrics
+        return batcher
+
+    def log_batch_metrics(self):
+        """Log the batch sizes chosen for each table during the run."""
+        for table_name, metrics in self.batch_metrics.items():
+            logger.info(
+                "Batches for %s: %s rows in %s batches (%s bytes, %.2fs), sizes %s-%s, last target %s", table_name, metrics['rows'], metrics['batches'], metrics['bytes'], metrics['seconds'], metrics['min_size_used'], metrics['max_size_used'], metrics['last_size']
+            )
 
     def insert_from_csv_batch(self, csv_file_path, table_name, batch_size):
         """
@@ -231,34 +644,28 @@ class Database:
         Args:
         - csv_file_path (str): Path to the CSV file.
         - table_name (str): Name of the database table to insert data into.
-        - batch_size (int): Number of rows per batch for insertion. Defaults to 1000.
+        - batch_size (int): Number of rows of the first batch, adapted afterwards (see InsertBatcher).
         """
         try:
             with open(csv_file_path, 'r') as csv_file:
                 csv_reader = csv.reader(csv_file)
                 headers = next(csv_reader)  # Read the header row from the CSV
-                data_batch = []
-                
                 insert_query = f"""
                 INSERT INTO {table_name} ({', '.join(headers)}) 
                 VALUES ({', '.join(['?' for _ in headers])}) ;                
                 """
 
+                data_batch = self.batcher(insert_query, table_name, initial_size=batch_size)
                 for row in csv_reader:
                     data_batch.append(tuple(row))
-                    if len(data_batch) == batch_size:
-                        self.insert_data_batch(insert_query, table_name, data_batch)
-                        data_batch.clear()  # Clear the batch after inserting
 
-                # Insert any remaining data if the last batch is smaller than batch_size
-                if data_batch:
-                    self.insert_data_batch(insert_query, table_name, data_batch)
-                    # logging.info(f"Inserted remaining {len(data_batch)} rows from CSV into {table_name}.")
+                # Insert any remaining data if the last batch is smaller than the batch size
+                data_batch.flush()
 
         except FileNotFoundError as e:
-            logging.error(f"CSV file not found: {e}")
+            logger.error("CSV file not found: %s", e)
         except Exception as e:
-            logging.error(f"Error inserting data from CSV to {table_name}: {e}", exc_info=True)
+            logger.error("Error inserting data from CSV to %s: %s", table_name, e, exc_info=True)
 
     def truncate_table(self, table_name):
         """
@@ -269,14 +676,126 @@ class Database:
         """
         try:
             truncate_query = f"TRUNCATE TABLE {table_name}"
+            if self._transaction is not None:
+                # TRUNCATE commits implicitly: empty the table with a DELETE to keep it in the transaction
+                truncate_query = f"DELETE FROM {table_name}"
             with self.connection.cursor() as cursor:
                 cursor.execute(truncate_query)
-            self.connection.commit()  # Commit the transaction
-            logging.info(f"Table {table_name} has been truncated.")
+            self._commit()  # Commit the transaction
+            logger.info("Table %s has been truncated.", table_name)
         except Exception as e:
-            logging.error(f"Error truncating table {table_name}: {e}", exc_info=True)
-            self.connection.rollback()  # Rollback in case of an error
-                     
+            if not self._rollback():  # Rollback in case of an error
+                raise
+            logger.error("Error truncating table %s: %s", table_name, e, exc_info=True)
+
+    @contextmanager
+    def reload_table(self, table_name, staging=True):
+        """
+        Replace the whole content of a table.
+
+        In staging mode the rows are loaded into `<table_name>_staging`, a copy of the table created
+        with `CREATE TABLE ... LIKE`. Its non-unique secondary indexes are dropped before the load
+        and added back in one `ALTER TABLE` at the end, so InnoDB builds each of them once instead of
+        maintaining them row by row (the primary key and unique indexes are kept so duplicates are
+        still rejected while loading). The two tables are then swapped with a single `RENAME TABLE`.
+        Readers keep seeing the previous content until the swap and never an empty or partial
+        table. If the block raises, the staging table is dropped and the table is left untouched.
+
+        MySQL commits implicitly before each DDL statement, and the load is committed before the
+        indexes are rebuilt: inside `transaction()`, whatever the transaction has pending when the
+        staging table is created and when the block exits is committed with it, and cannot be
+        rolled back by the transaction anymore.
+
+        Without staging the table is truncated and the rows inserted into it directly.
+
+        Args:
+            table_name (str): Name of the table to reload.
+            staging (bool): Load through a staging table. Defaults to True.
+
+        Yields:
+            str: The table the rows have to be inserted into.
+
+        Example:
+            with db.reload_table('aud_doccontextgroup') as target_table:
+                insert_query = insert_query.replace('aud_doccontextgroup', target_table, 1)
+                ...
+        """
+        if not staging:
+            self.truncate_table(table_name)
+            yield table_name
+            return
+
+        staging_table = f"{table_name}_staging"
+        old_table = f"{table_name}_old"
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            cursor.execute(f"CREATE TABLE {staging_table} LIKE {table_name}")
+            indexes = self._secondary_indexes(cursor, staging_table)
+            if indexes:
+                cursor.execute(f"ALTER TABLE {staging_table} " + ", ".join(f"DROP INDEX `{name}`" for name in indexes))
+        if self._transaction is not None and self._transaction['savepoint_rows']:
+            # DDL statements commit implicitly, which releases the savepoints of the transaction
+            self._transaction.update(rows=0, savepoint=self.connection.jconn.setSavepoint())
+        logger.info("Loading %s through %s.", table_name, staging_table)
+
+        try:
+            yield staging_table
+            self.connection.commit()
+            metrics.record(commits=1)
+            with self.connection.cursor() as cursor:
+                if indexes:
+                    cursor.execute(f"ALTER TABLE {staging_table} " + ", ".join(f"ADD {index}" for index in indexes.values()))
+                cursor.execute(f"DROP TABLE IF EXISTS {old_table}")
+                cursor.execute(f"RENAME TABLE {table_name} TO {old_table}, {staging_table} TO {table_name}")
+                cursor.execute(f"DROP TABLE {old_table}")
+            logger.info("Table %s has been swapped with %s.", table_name, staging_table)
+        except BaseException:
+            self.connection.rollback()
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            logger.warning("Staging load of %s failed, the table was left unchanged.", table_name)
+            raise
+
+    @staticmethod
+    def _secondary_indexes(cursor, table_name):
+        """
+        Read the non-unique secondary indexes of a table from `SHOW INDEX`.
+
+        Indexes on expressions are left out: they are kept on the table rather than rebuilt.
+
+        Args:
+            cursor: Cursor to run the statement with.
+            table_name (str): Name of the table.
+
+        Returns:
+            dict: Index name -> definition for `ALTER TABLE ... ADD`, e.g. "INDEX `idx` (`a`, `b`(10))".
+        """
+        cursor.execute(f"SHOW INDEX FROM {table_name}")
+        names = [description[0] for description in cursor.description]
+        columns, index_types, expressions = {}, {}, set()
+        for row in cursor.fetchall():
+            index = dict(zip(names, row))
+            if index['Key_name'] == 'PRIMARY' or str(index['Non_unique']) == '0':
+                continue
+            if index['Column_name'] is None:  # Functional key part
+                expressions.add(index['Key_name'])
+                continue
+            column = f"`{index['Column_name']}`"
+            if index['Sub_part'] is not None:
+                column += f"({index['Sub_part']})"
+            if index['Collation'] == 'D':
+                column += " DESC"
+            columns.setdefault(index['Key_name'], []).append((int(index['Seq_in_index']), column))
+            index_types[index['Key_name']] = index['Index_type']
+
+        indexes = {}
+        for name, key_parts in columns.items():
+            if name in expressions:
+                continue
+            kind = f"{index_types[name]} INDEX" if index_types[name] in ('FULLTEXT', 'SPATIAL') else "INDEX"
+            indexes[name] = f"{kind} `{name}` ({', '.join(column for _, column in sorted(key_parts))})"
+        return indexes
+
     def close(self):
         """
         Closes the cursor and database connection.
@@ -287,7 +806,7 @@ class Database:
             if self.connection:
                 self.connection.close()
         except Exception as e:
-            print(f"Error closing database connection: {str(e)}")
+            logger.error("Error closing database connection: %s", e, exc_info=True)
     
 
 
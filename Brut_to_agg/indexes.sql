@@ -0,0 +1,6 @@
+-- Optional indexes supporting the agg_queries of config.yaml (MySQL).
+-- Run once against the audit database, e.g. mysql sqops_dataraise < indexes.sql
+
+-- agg_queries.aud_agg (AUD_404_AGG_TAGGREGATE): range scan of the tAggregate GROUPBYS/OPERATIONS element values
+CREATE INDEX idx_elementvaluenode_aggregate
+    ON aud_elementvaluenode (aud_typeField, aud_componentName, aud_elementRef, NameProject, NameJob, aud_componentValue, aud_id);
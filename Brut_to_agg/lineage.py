@@ -0,0 +1,309 @@
+import logging
+from log_config import Preview
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Values of the bit(1) columns, see `frame_rows`
+BIT_VALUES = {True: 1, False: 0, 'True': 1, 'False': 0}
+
+
+class LineageSpec:
+    """
+    Declarative description of an aud_agg_* lineage table: the frames joined, the joined rows
+    kept and the mapping of those rows to the columns of the table. Specs are run by `run_lineage`.
+
+    Args:
+        target (str): Table the rows are inserted into (key of `insert_agg_queries`).
+        left (str): Name of the left frame.
+        projection (dict): Table column -> source column of the joined frame, or function of the
+            joined frame returning the column values. In the column order of the insert query.
+        right (str, optional): Name of the right frame. Defaults to None (no join, the left frame
+            is filtered and mapped on its own).
+        keys (tuple, optional): Join keys, each a column name of both frames or a
+            (left column, right column) pair. Defaults to ().
+        predicate (callable or tuple, optional): Function of the joined frame returning the boolean
+            mask of the rows to keep, or a tuple of such functions that must all hold. Defaults to
+            None (every row is kept).
+        right_filter (callable, optional): Function of the right frame returning the boolean mask of
+            the rows joined. Defaults to None.
+        right_unique (tuple, optional): Columns the right frame is made unique on before the join,
+            keeping the first row. Defaults to None.
+        bits (tuple, optional): Table columns of type bit(1), see `frame_rows`. Defaults to ().
+    """
+    __slots__ = ('target', 'left', 'projection', 'right', 'keys', 'predicate', 'right_filter', 'right_unique', 'bits')
+
+    def __init__(self, target, left, projection, right=None, keys=(), predicate=None, right_filter=None,
+                 right_unique=None, bits=()):
+        self.target = target
+        self.left = left
+        self.projection = projection
+        self.right = right
+        self.keys = keys
+        self.predicate = predicate
+        self.right_filter = right_filter
+        self.right_unique = right_unique
+        self.bits = bits
+
+    @property
+    def frames(self):
+        """Names of the frames the spec reads."""
+        if self.right is None or self.right == self.left:
+            return (self.left,)
+        return (self.left, self.right)
+
+    def __repr__(self):
+        return f"LineageSpec({self.target!r})"
+
+
+def dotted_name(prefix_column, name_column):
+    """
+    Return a function building the `prefix.name` column names (e.g. `row1.id`, `Var.v`) of a frame.
+
+    Args:
+        prefix_column (str): Column holding the row (or var table) name.
+        name_column (str): Column holding the column (or var) name.
+
+    Returns:
+        callable: Function of a frame returning the names as a Series.
+    """
+    def names(df):
+        return pd.Series(
+            [f"{prefix}.{name}" for prefix, name in zip(df[prefix_column].tolist(), df[name_column].tolist())],
+            index=df.index, dtype=object
+        )
+    return names
+
+
+def contains(expression_column, prefix_column, name_column):
+    """
+    Return a predicate keeping the rows whose expression uses their `prefix.name` column.
+
+    Args:
+        expression_column (str): Column holding the expression.
+        prefix_column (str): Column holding the row (or var table) name.
+        name_column (str): Column holding the column (or var) name.
+
+    Returns:
+        callable: Function of a frame returning the boolean mask. Missing expressions never match.
+    """
+    names = dotted_name(prefix_column, name_column)
+
+    def predicate(df):
+        return pd.Series(
+            [isinstance(expression, str) and name in expression
+             for expression, name in zip(df[expression_column].tolist(), names(df))],
+            index=df.index, dtype=bool
+        )
+    return predicate
+
+
+def filled(column, strip=False):
+    """
+    Return a predicate keeping the rows whose column holds a non-empty string.
+
+    Args:
+        column (str): Column tested.
+        strip (bool, optional): Whether a string made of blanks counts as empty. Defaults to False.
+
+    Returns:
+        callable: Function of a frame returning the boolean mask.
+    """
+    def predicate(df):
+        return pd.Series(
+            [isinstance(value, str) and len(value.strip() if strip else value) != 0 for value in df[column].tolist()],
+            index=df.index, dtype=bool
+        )
+    return predicate
+
+
+def one_line(column):
+    """
+    Return a projection of an expression column with its line breaks replaced by spaces.
+
+    Args:
+        column (str): Column holding the expression.
+
+    Returns:
+        callable: Function of a frame returning the column values.
+    """
+    def project(df):
+        return pd.Series(
+            [value.replace("\n", " ") if isinstance(value, str) else value for value in df[column].tolist()],
+            index=df.index, dtype=object
+        )
+    return project
+
+
+def join_frames(spec, frames):
+    """
+    Join the frames of a spec, filtering and deduplicating the right frame first.
+
+    Args:
+        spec (LineageSpec): The spec.
+        frames (dict): Frame name -> DataFrame.
+
+    Returns:
+        pd.DataFrame: The joined frame (the left frame itself for a spec without right frame).
+    """
+    left_df = frames[spec.left]
+    if spec.right is None:
+        return left_df
+
+    right_df = frames[spec.right]
+    if spec.right_filter is not None:
+        right_df = right_df[spec.right_filter(right_df)]
+    if spec.right_unique is not None:
+        right_df = right_df.drop_duplicates(subset=list(spec.right_unique), keep='first')
+
+    keys = [(key, key) if isinstance(key, str) else key for key in spec.keys]
+    joined_df = pd.merge(
+        left_df,
+        right_df,
+        left_on=[left_key for left_key, _ in keys],
+        right_on=[right_key for _, right_key in keys],
+        how='inner'
+    )
+    logger.info("Inner join of %s and %s resulted in %s rows.", spec.left, spec.right, len(joined_df))
+    return joined_df
+
+
+def map_rows(spec, frames):
+    """
+    Compute the rows of a spec: join, filter and project its frames.
+
+    Args:
+        spec (LineageSpec): The spec.
+        frames (dict): Frame name -> DataFrame.
+
+    Returns:
+        pd.DataFrame: The rows of the target table.
+    """
+    joined_df = join_frames(spec, frames)
+
+    predicates = spec.predicate
+    if callable(predicates):
+        predicates = (predicates,)
+    filtered_df = joined_df
+    for predicate in predicates or ():
+        filtered_df = filtered_df[predicate(filtered_df)]
+    logger.info("Filtered DataFrame has %s rows.", len(filtered_df))
+    if not filtered_df.empty:
+        logger.debug("Sample of filtered rows:\n%s", Preview(filtered_df))
+
+    mapped_df = pd.DataFrame({
+        column: filtered_df[source] if isinstance(source, str) else source(filtered_df)
+        for column, source in spec.projection.items()
+    }, index=filtered_df.index)
+    logger.info("Mapped DataFrame has %s rows.", len(mapped_df))
+    return mapped_df
+
+
+def frame_rows(df, chunk_size=10000, bits=()):
+    """
+    Encode the rows of a frame for an insert, by chunks.
+
+    Each column is converted once to an array of Python objects, missing values (NaN, None, NA)
+    becoming None (NULL); the row tuples are then zipped from those arrays.
+
+    Args:
+        df (pd.DataFrame): The frame, columns in the order of the insert query.
+        chunk_size (int, optional): Number of rows per chunk. Defaults to 10000.
+        bits (tuple, optional): Columns of type bit(1): True/'True' become 1, False/'False' 0 and
+            any other value None. Defaults to ().
+
+    Yields:
+        list of tuples: The rows of the next chunk.
+    """
+    columns = []
+    for position, column in enumerate(df.columns):
+        values = df.iloc[:, position].to_numpy(dtype=object, na_value=None)
+        if column in bits:
+            values = [BIT_VALUES.get(value) for value in values]
+        columns.append(values)
+
+    for start in range(0, len(df), chunk_size):
+        yield list(zip(*(values[start:start + chunk_size] for values in columns)))
+
+
+def insert_frame(config, db, batch_size: int, table_name: str, df, bits=()):
+    """
+    Insert the rows of a frame into an aud_agg_* table, in batches.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance used for the insert.
+        batch_size (int): Number of rows of the first insert batch.
+        table_name (str): Target table (key of `insert_agg_queries`).
+        df (pd.DataFrame): Rows to insert, columns in the order of the insert query.
+        bits (tuple, optional): Columns of type bit(1), see `frame_rows`. Defaults to ().
+    """
+    insert_query = config.get_param('insert_agg_queries', table_name)
+    data_batch = db.batcher(insert_query, table_name, initial_size=batch_size)
+    for rows in frame_rows(df, bits=bits):
+        data_batch.extend(rows)
+    data_batch.flush()
+    logger.info("Inserted %s rows into `%s` table.", len(df), table_name)
+
+
+def run_lineage(config, db, batch_size: int, spec, **frames):
+    """
+    Compute the rows of a spec and insert them into its target table.
+
+    Args:
+        config (Config): Configuration instance for retrieving parameters.
+        db (Database): Database instance used for the insert.
+        batch_size (int): Number of rows of the first insert batch.
+        spec (LineageSpec): The spec.
+        **frames: Frame name -> DataFrame, for the frames of the spec.
+
+    Returns:
+        pd.DataFrame: The inserted rows.
+    """
+    logger.info("Computing %s...", spec.target)
+    mapped_df = map_rows(spec, frames)
+    insert_frame(config, db, batch_size, spec.target, mapped_df, bits=spec.bits)
+    return mapped_df
+
+
+def left_anti_join(left_df, right_df, join_columns):
+    """
+    Return the rows of the left frame matching no row of the right frame (Talend's
+    'catch lookup inner join reject').
+
+    Args:
+        left_df (pd.DataFrame): The left frame.
+        right_df (pd.DataFrame): The right frame.
+        join_columns (list): The join columns, in both frames.
+
+    Returns:
+        pd.DataFrame: The unmatched rows of the left frame, with its columns.
+    """
+    join_columns = list(join_columns)
+    # Only the distinct keys of the right frame are joined, so no left row is duplicated
+    right_keys = right_df[join_columns].drop_duplicates()
+    merged_df = pd.merge(left_df, right_keys, on=join_columns, how='left', indicator=True)
+    unmatched_df = merged_df[merged_df['_merge'] == 'left_only'].drop(columns=['_merge'])
+    logger.info("Found %s unmatched rows after join.", len(unmatched_df))
+    return unmatched_df
+
+
+def unused_rows(input_df, used_dfs, join_columns):
+    """
+    Return the distinct rows of the input frame used by none of the lineage tables.
+
+    Args:
+        input_df (pd.DataFrame): The input columns.
+        used_dfs (iterable of pd.DataFrame): The used columns of each lineage table.
+        join_columns (list): The key columns, in every frame.
+
+    Returns:
+        pd.DataFrame: The unused rows of the input frame.
+    """
+    join_columns = list(join_columns)
+    used_dfs = [used_df[join_columns] for used_df in used_dfs]
+    if used_dfs:
+        # One anti join against all the used keys instead of one per lineage table
+        input_df = left_anti_join(input_df, pd.concat(used_dfs, ignore_index=True), join_columns)
+    return input_df.drop_duplicates()
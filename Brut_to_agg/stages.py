@@ -0,0 +1,67 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from profiling import mark
+
+logger = logging.getLogger(__name__)
+
+
+def run_stages(stages, max_workers=4):
+    """
+    Run a graph of stages in a thread pool, each one as soon as the stages it requires have finished.
+
+    Args:
+        stages (dict): Stage name -> (function, names of the required stages). The function is called
+            with the results of its required stages as keyword arguments named after them.
+        max_workers (int, optional): Number of stages running at the same time. Defaults to 4.
+
+    Returns:
+        dict: Stage name -> result returned by its function.
+
+    Raises:
+        ValueError: If a stage requires an unknown stage or the requirements form a cycle.
+        Exception: The first exception raised by a stage, once the running stages have finished.
+            The stages depending on a failed stage are not run.
+    """
+    for name, (func, requires) in stages.items():
+        unknown = set(requires) - set(stages)
+        if unknown:
+            raise ValueError(f"Stage {name} requires unknown stages: {sorted(unknown)}")
+
+    results = {}
+    pending = dict(stages)
+    running = {}  # future -> (stage name, start time)
+    error = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if error is None:
+                for name, (func, requires) in list(pending.items()):
+                    if all(required in results for required in requires):
+                        del pending[name]
+                        logger.info("Starting stage %s...", name)
+                        inputs = {required: results[required] for required in requires}
+                        running[executor.submit(func, **inputs)] = (name, time.time())
+
+            if not running:
+                if pending and error is None:
+                    raise ValueError(f"Stages with circular requirements: {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, start_time = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    logger.info("Stage %s finished in %.2f seconds", name, time.time() - start_time)
+                    mark(f"stage {name}")
+                except Exception as e:
+                    logger.error("Stage %s failed: %s", name, e, exc_info=True)
+                    error = error or e
+
+    if error is not None:
+        skipped = sorted(pending)
+        if skipped:
+            logger.warning("Stages not run because a stage failed: %s", skipped)
+        raise error
+    return results
@@ -0,0 +1,287 @@
+import re
+import threading
+
+import pandas as pd
+import pytest
+
+from AGGjobs import (
+    AGGREGATE_ELEMENT_COLUMNS, AUD_405_AGG_TMAP, AUD_405_AGG_TXMLMAP, ChangedJobs, _pivot_aggregate_elements, agg_query,
+)
+from database import Database
+
+
+def test_pivot_aggregate_elements_pairs_the_values_of_each_table_row():
+    elements_df = pd.DataFrame([
+        # Group by row 1 of P/J: the function is always GROUPBY
+        ('P', 'J', 'tAggregateRow_1', 'GROUPBYS', 1, 'INPUT_COLUMN', 'city'),
+        ('P', 'J', 'tAggregateRow_1', 'GROUPBYS', 1, 'OUTPUT_COLUMN', 'city_out'),
+        # Operation row 1 of P/J, listed twice by the query
+        ('P', 'J', 'tAggregateRow_1', 'OPERATIONS', 1, 'INPUT_COLUMN', 'amount'),
+        ('P', 'J', 'tAggregateRow_1', 'OPERATIONS', 1, 'OUTPUT_COLUMN', 'total'),
+        ('P', 'J', 'tAggregateRow_1', 'OPERATIONS', 1, 'FUNCTION', 'sum'),
+        ('P', 'J', 'tAggregateRow_1', 'OPERATIONS', 1, 'FUNCTION', 'sum'),
+        # Same aud_id in another job: must not be paired with the values of P/J
+        ('P', 'K', 'tAggregateRow_1', 'OPERATIONS', 1, 'INPUT_COLUMN', 'qty'),
+        ('P', 'K', 'tAggregateRow_1', 'OPERATIONS', 1, 'OUTPUT_COLUMN', 'max_qty'),
+        ('P', 'K', 'tAggregateRow_1', 'OPERATIONS', 1, 'FUNCTION', 'max'),
+        # Operation without output column: dropped
+        ('P', 'K', 'tAggregateRow_1', 'OPERATIONS', 2, 'INPUT_COLUMN', 'qty'),
+        ('P', 'K', 'tAggregateRow_1', 'OPERATIONS', 2, 'FUNCTION', 'min'),
+    ], columns=AGGREGATE_ELEMENT_COLUMNS)
+
+    aggregate_df = _pivot_aggregate_elements(elements_df)
+
+    assert list(aggregate_df.columns) == [
+        'NameProject', 'NameJob', 'aud_componentValue', 'aud_valueElementRef_input',
+        'aud_valueElementRef_output', 'aud_valueElementRef_function'
+    ]
+    assert sorted(map(tuple, aggregate_df.values.tolist())) == [
+        ('P', 'J', 'tAggregateRow_1', 'amount', 'total', 'sum'),
+        ('P', 'J', 'tAggregateRow_1', 'city', 'city_out', 'GROUPBY'),
+        ('P', 'K', 'tAggregateRow_1', 'qty', 'max_qty', 'max'),
+    ]
+
+
+# Rows returned by the agg_queries read by AUD_405_AGG_TMAP
+TMAP_QUERY_ROWS = {
+    'aud_inputtable': [
+        ('row1', 'a', 'row1.a==row2.b', None, 'tMap_1', 'true', 'P', 'J'),
+        ('row1', 'b', None, 'row1.b>0', 'tMap_1', 'false', 'P', 'J'),
+        ('row2', 'b', '', None, 'tMap_1', 'false', 'P', 'J'),
+        ('row1', 'c', None, None, 'tMap_1', 'false', 'P', 'J'),
+        ('row3', 'z', None, None, 'tMap_1', 'false', 'P', 'J'),
+        ('row3', 'z', None, None, 'tMap_1', 'false', 'P', 'K'),
+    ],
+    'aud_outputtable': [
+        ('tMap_1', 'out1', '1', 'false', 'false', 'False', 'row1.a + Var.v', 'x', 'String', 'true', 'true',
+         'row1.b > 1', 'tMap_1', 'P', 'J'),
+        ('tMap_1', 'out1', '1', 'false', 'false', 'False', 'Var.v', 'y', 'String', 'true', 'false',
+         'Var.w', 'tMap_1', 'P', 'J'),
+    ],
+    'aud_vartable': [
+        ('tMap_1', 'Var', 'v', 'row2.b + 1', 'P', 'J'),
+        ('tMap_1', 'Var', 'w', 'row1.c', 'P', 'J'),
+    ],
+    'aud_inputtable_nb': [('P', 'J', 'tMap_1', 3)],
+}
+
+# Rows the tMap lineage tables got before they were described as LineageSpecs (rejectInnerJoin
+# now encoded as a bit)
+TMAP_INSERTED_ROWS = [
+    ('aud_agg_tmapcolumunused', ('row3', 'z', 'tMap_1', 'P', 'J')),
+    ('aud_agg_tmapcolumunused', ('row3', 'z', 'tMap_1', 'P', 'K')),
+    ('aud_agg_tmapinput', ('P', 'J', 'tMap_1', '3')),
+    ('aud_agg_tmapinputinfilterinput', ('row1', 'b', 'row1.b>0', 'tMap_1', 'P', 'J')),
+    ('aud_agg_tmapinputinfilteroutput', ('row1', 'b', 'tMap_1', 'row1.b > 1', 'out1', 'False', 'False', 'P', 'J')),
+    ('aud_agg_tmapinputinjoininput', ('row1', 'a', 'row1.a==row2.b', 'tMap_1', 'True', 'P', 'J', '1', 'row1', 'a')),
+    ('aud_agg_tmapinputinoutput', ('row1', 'a', 'tMap_1', 'row1.a + Var.v', 'x', 'out1', 'False', '0', 'P', 'J')),
+    ('aud_agg_tmapinputinvar', ('row1', 'c', 'tMap_1', 'row1.c', 'Var.w', 'P', 'J')),
+    ('aud_agg_tmapinputinvar', ('row2', 'b', 'tMap_1', 'row2.b + 1', 'Var.v', 'P', 'J')),
+    ('aud_agg_tmapvarinfilter', ('Var.w', 'tMap_1', 'Var.w', 'out1', 'False', 'False', 'P', 'J')),
+    ('aud_agg_tmapvarinoutput', ('Var.v', 'tMap_1', 'Var.v', 'y', 'out1', 'False', 'False', 'P', 'J')),
+    ('aud_agg_tmapvarinoutput', ('Var.v', 'tMap_1', 'row1.a + Var.v', 'x', 'out1', 'False', 'False', 'P', 'J')),
+]
+
+
+class FakeConfig:
+    def __init__(self, directory, changed_jobs=None):
+        self.directory = directory
+        self.changed_jobs = changed_jobs
+
+    def get_param(self, section, key):
+        if section == 'Incremental':
+            return {'enabled': self.changed_jobs is not None, 'changed_jobs': "CHANGED_JOBS"}[key]
+        return {
+            'agg_queries': key,
+            'insert_agg_queries': f"INSERT {key}",
+            'Directories': self.directory,
+            'Stages': 4,
+        }.get(section)
+
+
+class FakeConnection:
+    """Connection keeping the changes to the shared tables apart until they are committed."""
+
+    def __init__(self, tables, lock):
+        self.tables = tables
+        self.lock = lock
+        self.pending = {}
+
+    def working_rows(self, table_name):
+        if table_name not in self.pending:
+            with self.lock:
+                self.pending[table_name] = list(self.tables.get(table_name, []))
+        return self.pending[table_name]
+
+    def commit(self):
+        with self.lock:
+            self.tables.update(self.pending)
+        self.pending = {}
+
+    def rollback(self):
+        self.pending = {}
+
+
+class FakeDatabase(Database):
+    """
+    Database answering the agg_queries (also when joined against the changed jobs) from
+    `query_rows`, and keeping the aud_agg_* tables as lists of rows.
+    """
+
+    def __init__(self, tables=None, lock=None, changed_jobs=(), failing_table=None, query_rows=TMAP_QUERY_ROWS):
+        super().__init__({})
+        self.tables = {} if tables is None else tables
+        self.lock = lock or threading.Lock()
+        self.changed_jobs = changed_jobs
+        self.failing_table = failing_table
+        self.query_rows = query_rows
+        self.connection = FakeConnection(self.tables, self.lock)
+
+    @property
+    def inserted(self):
+        return [(table_name, row) for table_name, rows in self.tables.items() for row in rows]
+
+    def clone(self):
+        return FakeDatabase(self.tables, self.lock, self.changed_jobs, self.failing_table, self.query_rows)
+
+    def close(self):
+        pass
+
+    def rows(self, query):
+        if query == "CHANGED_JOBS":
+            return list(self.changed_jobs)
+        scoped = re.fullmatch(r"SELECT scoped\.\* FROM \((\w+)\) scoped JOIN \(CHANGED_JOBS\) changed .*", query)
+        return list(self.query_rows.get(scoped.group(1) if scoped else query, []))
+
+    def execute_query(self, query, params=None):
+        return self.rows(query)
+
+    def stream_query(self, query, params=None, chunk_size=None):
+        rows = self.rows(query)
+        if rows:
+            yield rows
+
+    def delete_records_batch(self, table_name, conditions_batch):
+        rows = self.connection.working_rows(table_name)
+        rows[:] = [
+            row for row in rows
+            if not any(set(conditions.values()) <= set(row) for conditions in conditions_batch)
+        ]
+        self._commit()
+
+    def truncate_table(self, table_name):
+        pass
+
+    def insert_data_batch(self, insert_query, table_name, data_batch):
+        if table_name == self.failing_table:
+            raise RuntimeError(f"Cannot insert into {table_name}")
+        self.connection.working_rows(table_name).extend(tuple(map(str, row)) for row in data_batch)
+        self._commit(len(data_batch))
+
+
+def test_aud_405_agg_tmap_inserts_the_lineage_rows(tmp_path):
+    db = FakeDatabase()
+
+    AUD_405_AGG_TMAP(FakeConfig(str(tmp_path)), db, '2024-11-05 15:10:03')
+
+    assert sorted(db.inserted) == TMAP_INSERTED_ROWS
+
+
+def test_agg_query_joins_the_changed_jobs_query(tmp_path):
+    jobs = ChangedJobs([('P', 'J'), ('P', 'K')], "CHANGED_JOBS", '2024-11-05 15:10:03')
+
+    query, params = agg_query(FakeConfig(str(tmp_path)), 'aud_agg_txmlmapinputinoutput', jobs)
+
+    # One parameter whatever the number of changed jobs
+    assert query == (
+        "SELECT scoped.* FROM (aud_agg_txmlmapinputinoutput) scoped JOIN (CHANGED_JOBS) changed "
+        "ON changed.NameProject = scoped.output_nameproject AND changed.NameJob = scoped.output_namejob"
+    )
+    assert params == ('2024-11-05 15:10:03',)
+    assert agg_query(FakeConfig(str(tmp_path)), 'aud_vartable') == ('aud_vartable', None)
+
+
+def test_a_failed_stage_leaves_the_rows_of_its_table(tmp_path):
+    old_rows = {
+        'aud_agg_tmapcolumunused': [('row9', 'old', 'tMap_1', 'P', 'J')],
+        'aud_agg_tmapinputinvar': [('row1', 'old', 'tMap_1', 'row1.old', 'Var.w', 'P', 'J')],
+    }
+    db = FakeDatabase(dict(old_rows), changed_jobs=[('P', 'J'), ('P', 'K')], failing_table='aud_agg_tmapcolumunused')
+
+    with pytest.raises(RuntimeError):
+        AUD_405_AGG_TMAP(FakeConfig(str(tmp_path), changed_jobs=True), db, '2024-11-05 15:10:03')
+
+    # The insert into aud_agg_tmapcolumunused failed after its delete: its old rows are still there
+    assert db.tables['aud_agg_tmapcolumunused'] == old_rows['aud_agg_tmapcolumunused']
+    # The stages run before it replaced the rows of the changed jobs
+    assert sorted(db.tables['aud_agg_tmapinputinvar']) == [
+        row for table_name, row in TMAP_INSERTED_ROWS if table_name == 'aud_agg_tmapinputinvar'
+    ]
+
+
+def txmlmap_input(column, xpath, row, join_expression, filter_expression, job='J'):
+    """An aud_inputtable_xml row of tXMLMap_1."""
+    return (column, 'String', xpath, row, 'tXMLMap', 'tXMLMap_1', '', '', '', job, 'P', '2024-11-05', '',
+            join_expression, '', '', '', 'true', '', filter_expression, '', '')
+
+
+def txmlmap_output(column, row_output, expression, filter_expression):
+    """An aud_outputtable_xml row of tXMLMap_1."""
+    return (column, 'String', 'o', row_output, 'tXMLMap', 'tXMLMap_1', '', '', 'J', 'P', '2024-11-05',
+            expression, '', 'true', filter_expression, '')
+
+
+# Rows returned by the agg_queries read by AUD_405_AGG_TXMLMAP
+TXMLMAP_QUERY_ROWS = {
+    'aud_inputtable_xml': [
+        txmlmap_input('id', 'row1.id', 'row1', '', 'row1.id > 0'),
+        txmlmap_input('name', 'row2.name', 'row1', 'row2.name == x', None),
+        txmlmap_input('name', 'row1.name', 'row2', '', None),
+        txmlmap_input('zip', 'z', 'row1', None, None),
+        txmlmap_input('id', 'row1.id', 'row1', '', None, job='K'),
+    ],
+    'aud_outputtable_xml': [
+        txmlmap_output('oid', 'out1', 'row1.id + 1', 'row1.name != null'),
+        txmlmap_output('oname', 'out1', 'row2.name', None),
+        txmlmap_output('ov', 'out2', 'Var.v', None),
+    ],
+    'aud_vartable_xml': [('tXMLMap', 'tXMLMap_1', 'Var', '1', 'v', 'row1.zip', 'String', 'P', 'J')],
+    'aud_inputtable_xml_nb': [('P', 'J', 'tXMLMap_1', 4)],
+}
+
+# Every input column of P/J is used by an expression; the only column of P/K is not
+TXMLMAP_INSERTED_ROWS = [
+    ('aud_agg_txmlmapcolumunused', ('id', 'row1', 'tXMLMap', 'P', 'K')),
+    ('aud_agg_txmlmapinput', ('P', 'J', 'tXMLMap_1', '4')),
+    ('aud_agg_txmlmapinputinfilterinput', ('row1', 'id', 'row1.id > 0', 'tXMLMap', 'P', 'J')),
+    ('aud_agg_txmlmapinputinfilteroutput', ('row1', 'name', 'tXMLMap', 'row1.name != null', 'out1', 'P', 'J')),
+    ('aud_agg_txmlmapinputinjoininput', ('row1', 'name', 'tXMLMap', 'row2.name == x', 'P', 'J', '0', 'row2', 'name')),
+    ('aud_agg_txmlmapinputinoutput', ('id', 'row1', 'tXMLMap', 'row1.id + 1', 'oid', 'out1', 'J', 'P')),
+    ('aud_agg_txmlmapinputinoutput', ('name', 'row2', 'tXMLMap', 'row2.name', 'oname', 'out1', 'J', 'P')),
+    ('aud_agg_txmlmapinputinvar', ('row1', 'zip', 'tXMLMap', 'row1.zip', 'Var.v', 'P', 'J')),
+]
+
+
+def test_aud_405_agg_txmlmap_inserts_the_lineage_rows(tmp_path):
+    db = FakeDatabase(query_rows=TXMLMAP_QUERY_ROWS)
+
+    AUD_405_AGG_TXMLMAP(FakeConfig(str(tmp_path)), db, '2024-11-05 15:10:03')
+
+    assert sorted(db.inserted) == TXMLMAP_INSERTED_ROWS
+
+
+def test_a_failed_txmlmap_insert_leaves_every_table_as_it_was(tmp_path):
+    old_rows = {
+        'aud_agg_txmlmapinputinvar': [('row1', 'old', 'tXMLMap', 'row1.old', 'Var.w', 'P', 'J')],
+        'aud_agg_txmlmapinput': [('P', 'J', 'tXMLMap_1', '2')],
+    }
+    db = FakeDatabase(
+        dict(old_rows), changed_jobs=[('P', 'J'), ('P', 'K')], failing_table='aud_agg_txmlmapinput',
+        query_rows=TXMLMAP_QUERY_ROWS,
+    )
+
+    with pytest.raises(RuntimeError):
+        AUD_405_AGG_TXMLMAP(FakeConfig(str(tmp_path), changed_jobs=True), db, '2024-11-05 15:10:03')
+
+    # The tables are replaced in one transaction, rolled back by the last insert
+    assert db.tables == old_rows
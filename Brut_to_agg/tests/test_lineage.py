@@ -0,0 +1,93 @@
+import pandas as pd
+
+from lineage import LineageSpec, contains, filled, frame_rows, left_anti_join, map_rows, one_line, unused_rows
+
+
+def test_left_anti_join_keeps_unmatched_rows_once():
+    left_df = pd.DataFrame({'k': ['a', 'b', 'c'], 'v': [1, 2, 3]})
+    # Duplicated right keys must not duplicate the left rows
+    right_df = pd.DataFrame({'k': ['a', 'a', 'd'], 'w': [9, 9, 9]})
+
+    unmatched_df = left_anti_join(left_df, right_df, ['k'])
+
+    assert unmatched_df.to_dict('records') == [{'k': 'b', 'v': 2}, {'k': 'c', 'v': 3}]
+
+
+def test_unused_rows_removes_the_keys_of_every_used_frame():
+    input_df = pd.DataFrame({
+        'row': ['row1', 'row1', 'row2', 'row3', 'row3'],
+        'column': ['a', 'b', 'a', 'z', 'z'],
+    })
+    used_dfs = [
+        pd.DataFrame({'row': ['row1'], 'column': ['a'], 'other': ['x']}),
+        pd.DataFrame({'row': ['row2'], 'column': ['a'], 'other': ['y']}),
+    ]
+
+    unused_df = unused_rows(input_df, used_dfs, ['row', 'column'])
+
+    assert sorted(map(tuple, unused_df.values.tolist())) == [('row1', 'b'), ('row3', 'z')]
+
+
+def test_unused_rows_without_used_frames_deduplicates_the_input():
+    input_df = pd.DataFrame({'row': ['row1', 'row1'], 'column': ['a', 'a']})
+
+    assert unused_rows(input_df, [], ['row', 'column']).values.tolist() == [['row1', 'a']]
+
+
+def test_map_rows_joins_filters_and_projects():
+    frames = {
+        'input_df': pd.DataFrame({
+            'rowName': ['row1', 'row1', 'row2'],
+            'nameColumnInput': ['a', 'b', 'a'],
+            'composant': ['tMap_1', 'tMap_1', 'tMap_2'],
+        }),
+        'output_df': pd.DataFrame({
+            'aud_componentValue': ['tMap_1', 'tMap_1', 'tMap_2'],
+            'aud_expressionOutput': ['row1.a +\nrow1.b', None, 'row1.a'],
+            'aud_OutputName': ['out1', 'out2', 'out3'],
+        }),
+    }
+    spec = LineageSpec(
+        'aud_agg_test', 'input_df', right='output_df', keys=(('composant', 'aud_componentValue'),),
+        predicate=contains('aud_expressionOutput', 'rowName', 'nameColumnInput'),
+        projection={
+            'NameRowInput': 'nameColumnInput',
+            'expressionOutput': one_line('aud_expressionOutput'),
+            'OutputName': 'aud_OutputName',
+        },
+    )
+
+    mapped_df = map_rows(spec, frames)
+
+    # Missing expressions never match, and row2.a is not used by the tMap_2 output
+    assert list(mapped_df.columns) == ['NameRowInput', 'expressionOutput', 'OutputName']
+    assert mapped_df.values.tolist() == [
+        ['a', 'row1.a + row1.b', 'out1'],
+        ['b', 'row1.a + row1.b', 'out1'],
+    ]
+
+
+def test_map_rows_filters_and_deduplicates_the_right_frame():
+    frames = {
+        'left_df': pd.DataFrame({'k': ['a', 'b']}),
+        'right_df': pd.DataFrame({'k': ['a', 'a', 'b'], 'name': ['x', 'y', ' '], 'n': [1, 2, 3]}),
+    }
+    spec = LineageSpec(
+        'aud_agg_test', 'left_df', right='right_df', keys=('k',),
+        right_filter=filled('name', strip=True), right_unique=('k',),
+        projection={'k': 'k', 'name': 'name', 'n': lambda df: df['n'] * 10},
+    )
+
+    assert map_rows(spec, frames).values.tolist() == [['a', 'x', 10]]
+
+
+def test_frame_rows_encodes_missing_values_and_bits():
+    df = pd.DataFrame({
+        'name': ['a', None, 'c'],
+        'size': [1.0, float('nan'), 3.0],
+        'flag': [True, 'False', None],
+    })
+
+    chunks = list(frame_rows(df, chunk_size=2, bits=('flag',)))
+
+    assert chunks == [[('a', 1.0, 1), (None, None, 0)], [('c', 3.0, None)]]
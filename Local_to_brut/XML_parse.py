@@ -1,29 +1,101 @@
-import xml.etree.ElementTree as ET
 import os
 import logging
 import base64
 from io import BytesIO
 from PIL import Image  # Pillow library for image handling
+from columnar import ParsedFiles, ParsedWorkspace
+from xml_backend import NAMESPACES, get_backend
+from records import intern_value, ElementValue, ElementParameter, JobParameter, MetadataColumn, MapperTableEntry, Connection, TreeNode
+
+logger = logging.getLogger(__name__)
+
+def flatten_tree(tree):
+    """
+    Flatten the `nodes`/`children` hierarchy of a tXMLMap input or output tree without recursion.
+
+    The elements are walked with an explicit stack, so deep XML schemas cost neither one Python
+    frame per level nor a risk of hitting the recursion limit.
+
+    Args:
+        tree (Element): An `inputTrees` or `outputTrees` element.
+
+    Returns:
+        list of TreeNode: The tree nodes in document (pre-)order, each carrying its `id`,
+            `parent_id` and `depth`.
+    """
+    rows = []
+    stack = [(element, None, 0) for element in reversed(tree.findall('./nodes'))]
+    while stack:
+        element, parent_id, depth = stack.pop()
+        node_id = len(rows)
+        rows.append(TreeNode.from_element(element, id=node_id, parent_id=parent_id, depth=depth))
+        children = element.findall('./children')
+        stack.extend((child, node_id, depth + 1) for child in reversed(children))
+    return rows
 
-# Configure logging
-logging.basicConfig(
-    filename='database_operations.log',
-    level=logging.DEBUG,  # Capture all messages
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='w'  # Overwrite the file each time for clean logs
-)
 class XMLParser:
-    def __init__(self):
-        """Initialize the XMLParser without a specific file path."""
+    # Sections and element kinds of an `.item` file that can be requested through `required`
+    ITEM_SECTIONS = (
+        'nodes',
+        'nodes.elementParameters',
+        'nodes.elementValues',  # elementValue lists of the node elementParameters
+        'nodes.metadata',
+        'nodes.nodeData',
+        'nodes.nodeData.varTables',
+        'nodes.nodeData.inputTables',
+        'nodes.nodeData.outputTables',
+        'nodes.nodeData.inputTrees',
+        'nodes.nodeData.outputTrees',
+        'nodes.nodeData.connections',
+        'contexts',
+        'parameters',
+        'connections',
+        'subjobs',
+    )
+
+    def __init__(self, required=None, backend=None, drop_inactive=True):
+        """
+        Initialize the XMLParser without a specific file path.
+
+        Args:
+            required (iterable of str, optional): Sections of ITEM_SECTIONS needed by the jobs of the run,
+                e.g. {'nodes.metadata', 'subjobs'}. Requiring a section includes everything below it.
+                Subtrees that are not required are skipped when parsing `.item` files (their keys are
+                left empty). Defaults to None, which parses everything.
+            backend (str, optional): XML backend, 'lxml' or 'elementtree'. Defaults to None, which uses
+                lxml when it is installed and ElementTree otherwise.
+            drop_inactive (bool, optional): Leave deactivated components (ACTIVATE = false) out of the parsed
+                nodes, so that no job writes rows for them. Defaults to True. When False they are kept with
+                their 'active' key set to False.
+        """
         self.file_path = ""
+        self.backend = get_backend(backend)
+        self.tree = None
+        self.root = None
+        self.required = frozenset(required) if required is not None else None
+        self.drop_inactive = drop_inactive
+        self._wanted = {}
+
+    def _wants(self, section):
+        """Return True if `section` (or something below it) has to be parsed."""
+        if self.required is None:
+            return True
+        wanted = self._wanted.get(section)
+        if wanted is None:
+            wanted = any(
+                required == section or required.startswith(section + '.') or section.startswith(required + '.')
+                for required in self.required
+            )
+            self._wanted[section] = wanted
+        return wanted
 
     def _parse_file_items(self):
         """Parse the XML file and return a list of data from nodes, contexts, parameters, and connections."""
-        nodes_data = self._parse_nodes()
-        contexts_data = self._parse_contexts()
-        parameters_data = self._parse_parameters()
-        connection_data = self._parse_connection()
-        subjobs_data = self._parse_subjob()
+        nodes_data = self._parse_nodes() if self._wants('nodes') else []
+        contexts_data = self._parse_contexts() if self._wants('contexts') else []
+        parameters_data = self._parse_parameters() if self._wants('parameters') else []
+        connection_data = self._parse_connection() if self._wants('connections') else []
+        subjobs_data = self._parse_subjob() if self._wants('subjobs') else []
 
         # Return combined data as a dictionary
         return {
@@ -58,16 +130,16 @@ class XMLParser:
             list of dict: A list of dictionaries where each dictionary contains the details of a `ContextType` element
                         and its associated `contextParameter` elements.
         """
-        if not self.root:
+        if self.root is None:
             raise ValueError("XML tree root is not initialized. Please load an XML file first.")
 
         data = []
-        namespace = {'xmi': "http://www.omg.org/XMI", 'talendfile': "platform:/resource/org.talend.model/model/TalendFile.xsd"}
+        namespace = NAMESPACES
 
         # Check if the root element is the 'talendfile:ContextType'
         if self.root.tag != f"{{{namespace['talendfile']}}}ContextType":
             # If the root is not a 'ContextType', adjust the search or behavior accordingly
-            context_elements = self.root.findall(".//talendfile:ContextType",namespace)
+            context_elements = self.backend.context_types(self.root)
         else:
             context_elements = [self.root]
 
@@ -108,17 +180,15 @@ class XMLParser:
         parsed_contexts = []
 
         # Ensure that the XML tree is loaded
-        if not self.root:
+        if self.root is None:
             raise ValueError("No XML tree loaded. Ensure the XML file is parsed before calling this method.")
 
-        logging.debug("Starting to parse 'TalendProperties:Property' elements.")
+        logger.debug("Starting to parse 'TalendProperties:Property' elements.")
 
         # Find all 'TalendProperties:Property' elements
-        properties = self.root.findall(".//TalendProperties:Property", namespaces={
-            "TalendProperties": "http://www.talend.org/properties"
-        })
+        properties = self.backend.properties(self.root)
 
-        logging.debug(f"Found {len(properties)} 'TalendProperties:Property' elements.")
+        logger.debug("Found %s 'TalendProperties:Property' elements.", len(properties))
 
         for property_elem in properties:
             # Extract attributes of the Property
@@ -131,7 +201,7 @@ class XMLParser:
             item = property_elem.get("item")
             statusCode = property_elem.get("statusCode")
 
-            logging.debug(f"Parsing Property element with ID: {property_id}, Label: {label}, Version: {version}")
+            logger.debug("Parsing Property element with ID: %s, Label: %s, Version: %s", property_id, label, version)
 
             # Build the context entry
             context_data = {
@@ -145,11 +215,11 @@ class XMLParser:
                 "statusCode": statusCode
             }
 
-            logging.debug(f"Extracted context data: {context_data}")
+            logger.debug("Extracted context data: %s", context_data)
 
             parsed_contexts.append(context_data)
 
-        logging.info(f"Parsed {len(parsed_contexts)} 'TalendProperties:Property' elements successfully.")
+        logger.info("Parsed %s 'TalendProperties:Property' elements successfully.", len(parsed_contexts))
 
         return parsed_contexts
 
@@ -157,41 +227,30 @@ class XMLParser:
 
 
 
-    def _parse_connection(self):
-        # Parse `connection` elements
+    def _parse_connection(self, workspace=None, project_name=None, job_name=None):
+        # Parse `connection` elements; with a workspace, append one row per elementParameter to its connections table
         data = []
 
         for connection in self.root.findall('.//connection'):
-            connection_data = {
-                'connectorName': connection.get('connectorName'),
-                'label': connection.get('label'),
-                'lineStyle': connection.get('lineStyle'),
-                'metaname': connection.get('metaname'),
-                'offsetLabelX': connection.get('offsetLabelX'),
-                'offsetLabelY': connection.get('offsetLabelY'),
-                'source': connection.get('source'),
-                'target': connection.get('target'),
-                'outputId': connection.get('outputId'),
-                'elementParameters': []
-            }
-
-            for elem_param in connection.findall('.//elementParameter'):
-                elem_param_data = {
-                    'field': elem_param.get('field'),
-                    'name': elem_param.get('name'),
-                    'value': elem_param.get('value'),
-                    'show': elem_param.get('show'),
-                    'elementValues': []
-                }
-
-                for elem_value in elem_param.findall('.//elementValue'):
-                    elem_value_data = {
-                        'elementRef': elem_value.get('elementRef'),
-                        'value': elem_value.get('value')
-                    }
-                    elem_param_data['elementValues'].append(elem_value_data)
-
-                connection_data['elementParameters'].append(elem_param_data)
+            if workspace is not None:
+                attributes = tuple(connection.get(attribute) for attribute in Connection._attributes)
+                for elem_param in connection.iterfind('.//elementParameter'):
+                    workspace.connections.append(
+                        project_name, job_name, *attributes, elem_param.get('field'), elem_param.get('name'),
+                        elem_param.get('value'), elem_param.get('show')
+                    )
+                continue
+
+            connection_data = Connection.from_element(
+                connection,
+                elementParameters=[
+                    ElementParameter.from_element(
+                        elem_param,
+                        elementValues=[ElementValue.from_element(elem_value) for elem_value in elem_param.iterfind('.//elementValue')]
+                    )
+                    for elem_param in connection.iterfind('.//elementParameter')
+                ]
+            )
 
             data.append(connection_data)
 
@@ -206,94 +265,89 @@ class XMLParser:
 
                 }
 
-                for elem_param in subjob.findall('.//elementParameter'):
-                    elem_param_data = {
-                        'field': elem_param.get('field'),
-                        'name': elem_param.get('name'),
-                        'value': elem_param.get('value'),
-                        'show': elem_param.get('show'),
-                    }
-            
-                    subjob_data['elementParameters'].append(elem_param_data)
+                for elem_param in subjob.iterfind('.//elementParameter'):
+                    subjob_data['elementParameters'].append(ElementParameter.from_element(elem_param))
 
                 data.append(subjob_data)
 
             return data
 
             
-    def _parse_nodes(self):
-        """Parse and return data from `node` elements, including additional parameters."""
-        parsed_data = []
-
-        def parse_children(element):
-            """Recursively parse `children` elements, capturing nested structures."""
-            children_data = {
-                'name': element.get('name'),
-                'type': element.get('type'),
-                'xpath': element.get('xpath'),
-                'nodeType': element.get('nodeType'),
-                'main': element.get('main'),
-                'defaultValue': element.get('defaultValue'),
-                'filterOutGoingConnections': element.get('filterOutGoingConnections'),
-                'lookupOutgoingConnections': element.get('lookupOutgoingConnections'),
-                'outgoingConnections': element.get('outgoingConnections'),
-                'lookupIncomingConnections': element.get('lookupIncomingConnections'),
-                'expression': element.get('expression'),
-                'children': []
-            }
+    def _parse_nodes(self, workspace=None, project_name=None, job_name=None):
+        """
+        Parse and return data from `node` elements, including additional parameters.
 
-            for child in element.findall('./children'):
-                children_data['children'].append(parse_children(child))
+        Args:
+            workspace (ParsedWorkspace, optional): When given, the elementParameters of the nodes are
+                appended to its element_parameters table under (project_name, job_name) instead of
+                being returned, and nothing else is parsed.
+            project_name (str, optional): Project of the loaded file, with `workspace`.
+            job_name (str, optional): Job of the loaded file, with `workspace`.
 
-            return children_data
+        Returns:
+            list of dict: The parsed nodes, empty with `workspace`.
+        """
+        parsed_data = []
+        want_values = self._wants('nodes.elementValues')
+        want_parameters = want_values or self._wants('nodes.elementParameters')
+        want_metadata = self._wants('nodes.metadata')
+        want_node_data = self._wants('nodes.nodeData')
+        want_var_tables = self._wants('nodes.nodeData.varTables')
+        want_input_tables = self._wants('nodes.nodeData.inputTables')
+        want_output_tables = self._wants('nodes.nodeData.outputTables')
+        want_input_trees = self._wants('nodes.nodeData.inputTrees')
+        want_output_trees = self._wants('nodes.nodeData.outputTrees')
+        want_mapper_connections = self._wants('nodes.nodeData.connections')
+        if workspace is not None:
+            add_parameter = workspace.element_parameters.append
 
         for node in self.root.iter('node'):
             comp_data = {
-                'componentName': node.get('componentName'),
+                'componentName': intern_value(node.get('componentName')),
                 'componentVersion': node.get('componentVersion'),
                 'offsetLabelX': node.get('offsetLabelX'),
                 'offsetLabelY': node.get('offsetLabelY'),
                 'posX': node.get('posX'),
                 'posY': node.get('posY'),
+                'uniqueName': None,  # value of the TEXT/UNIQUE_NAME elementParameter
+                'active': True,  # False when the ACTIVATE elementParameter is 'false'
                 'elementParameters': [],
                 'metadata': [],
                 'nodeData': [],
                 'connection': []
             }
 
-            # Parse `elementParameters`
-            skip_node = False
+            node_parameters = []  # (field, name, show, value) rows for the workspace, kept until the node is known active
+            # Parse `elementParameters`, resolving the node's UNIQUE_NAME and ACTIVATE state on the way
             for elem_param in node.findall('.//elementParameter'):
-                elem_data = {
-                    'field': elem_param.get('field'),
-                    'name': elem_param.get('name'),
-                    'show': elem_param.get('show'),
-                    'value': elem_param.get('value'),
-                    'elementValue': []
-                }
-
-                # Check the condition to skip further processing
-                if (
-                    elem_data['field'] == 'CHECK'
-                    and elem_data['name'] == 'ACTIVATE'
-                    and elem_data['value'] == 'false'
-                ):
-                    skip_node = True
-                    break  # Exit the loop and skip this node
-
-                for elem_value in elem_param.findall('.//elementValue'):
-                    value_data = {
-                        'elementRef': elem_value.get('elementRef'),
-                        'value': elem_value.get('value')
-                    }
-                    elem_data['elementValue'].append(value_data)
-
-                comp_data['elementParameters'].append(elem_data)
-
-            if skip_node:
-                continue  # Skip processing the rest of this node
+                field = elem_param.get('field')
+                name = elem_param.get('name')
+                if field == 'TEXT' and name == 'UNIQUE_NAME':
+                    comp_data['uniqueName'] = elem_param.get('value')
+                # Same test as the ActiveNodes queries: any ACTIVATE parameter set to 'false'
+                elif name == 'ACTIVATE' and elem_param.get('value') == 'false':
+                    comp_data['active'] = False
+                    if self.drop_inactive:
+                        break  # The node is dropped, the rest of it is not needed
+
+                if workspace is not None:
+                    node_parameters.append((intern_value(field), intern_value(name), intern_value(elem_param.get('show')), elem_param.get('value')))
+                elif want_parameters:
+                    elem_data = ElementParameter.from_element(
+                        elem_param,
+                        elementValues=[ElementValue.from_element(elem_value) for elem_value in elem_param.iterfind('.//elementValue')] if want_values else ()
+                    )
+                    comp_data['elementParameters'].append(elem_data)
+
+            if self.drop_inactive and not comp_data['active']:
+                continue  # Inactive components never reach the jobs
+            if workspace is not None:
+                key = (project_name, job_name, comp_data['uniqueName'], comp_data['componentName'])
+                for row in node_parameters:
+                    add_parameter(*key, *row)
+                continue
             # Parse `metadata`
-            for metadata in node.findall('.//metadata'):
+            for metadata in (node.findall('.//metadata') if want_metadata else ()):
                 meta_data = {
                     'connector': metadata.get('connector'),
                     'label': metadata.get('label'),
@@ -302,28 +356,19 @@ class XMLParser:
                 }
 
                 for column in metadata.findall('.//column'):
-                    column_data = {
-                        'comment': column.get('comment'),
-                        'key': column.get('key'),
-                        'length': column.get('length'),
-                        'name': column.get('name'),
-                        'nullable': column.get('nullable'),
-                        'pattern': column.get('pattern'),
-                        'precision': column.get('precision'),
-                        'sourceType': column.get('sourceType'),
-                        'type': column.get('type'),
-                        'usefulColumn': column.get('usefulColumn'),
-                        'originalLength': column.get('originalLength'),
-                        'defaultValue': column.get('defaultValue'),
-                        'additionalField': column.find('.//additionalField').get('value') if column.find('.//additionalField') else None,
-                        'additionalProperties': column.find('.//additionalProperties').get('value') if column.find('.//additionalProperties') else None
-                    }
+                    additional_field = column.find('.//additionalField')
+                    additional_properties = column.find('.//additionalProperties')
+                    column_data = MetadataColumn.from_element(
+                        column,
+                        additionalField=additional_field.get('value') if additional_field is not None else None,
+                        additionalProperties=additional_properties.get('value') if additional_properties is not None else None
+                    )
                     meta_data['columns'].append(column_data)
 
                 comp_data['metadata'].append(meta_data)
 
             # Loop through nodes and parse `nodeData` elements
-            for node_data in node.findall('.//nodeData'):
+            for node_data in (node.findall('.//nodeData') if want_node_data else ()):
                 # Find various sub-elements within nodeData
                 ui_propefties = node_data.find('.//uiPropefties')
                 var_tables = node_data.find('.//varTables')
@@ -347,28 +392,18 @@ class XMLParser:
                 }
 
                 # Check if 'varTables' exists and parse `mapperTableEntries` if present
-                if var_tables is not None:
+                if var_tables is not None and want_var_tables:
                     # Parse `mapperTableEntries`
                     for mapperTableEntry in var_tables.findall('.//mapperTableEntries'):
-                        # Extract the attributes for `mapperTableEntry`
-                        entry_data = {
-                            'name': mapperTableEntry.get('name'),
-                            'expression': mapperTableEntry.get('expression'),
-                            'type': mapperTableEntry.get('type')
-                        }
-
-                        # Debug logging to check the entry being added
-                        # logging.debug(f"Adding mapperTableEntry: {entry_data}")
-
                         # Append each entry to `mapperTableEntries`
-                        node_data_info['varTables']['mapperTableEntries'].append(entry_data)
+                        node_data_info['varTables']['mapperTableEntries'].append(MapperTableEntry.from_element(mapperTableEntry))
                 
                 # Optional: Debug log to check the final structure of node_data_info
                 # logging.debug(f"Final node_data_info for node: {node_data_info}")
 
 
                 # Parse multiple `inputTables`
-                for input_table in node_data.findall('.//inputTables'):
+                for input_table in (node_data.findall('.//inputTables') if want_input_tables else ()):
                     input_table_info = {
                         'lookupMode': input_table.get('lookupMode'),
                         'matchingMode': input_table.get('matchingMode'),
@@ -384,19 +419,12 @@ class XMLParser:
                     
                     # Parse `mapperTableEntries` for each `inputTable`
                     for mapper_entry in input_table.findall('.//mapperTableEntries'):
-                        mapper_entry_info = {
-                            'expression': mapper_entry.get('expression'),
-                            'name': mapper_entry.get('name'),
-                            'type': mapper_entry.get('type'),
-                            'nullable': mapper_entry.get('nullable'),
-                            'operator': mapper_entry.get('operator')
-                        }
-                        input_table_info['mapperTableEntries'].append(mapper_entry_info)
+                        input_table_info['mapperTableEntries'].append(MapperTableEntry.from_element(mapper_entry))
 
                     node_data_info['inputTables'].append(input_table_info)
 
                 # Parse multiple `outputTables`
-                for output_table in node_data.findall('.//outputTables'):
+                for output_table in (node_data.findall('.//outputTables') if want_output_tables else ()):
                     output_table_info = {
                         'activateExpressionFilter': output_table.get('activateExpressionFilter'),
                         'expressionFilter': output_table.get('expressionFilter'),
@@ -410,18 +438,12 @@ class XMLParser:
                     
                     # Parse `mapperTableEntries` for each `outputTable`
                     for mapper_entry in output_table.findall('.//mapperTableEntries'):
-                        mapper_entry_info = {
-                            'expression': mapper_entry.get('expression'),
-                            'name': mapper_entry.get('name'),
-                            'type': mapper_entry.get('type'),
-                            'nullable': mapper_entry.get('nullable')
-                        }
-                        output_table_info['mapperTableEntries'].append(mapper_entry_info)
+                        output_table_info['mapperTableEntries'].append(MapperTableEntry.from_element(mapper_entry))
 
                     node_data_info['outputTables'].append(output_table_info)
 
                 # Parse `inputTrees`
-                for input_tree in node_data.findall('.//inputTrees'):
+                for input_tree in (node_data.findall('.//inputTrees') if want_input_trees else ()):
                     input_tree_data = {
                         'name': input_tree.get('name'),
                         'matchingMode': input_tree.get('matchingMode'),
@@ -432,35 +454,14 @@ class XMLParser:
                         'expressionFilter': input_tree.get('expressionFilter'),
                         'filterIncomingConnections': input_tree.get('filterIncomingConnections'),
                         'lookup': input_tree.get('lookup'),
-                        'children': []
+                        # Flat rows for the `nodes`/`children` hierarchy of the tree
+                        'nodes': flatten_tree(input_tree)
                     }
-
-                    # Parse `nodes` elements within each `inputTrees`
-                    for node_item in input_tree.findall('.//nodes'):
-                        node_item_data = {
-                            'name': node_item.get('name'),
-                            'expression': node_item.get('expression'),
-                            'type': node_item.get('type'),
-                            'xpath': node_item.get('xpath'),
-                            'filterOutGoingConnections': node_item.get('filterOutGoingConnections'),
-                            'lookupOutgoingConnections': node_item.get('lookupOutgoingConnections'),
-                            'outgoingConnections': node_item.get('outgoingConnections'),
-                            'lookupIncomingConnections': node_item.get('lookupIncomingConnections'),
-                            'expression': node_item.get('expression'),
-                            'children': []
-                        }
-
-                        # Parse `children` elements within each `node_item`
-                        for child in node_item.findall('./children'):
-                            node_item_data['children'].append(parse_children(child))
-
-                        input_tree_data['children'].append(node_item_data)
-
                     node_data_info['inputTrees'].append(input_tree_data)
 
 
                 # Parse `outputTrees`
-                for output_tree in node_data.findall('.//outputTrees'):
+                for output_tree in (node_data.findall('.//outputTrees') if want_output_trees else ()):
                     output_tree_data = {
                         'name': output_tree.get('name'),
                         'expression': output_tree.get('expression'),
@@ -471,33 +472,13 @@ class XMLParser:
                         'activateExpressionFilter': output_tree.get('activateExpressionFilter'),
                         'expressionFilter' : output_tree.get('expressionFilter'),
                         'filterIncomingConnections': output_tree.get('expressionFilter'),
-                        'children': []
-
+                        # Flat rows for the `nodes`/`children` hierarchy of the tree
+                        'nodes': flatten_tree(output_tree)
                     }
-                    # Parse `nodes` elements within each `outputTrees`
-                    for node_item in output_tree.findall('.//nodes'):
-                        node_item_data = {
-                            'name': node_item.get('name'),
-                            'expression': node_item.get('expression'),
-                            'type': node_item.get('type'),
-                            'xpath': node_item.get('xpath'),
-                            'filterOutGoingConnections': node_item.get('filterOutGoingConnections'),
-                            'lookupOutgoingConnections': node_item.get('lookupOutgoingConnections'),
-                            'incomingConnections': node_item.get('incomingConnections'),
-                            'lookupIncomingConnections': node_item.get('lookupIncomingConnections'),
-                            'expression': node_item.get('expression'),
-                            'children': []
-                        }
-
-                        # Parse `children` elements within each `node_item`
-                        for child in node_item.findall('./children'):
-                            node_item_data['children'].append(parse_children(child))
-
-                        output_tree_data['children'].append(node_item_data)
                     node_data_info['outputTrees'].append(output_tree_data)
 
                 # Parse `connections`
-                for connection in node_data.findall('.//connections'):
+                for connection in (node_data.findall('.//connections') if want_mapper_connections else ()):
                     connection_data = {
                         'source': connection.get('source'),
                         'target': connection.get('target'),
@@ -528,7 +509,7 @@ class XMLParser:
             }
 
             # Parse `TalendProperties:Property` elements
-            for prop in properties.findall('.//{http://www.talend.org/properties}Property'):
+            for prop in self.backend.properties(properties):
                 # logging.debug(f"Found `TalendProperties:Property` element: {ET.tostring(prop, encoding='unicode')[:200]}")  # Print snippet
 
                 property_data = {
@@ -544,7 +525,7 @@ class XMLParser:
                 }
 
                 # Parse `additionalProperties` inside the `TalendProperties:Property`
-                for add_prop in prop.findall('.//{http://www.talend.org/properties}additionalProperties'):
+                for add_prop in self.backend.additional_properties(prop):
                     # logging.debug(f"Found `additionalProperties` with Key: {add_prop.get('key')} and Value: {add_prop.get('value')}")
                     additional_property_data = {
                         'key': add_prop.get('key'),
@@ -599,35 +580,19 @@ class XMLParser:
         parameters_data = []
 
         for parameters in self.root.findall('.//parameters'):
-            for elementParameter in parameters.findall('.//elementParameter'):
-                param_data = {
-                    'field': elementParameter.get('field'),
-                    'name': elementParameter.get('name'),
-                    'show': elementParameter.get('show'),
-                    'value': elementParameter.get('value'),
-                    'elementValues': [],
-                    'routinesParameters': []  # Added field to store routinesParameter data
-                }
-
-                # Parse elementValues
-                for elementValue in elementParameter.findall('.//elementValue'):
-                    value_data = {
-                        'elementRef': elementValue.get('elementRef'),
-                        'value': elementValue.get('value')
-                    }
-                    param_data['elementValues'].append(value_data)
-                
-
-                # Parse routinesParameter elements
-                for routinesParameter in parameters.findall('.//routinesParameter'):
-                    routines_param_data = {
-                        'id': routinesParameter.get('id'),
-                        'name': routinesParameter.get('name')
-                    }
-                    param_data['routinesParameters'].append(routines_param_data)
-                
-
+            # routinesParameter entries belong to the whole `parameters` element: parse them once
+            # and share the same list between every parameter record
+            routines_parameters = [
+                {'id': routinesParameter.get('id'), 'name': routinesParameter.get('name')}
+                for routinesParameter in parameters.iterfind('.//routinesParameter')
+            ]
 
+            for elementParameter in parameters.findall('.//elementParameter'):
+                param_data = JobParameter.from_element(
+                    elementParameter,
+                    elementValues=[ElementValue.from_element(elementValue) for elementValue in elementParameter.iterfind('.//elementValue')],
+                    routinesParameters=routines_parameters
+                )
                 parameters_data.append(param_data)
 
         # # Log total parameters parsed
@@ -643,17 +608,62 @@ class XMLParser:
 
 
 
-    def loop_parse_items(self, items_directory):
+    @staticmethod
+    def _item_name(filename):
+        """Return the (project_name, job_name, version) encoded in an `.item` file name, e.g. PROJ.job_0.1.item."""
+        parts = filename.split('.', 1)
+        project_name = parts[0]
+        job_name_version = parts[1].replace('.item', '') if len(parts) > 1 else None
+        if job_name_version is None:
+            raise ValueError(f"No job name in {filename}")
+        job_name = '_'.join(job_name_version.split('_')[:-1])  # Exclude the version part
+        version = job_name_version.split('_')[-1]  # Last part as version
+        return project_name, job_name, version
+
+    def newest_items(self, items_directory):
+        """
+        Return the newest version of each job of a directory, picked from the `.item` file names
+        with the same rule as `loop_parse_items`, without parsing the files.
+
+        Args:
+            items_directory (str): The directory containing the `.item` files.
+
+        Returns:
+            list of tuples: (project_name, job_name, version, file_path) entries, in the order of
+            `loop_parse_items`.
+        """
+        newest_files = {}  # job_name -> (project_name, job_name, version, file_path)
+        for root, dirs, files in os.walk(items_directory):
+            for filename in files:
+                if filename.endswith('.item'):
+                    try:
+                        project_name, job_name, version = self._item_name(filename)
+                    except ValueError as e:
+                        logger.error("Skipping file %s: %s", os.path.join(root, filename), e)
+                        continue
+                    existing_entry = newest_files.get(job_name)
+                    if existing_entry is None or version > existing_entry[2]:
+                        newest_files.pop(job_name, None)  # The newest version goes to the end, as in loop_parse_items
+                        newest_files[job_name] = (project_name, job_name, version, os.path.join(root, filename))
+        return list(newest_files.values())
+
+    def loop_parse_items(self, items_directory, columnar=False):
         """
         Parses XML files from the specified directory and extracts relevant data.
 
         Args:
             items_directory (str): The directory containing XML files to be parsed.
+            columnar (bool): When True, fill a `ParsedWorkspace` of column tables instead of building the
+                per-file list, see `_parse_workspace`. Defaults to False.
 
         Returns:
-            list of tuples: A list where each tuple contains (project_name, job_name, version, parsed_data).
+            ParsedFiles: A list where each tuple contains (project_name, job_name, version, parsed_data), indexed
+            by componentName, or a ParsedWorkspace when `columnar` is True.
         """
-        parsed_files_data = []
+        if columnar:
+            return self._parse_workspace(items_directory)
+
+        parsed_files_by_job = {}  # job_name -> (project_name, job_name, version, parsed_data)
         i = 0
 
         for root, dirs, files in os.walk(items_directory):
@@ -661,49 +671,79 @@ class XMLParser:
                 if filename.endswith('.item'):
                     i += 1
                     file_path = os.path.join(root, filename)
-                    logging.debug(f"Processing file: {file_path}")
+                    logger.debug("Processing file: %s", file_path)
 
                     try:
-                        self.tree = ET.parse(file_path)
+                        self.tree = self.backend.parse(file_path)
                         self.root = self.tree.getroot()
                         parsed_data = self._parse_file_items()
 
                         # Extract project_name, job_name, and version
-                        parts = filename.split('.', 1)
-                        project_name = parts[0]
-                        job_name_version = parts[1].replace('.item', '') if len(parts) > 1 else None
-                        job_name = '_'.join(job_name_version.split('_')[:-1])  # Exclude the version part
-                        version = job_name_version.split('_')[-1]  # Last part as version
+                        project_name, job_name, version = self._item_name(filename)
                         # logging.debug(f"Extracted: project_name={project_name}, job_name={job_name}, version={version}")
 
                         # Check if job_name already exists and if so, compare versions
-                        existing_entry = next((entry for entry in parsed_files_data if entry[1] == job_name), None)
+                        existing_entry = parsed_files_by_job.get(job_name)
                         if existing_entry:
                             existing_version = existing_entry[2]  # Access existing version directly
-                            # logging.debug(f"Existing entry found for job_name={job_name}: existing_version={existing_version}")
 
                             # Compare versions (assuming simple numeric comparison)
                             if version > existing_version:
-                                # logging.debug(f"Newer version found for job_name={job_name}: replacing version {existing_version} with {version}")
-                                parsed_files_data.remove(existing_entry)
-                                parsed_files_data.append((project_name, job_name, version, parsed_data))
+                                # Re-insert so the newest version keeps its position at the end, as before
+                                del parsed_files_by_job[job_name]
+                                parsed_files_by_job[job_name] = (project_name, job_name, version, parsed_data)
                             else:
-                                # logging.debug(f"Current version for job_name={job_name} ({version}) is not newer than existing version ({existing_version}); skipping.")
                                 i=0
                         else:
                             # No existing entry, so add new entry with version included
-                            # logging.debug(f"No existing entry found for job_name={job_name}. Adding new entry.")
-                            parsed_files_data.append((project_name, job_name, version, parsed_data))
+                            parsed_files_by_job[job_name] = (project_name, job_name, version, parsed_data)
 
                     except FileNotFoundError:
-                        logging.error(f"File not found: {file_path}")
-                    except ET.ParseError:
-                        logging.error(f"Error parsing file: {file_path}")
+                        logger.error("File not found: %s", file_path)
+                    except self.backend.ParseError:
+                        logger.error("Error parsing file: %s", file_path)
                     except Exception as e:
-                        logging.error(f"Unexpected error with file {file_path}: {e}", exc_info=True)
+                        logger.error("Unexpected error with file %s: %s", file_path, e, exc_info=True)
+
+        logger.info("Processed %s files", i)
+        return ParsedFiles(parsed_files_by_job.values())
+
+    def _parse_workspace(self, items_directory):
+        """
+        Parse the `.item` files of a directory straight into the column tables of a ParsedWorkspace.
+
+        The newest version of each job is picked from the file names first (see `newest_items`), so
+        older versions are never parsed, and the rows are appended to the tables while the XML is
+        walked, without building the nested per-file structure. Only the elementParameters of the
+        nodes and of the connections are parsed, see `ParsedWorkspace.TABLES`.
+
+        Args:
+            items_directory (str): The directory containing XML files to be parsed.
+
+        Returns:
+            ParsedWorkspace: The filled workspace.
+        """
+        workspace = ParsedWorkspace()
+        for project_name, job_name, version, file_path in self.newest_items(items_directory):
+            logger.debug("Processing file: %s", file_path)
+            try:
+                self.tree = self.backend.parse(file_path)
+                self.root = self.tree.getroot()
+                if self._wants('nodes.elementParameters'):
+                    self._parse_nodes(workspace, project_name, job_name)
+                if self._wants('connections'):
+                    self._parse_connection(workspace, project_name, job_name)
+                workspace.versions[(project_name, job_name)] = version
+            except FileNotFoundError:
+                logger.error("File not found: %s", file_path)
+            except self.backend.ParseError:
+                logger.error("Error parsing file: %s", file_path)
+            except Exception as e:
+                logger.error("Unexpected error with file %s: %s", file_path, e, exc_info=True)
+
+        logger.info("Parsed %s files into %r", len(workspace), workspace)
+        return workspace
 
-        logging.info(f"Processed {i} files")
-        return parsed_files_data
     def loop_parse_contexts_items(self, items_directory):
 
         """
@@ -726,10 +766,10 @@ class XMLParser:
                 if filename.endswith('.item'):
                     processed_file_count += 1
                     file_path = os.path.join(root, filename)
-                    logging.debug(f"Processing file: {file_path}")
+                    logger.debug("Processing file: %s", file_path)
 
                     try:
-                        self.tree = ET.parse(file_path)
+                        self.tree = self.backend.parse(file_path)
                         self.root = self.tree.getroot()
                         parsed_data = self._parse_context_file_items()
 
@@ -745,24 +785,24 @@ class XMLParser:
                         if existing_entry:
                             existing_version = existing_entry[2]
                             if version > existing_version:  # Assuming version is comparable lexically
-                                logging.debug(f"Newer version found for context_name={context_name}: replacing version {existing_version} with {version}")
+                                logger.debug("Newer version found for context_name=%s: replacing version %s with %s", context_name, existing_version, version)
                                 parsed_files_data.remove(existing_entry)
                                 parsed_files_data.append((project_name, context_name, version, parsed_data))
                             else:
-                                logging.debug(f"Current version for context_name={context_name} ({version}) is not newer than existing version ({existing_version}); skipping.")
+                                logger.debug("Current version for context_name=%s (%s) is not newer than existing version (%s); skipping.", context_name, version, existing_version)
                         else:
                             # Add new entry
-                            logging.debug(f"No existing entry found for context_name={context_name}. Adding new entry.")
+                            logger.debug("No existing entry found for context_name=%s. Adding new entry.", context_name)
                             parsed_files_data.append((project_name, context_name, version, parsed_data))
 
                     except FileNotFoundError:
-                        logging.error(f"File not found: {file_path}")
-                    except ET.ParseError:
-                        logging.error(f"Error parsing file: {file_path}")
+                        logger.error("File not found: %s", file_path)
+                    except self.backend.ParseError:
+                        logger.error("Error parsing file: %s", file_path)
                     except Exception as e:
-                        logging.error(f"Unexpected error with file {file_path}: {e}", exc_info=True)
+                        logger.error("Unexpected error with file %s: %s", file_path, e, exc_info=True)
 
-        logging.info(f"Processed {processed_file_count} files")
+        logger.info("Processed %s files", processed_file_count)
         return parsed_files_data 
 
 
@@ -786,10 +826,10 @@ class XMLParser:
                 if filename.endswith('.properties'):  # Adjust for `.properties` extension
                     processed_file_count += 1
                     file_path = os.path.join(root, filename)
-                    logging.debug(f"Processing file: {file_path}")
+                    logger.debug("Processing file: %s", file_path)
 
                     try:
-                        self.tree = ET.parse(file_path)
+                        self.tree = self.backend.parse(file_path)
                         self.root = self.tree.getroot()
                         parsed_data = self.parse_context_properties_file()
                         # Extract context_name and version from the filename
@@ -804,22 +844,22 @@ class XMLParser:
                         if existing_entry:
                             existing_version = existing_entry[2]
                             if version > existing_version:  # Assuming version is comparable lexically
-                                logging.debug(f"Newer version found for context_name={context_name}: replacing version {existing_version} with {version}")
+                                logger.debug("Newer version found for context_name=%s: replacing version %s with %s", context_name, existing_version, version)
                                 parsed_files_data.remove(existing_entry)
                                 parsed_files_data.append((project_name, context_name, version, parsed_data))
                             else:
-                                logging.debug(f"Current version for context_name={context_name} ({version}) is not newer than existing version ({existing_version}); skipping.")
+                                logger.debug("Current version for context_name=%s (%s) is not newer than existing version (%s); skipping.", context_name, version, existing_version)
                         else:
                             # Add new entry
-                            logging.debug(f"No existing entry found for context_name={context_name}. Adding new entry.")
+                            logger.debug("No existing entry found for context_name=%s. Adding new entry.", context_name)
                             parsed_files_data.append((project_name, context_name, version, parsed_data))
 
                     except FileNotFoundError:
-                        logging.error(f"File not found: {file_path}")
+                        logger.error("File not found: %s", file_path)
                     except Exception as e:
-                        logging.error(f"Unexpected error with file {file_path}: {e}", exc_info=True)
+                        logger.error("Unexpected error with file %s: %s", file_path, e, exc_info=True)
 
-        logging.info(f"Processed {processed_file_count} files")
+        logger.info("Processed %s files", processed_file_count)
         return parsed_files_data
 
 
@@ -841,10 +881,10 @@ class XMLParser:
                 if filename.endswith('.properties'):
                     i += 1
                     file_path = os.path.join(root, filename)
-                    logging.debug(f"Processing file: {file_path}")
+                    logger.debug("Processing file: %s", file_path)
 
                     try:
-                        self.tree = ET.parse(file_path)
+                        self.tree = self.backend.parse(file_path)
                         self.root = self.tree.getroot()
                         parsed_data = self._parse_file_properties()
 
@@ -854,34 +894,34 @@ class XMLParser:
                         job_name_version = parts[1].replace('.properties', '') if len(parts) > 1 else None
                         job_name = '_'.join(job_name_version.split('_')[:-1])  # Exclude the version part
                         version = job_name_version.split('_')[-1]  # Last part as version
-                        logging.debug(f"Extracted: project_name={project_name}, job_name={job_name}, version={version}")
+                        logger.debug("Extracted: project_name=%s, job_name=%s, version=%s", project_name, job_name, version)
 
                         # Check if job_name already exists and if so, compare versions
                         existing_entry = next((entry for entry in parsed_files_data if entry[1] == job_name), None)
                         if existing_entry:
                             existing_version = existing_entry[2]
-                            logging.debug(f"Existing entry found for job_name={job_name}: existing_version={existing_version}")
+                            logger.debug("Existing entry found for job_name=%s: existing_version=%s", job_name, existing_version)
 
                             # Compare versions (assuming simple numeric comparison)
                             if version > existing_version:
-                                logging.debug(f"Newer version found for job_name={job_name}: replacing version {existing_version} with {version}")
+                                logger.debug("Newer version found for job_name=%s: replacing version %s with %s", job_name, existing_version, version)
                                 parsed_files_data.remove(existing_entry)
                                 parsed_files_data.append((project_name, job_name, version, parsed_data))
                             else:
-                                logging.debug(f"Current version for job_name={job_name} ({version}) is not newer than existing version ({existing_version}); skipping.")
+                                logger.debug("Current version for job_name=%s (%s) is not newer than existing version (%s); skipping.", job_name, version, existing_version)
                         else:
                             # No existing entry, so add new entry with version included
-                            logging.debug(f"No existing entry found for job_name={job_name}. Adding new entry.")
+                            logger.debug("No existing entry found for job_name=%s. Adding new entry.", job_name)
                             parsed_files_data.append((project_name, job_name, version, parsed_data))
 
                     except FileNotFoundError:
-                        logging.error(f"File not found: {file_path}")
-                    except ET.ParseError:
-                        logging.error(f"Error parsing file: {file_path}")
+                        logger.error("File not found: %s", file_path)
+                    except self.backend.ParseError:
+                        logger.error("Error parsing file: %s", file_path)
                     except Exception as e:
-                        logging.error(f"Unexpected error with file {file_path}: {e}", exc_info=True)
+                        logger.error("Unexpected error with file %s: %s", file_path, e, exc_info=True)
 
-        logging.info(f"Processed {i} files")
+        logger.info("Processed %s files", i)
         return parsed_files_data
     
 
@@ -906,11 +946,11 @@ class XMLParser:
                 if filename.endswith('.screenshot'):
                     i += 1
                     file_path = os.path.join(root, filename)
-                    logging.debug(f"Processing screenshot file: {file_path}")
+                    logger.debug("Processing screenshot file: %s", file_path)
 
                     try:
                         # Parse XML file
-                        self.tree = ET.parse(file_path)
+                        self.tree = self.backend.parse(file_path)
                         self.root = self.tree.getroot()
                         parsed_data = self._parse_file_screenshots()
 
@@ -920,32 +960,32 @@ class XMLParser:
                         job_name_version = parts[1].replace('.screenshot', '') if len(parts) > 1 else None
                         job_name = '_'.join(job_name_version.split('_')[:-1])  # Exclude the version part
                         version = job_name_version.split('_')[-1]  # Last part as version
-                        logging.debug(f"Extracted: project_name={project_name}, job_name={job_name}, version={version}")
+                        logger.debug("Extracted: project_name=%s, job_name=%s, version=%s", project_name, job_name, version)
 
                         # Check if job_name already exists and if so, compare versions
                         existing_entry = next((entry for entry in parsed_screenshots_data if entry[1] == job_name), None)
                         if existing_entry:
                             existing_version = existing_entry[2]
-                            logging.debug(f"Existing entry found for job_name={job_name}: existing_version={existing_version}")
+                            logger.debug("Existing entry found for job_name=%s: existing_version=%s", job_name, existing_version)
 
                             # Compare versions (assuming simple numeric comparison)
                             if version > existing_version:
-                                logging.debug(f"Newer version found for job_name={job_name}: replacing version {existing_version} with {version}")
+                                logger.debug("Newer version found for job_name=%s: replacing version %s with %s", job_name, existing_version, version)
                                 parsed_screenshots_data.remove(existing_entry)
                                 parsed_screenshots_data.append((project_name, job_name, version, parsed_data))
                             else:
-                                logging.debug(f"Current version for job_name={job_name} ({version}) is not newer than existing version ({existing_version}); skipping.")
+                                logger.debug("Current version for job_name=%s (%s) is not newer than existing version (%s); skipping.", job_name, version, existing_version)
                         else:
                             # No existing entry, so add new entry with version included
-                            logging.debug(f"No existing entry found for job_name={job_name}. Adding new entry.")
+                            logger.debug("No existing entry found for job_name=%s. Adding new entry.", job_name)
                             parsed_screenshots_data.append((project_name, job_name, version, parsed_data))
 
-                    except ET.ParseError as e:
-                        logging.error(f"Failed to parse screenshot XML file: {file_path}. Error: {e}")
+                    except self.backend.ParseError as e:
+                        logger.error("Failed to parse screenshot XML file: %s. Error: %s", file_path, e)
                     except Exception as e:
-                        logging.error(f"An error occurred while processing the screenshot file: {file_path}. Error: {e}")
+                        logger.error("An error occurred while processing the screenshot file: %s. Error: %s", file_path, e)
 
-        logging.info(f"Processed {i} screenshot files")
+        logger.info("Processed %s screenshot files", i)
         return parsed_screenshots_data
 
     
@@ -956,11 +996,8 @@ class XMLParser:
         and capture image resolution.
         """
         screenshot_data = []
-        # Define the namespace for the ScreenshotsMap element
-        ns = {'talendfile': 'platform:/resource/org.talend.model/model/TalendFile.xsd'}
-
         # Iterate over `talendfile:ScreenshotsMap` elements
-        for screenshot in self.root.findall('talendfile:ScreenshotsMap', ns):
+        for screenshot in self.backend.screenshots(self.root):
             # logging.debug(f"Found `talendfile:ScreenshotsMap` element: {screenshot.attrib}")
 
 
@@ -979,7 +1016,7 @@ class XMLParser:
 
                         # Get the image resolution (width and height)
                         width, height = image.size
-                        logging.info(f"Image resolution: {width} x {height}")
+                        logger.info("Image resolution: %s x %s", width, height)
 
                 
 
@@ -994,10 +1031,10 @@ class XMLParser:
                     screenshot_data.append(data)
 
                 except Exception as e:
-                    logging.error(f"Error decoding base64 or processing image for screenshot: {e}")
+                    logger.error("Error decoding base64 or processing image for screenshot: %s", e)
 
             else:
-                logging.warning("No base64 string found in the screenshot element.")
+                logger.warning("No base64 string found in the screenshot element.")
 
         return screenshot_data
 
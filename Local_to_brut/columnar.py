@@ -0,0 +1,94 @@
+class ParsedFiles(list):
+    """
+    The (project_name, job_name, version, parsed_data) entries returned by `XMLParser.loop_parse_items`,
+    indexed by component type.
+
+    It is still a plain list for the jobs that walk every file, while `components()` hands the jobs
+    interested in a few component types (tMap, tXMLMap, tRunJob...) only the matching nodes.
+    """
+
+    def __init__(self, entries=()):
+        super().__init__(entries)
+        self.by_component = {}  # componentName -> [(project_name, job_name, node), ...]
+        for project_name, job_name, version, parsed_data in self:
+            for node in parsed_data.get('nodes', []):
+                self.by_component.setdefault(node['componentName'], []).append((project_name, job_name, node))
+
+    def components(self, *component_names):
+        """
+        Return the nodes of the given component types.
+
+        Args:
+            *component_names (str): Component types, e.g. 'tMap', 'tXMLMap'.
+
+        Returns:
+            list of tuples: (project_name, job_name, node) entries, in file and node order for a single type.
+        """
+        if len(component_names) == 1:
+            return self.by_component.get(component_names[0], [])
+        return [entry for name in component_names for entry in self.by_component.get(name, [])]
+
+
+class ColumnTable:
+    """
+    A table stored column by column: one Python list per column, all of the same length.
+
+    The parser appends the rows while it walks the `.item` files; jobs then read whole columns and
+    hand `rows()` (a zip over the column lists) straight to the batch inserts.
+    """
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = tuple(columns)
+        self.data = {column: [] for column in self.columns}
+        self._appenders = tuple(self.data[column].append for column in self.columns)
+
+    def __len__(self):
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    def __repr__(self):
+        return f"ColumnTable({self.name!r}, rows={len(self)}, columns={self.columns!r})"
+
+    def append(self, *values):
+        """Append one row, given in column order."""
+        for append, value in zip(self._appenders, values):
+            append(value)
+
+    def column(self, name):
+        """Return the list backing a column."""
+        return self.data[name]
+
+    def rows(self, *columns):
+        """Iterate over row tuples built from the given columns (all columns by default)."""
+        return zip(*(self.data[column] for column in (columns or self.columns)))
+
+
+class ParsedWorkspace:
+    """
+    Columnar view of the `.item` files of a workspace, filled by `XMLParser.loop_parse_items(..., columnar=True)`
+    without building the nested per-file structure.
+
+    Only the tables read by the jobs of `jobs.COLUMNAR_JOBS` exist. Every row carries the
+    (NameProject, NameJob) of its file, and the node rows the unique_name and componentName of
+    their component.
+    """
+    TABLES = {
+        'element_parameters': ('NameProject', 'NameJob', 'unique_name', 'componentName', 'field', 'name', 'show', 'value'),
+        'connections': (
+            'NameProject', 'NameJob', 'connectorName', 'label', 'lineStyle', 'metaname', 'offsetLabelX', 'offsetLabelY',
+            'source', 'target', 'outputId', 'field', 'name', 'value', 'show'
+        ),
+    }
+
+    def __init__(self):
+        self.versions = {}  # (NameProject, NameJob) -> version parsed for that job
+        for table_name, columns in self.TABLES.items():
+            setattr(self, table_name, ColumnTable(table_name, columns))
+
+    def __len__(self):
+        """Number of parsed files (one per job)."""
+        return len(self.versions)
+
+    def __repr__(self):
+        sizes = ", ".join(f"{name}={len(getattr(self, name))}" for name in self.TABLES)
+        return f"ParsedWorkspace({sizes})"
@@ -1,18 +1,20 @@
 import yaml
 import logging
+from log_config import configure_logging
+from metrics import configure_metrics
+from profiling import configure_profiling
 
-# Configure logging
-logging.basicConfig(
-    filename='database_operations.log',
-    level=logging.DEBUG,  # Changed to DEBUG to capture all messages
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='w'  # Ensure the file is overwritten each time for clean logs
-)
+# Log file with the default levels until a Config applies the `Logging` section of config.yaml
+configure_logging()
+logger = logging.getLogger(__name__)
 
 class Config:
     def __init__(self, config_file):
         self.config_file = config_file
         self.config = self.load_config()
+        configure_logging(self.config.get('Logging'))
+        configure_metrics(self.config.get('Metrics'))
+        configure_profiling(self.config.get('Profiling'))
         # logging.info("Loaded configuration: %s", self.config)
 
     def load_config(self):
@@ -32,20 +34,20 @@ class Config:
         """
         try:
             db_type = self.config['database']['type']
-            logging.debug("Database type: %s", db_type)
+            logger.debug("Database type: %s", db_type)
         except KeyError:
-            logging.error("No database type specified in configuration")
+            logger.error("No database type specified in configuration")
             raise KeyError("No database type specified in configuration")
 
         try:
             # Retrieve the database configuration for the specified type
             db_config = self.config['database'][db_type.lower()]
-            logging.debug("Original Database config: %s", db_config)
+            logger.debug("Original Database config: %s", db_config)
             db_config['type'] = db_type  # Add the type to the config
-            logging.debug("Modified Database config with type: %s", db_config)
+            logger.debug("Modified Database config with type: %s", db_config)
             return db_config
         except KeyError:
-            logging.error(f"No configuration found for database type '{db_type}'")
+            logger.error("No configuration found for database type '%s'", db_type)
             raise KeyError(f"No configuration found for database type '{db_type}'")
 
     def get_jdbc_parameters(self):
@@ -60,10 +62,10 @@ class Config:
         """
         try:
             jdbc_params = self.config['Audit_JDBC']
-            logging.debug("JDBC Parameters: %s", jdbc_params)  # Debug log to check the contents of jdbc_params
+            logger.debug("JDBC Parameters: %s", jdbc_params)  # Debug log to check the contents of jdbc_params
             return jdbc_params
         except KeyError:
-            logging.error("No JDBC configuration found in the configuration file")
+            logger.error("No JDBC configuration found in the configuration file")
             raise KeyError("No JDBC configuration found in the configuration file")
 
     def get_param(self, key, value):
@@ -72,7 +74,7 @@ class Config:
             # logging.debug("Parameter: %s -> %s", value, parameter)
             return parameter
         except KeyError:
-            logging.error(f"No parameter found with name '{value}'")
+            logger.error("No parameter found with name '%s'", value)
             raise KeyError(f"No parameter found with name '{value}'")
 
     def get_audit_jdbc_config(self):
@@ -1,17 +1,168 @@
+import hashlib
 import logging
 from config import Config  # Assuming Config class is defined in config.py
 from database import Database  # Assuming Database class is defined in database.py
 from XML_parse import XMLParser  # Importing the XMLParser class
+from columnar import ParsedFiles, ParsedWorkspace
+from metrics import job_metrics
+from itertools import chain, repeat
 from typing import List, Tuple
 
-# Configure logging
-logging.basicConfig(
-    filename='database_operations.log',
-    level=logging.DEBUG,  # Changed to DEBUG to capture all messages
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='w'  # Ensure the file is overwritten each time for clean logs
-)
+logger = logging.getLogger(__name__)
+
+# Sections of the `.item` files (see XMLParser.ITEM_SECTIONS) read by each job.
+# Jobs with an empty set only work on the database or on other parsed files.
+JOB_REQUIREMENTS = {
+    'AUD_300_ALIMJOBCHANGE': set(),
+    'AUD_301_ALIMELEMENTNODE': {'nodes.elementParameters'},
+    'AUD_302_ALIMCONTEXTJOB': set(),
+    'AUD_302_ALIMCONTEXTGroupDetail': set(),
+    'AUD_303_ALIMNODE': {'nodes.elementParameters'},
+    'AUD_303_BIGDATA_PARAMETERS': {'parameters'},
+    'AUD_304_ALIMMETADATA': {'nodes.elementParameters', 'nodes.metadata'},
+    'AUD_305_ALIMVARTABLE_XML': {'nodes.nodeData.varTables'},
+    'AUD_305_ALIMVARTABLE': {'nodes.elementParameters', 'nodes.nodeData.varTables'},
+    'AUD_306_ALIMOUTPUTTABLE': {'nodes.nodeData.outputTables'},
+    'AUD_307_ALIMINPUTTABLE_XML': {'nodes.nodeData.inputTrees'},
+    'AUD_307_ALIMOUTPUTTABLE_XML': {'nodes.nodeData.outputTrees'},
+    'AUD_307_ALIMINPUTTABLE': {'nodes.nodeData.inputTables'},
+    'AUD_308_ALIMCONNECTIONCOMPONENT': {'connections'},
+    'AUD_309_ALIMELEMENTPARAMETER': {'parameters'},
+    'AUD_309_ALIMROUTINES': {'parameters'},
+    'AUD_310_ALIMLIBRARY': {'nodes.elementParameters'},
+    'AUD_311_ALIMELEMENTVALUENODE': {'nodes.elementParameters', 'nodes.elementValues'},
+    'AUD_311_ALIMAGGREGATE': {'nodes.elementParameters', 'nodes.elementValues'},
+    'AUD_312_ALIMJOBFILS': {'nodes.elementParameters'},
+    'AUD_313_ALIMJOBLETS': {'nodes.elementParameters'},
+    'AUD_314_ALIMSUBJOBS_OPT': {'subjobs'},
+    'AUD_315_DELETEINACTIFNODES': set(),
+    'AUD_317_ALIMJOBSERVERPROPRETY': set(),
+    'AUD_318_ALIMCONFQUARTZ': set(),
+    'AUD_319_ALIMDOCCONTEXTGROUP': set(),
+    'AUD_320_ALIMDOCJOBS': set(),
+    'AUD_323_ALIMELEMENTNODEFILTER': set(),
+    'AUD_324_ALIMMETADATAFILTER': set(),
+    'AUD_701_CONVERTSCREENSHOT': set(),
+}
+
+# Jobs that also accept the ParsedWorkspace of `XMLParser.loop_parse_items(..., columnar=True)`.
+# Columnar parsing is only used when every selected job is in this set.
+COLUMNAR_JOBS = {'AUD_301_ALIMELEMENTNODE', 'AUD_308_ALIMCONNECTIONCOMPONENT'}
+
+
+def required_sections(job_names):
+    """
+    Return the `.item` sections needed to run the given jobs, to be passed to `XMLParser(required=...)`.
+
+    Args:
+        job_names (iterable of str): Names of the AUD jobs selected for the run.
+
+    Returns:
+        set or None: Union of the jobs' requirements, or None (parse everything) if a job is unknown.
+    """
+    required = set()
+    for job_name in job_names:
+        if job_name not in JOB_REQUIREMENTS:
+            logger.warning("No parse requirements declared for %s, parsing full files.", job_name)
+            return None
+        required |= JOB_REQUIREMENTS[job_name]
+    return required
+
+
+def iter_components(parsed_files_data, *component_names, prefix=None):
+    """
+    Yield the nodes of the given component types from the parsed `.item` files.
+
+    Args:
+        parsed_files_data (ParsedFiles or list of tuples): Output of `XMLParser.loop_parse_items`.
+        *component_names (str): Component types to keep, e.g. 'tMap'.
+        prefix (str, optional): Also keep the component types starting with it, e.g. 'tAggregate'.
 
+    Returns:
+        iterator of tuples: (project_name, job_name, node) for every matching node. The componentName
+        index of ParsedFiles is used when available, otherwise every node is scanned.
+    """
+    if isinstance(parsed_files_data, ParsedFiles):
+        if prefix:
+            component_names += tuple(
+                name for name in parsed_files_data.by_component
+                if name.startswith(prefix) and name not in component_names
+            )
+        return iter(parsed_files_data.components(*component_names))
+    return (
+        (project_name, job_name, node)
+        for project_name, job_name, version, parsed_data in parsed_files_data
+        for node in parsed_data['nodes']
+        if node['componentName'] in component_names or (prefix and node['componentName'].startswith(prefix))
+    )
+
+
+def item_hash(file_path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of the content of an `.item` file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as item_file:
+        for chunk in iter(lambda: item_file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@job_metrics
+def AUD_300_ALIMJOBCHANGE(config: Config, db: Database, items_directory: str, execution_date: str, batch_size=100):
+    """
+    Record in aud_jobchange the jobs whose `.item` file changed since the previous run.
+
+    The newest `.item` file of each job (see `XMLParser.newest_items`) is hashed and compared with
+    the version and hash stored for the job. Only new or changed jobs are upserted, with the run's
+    `execution_date`, so the `exec_date` of a job in aud_jobchange is the date of its last change:
+    the incremental Brut_to_agg jobs recompute the jobs changed since their previous run from it.
+    Known jobs whose `.item` file is gone are upserted once with no version nor hash, so their
+    aud_agg_* rows are purged by that recomputation.
+
+    Args:
+        config (Config): Config instance for retrieving the queries.
+        db (Database): Database instance for database operations.
+        items_directory (str): Directory of the `.item` files.
+        execution_date (str): Timestamp of the run.
+        batch_size (int): Batch size for the inserts.
+    """
+    try:
+        aud_jobchange_query = config.get_param('queries', 'aud_jobchange')
+        logger.info("Executing query: %s", aud_jobchange_query)
+        known_jobs = {
+            (project_name, job_name): (version, content_hash)
+            for project_name, job_name, version, content_hash in db.execute_query(aud_jobchange_query)
+        }
+
+        insert_query = config.get_param('insert_queries', 'aud_jobchange')
+        batch_insert = db.batcher(insert_query, 'aud_jobchange', initial_size=batch_size)
+        changed = 0
+        workspace_jobs = set()
+        for project_name, job_name, version, file_path in XMLParser().newest_items(items_directory):
+            workspace_jobs.add((project_name, job_name))
+            try:
+                content_hash = item_hash(file_path)
+            except OSError as e:
+                logger.error("Error reading %s: %s", file_path, e)
+                continue
+            if known_jobs.get((project_name, job_name)) != (version, content_hash):
+                batch_insert.append((project_name, job_name, version, content_hash, execution_date))
+                changed += 1
+
+        # Jobs removed from the workspace since the previous run
+        removed = 0
+        for (project_name, job_name), known in known_jobs.items():
+            if (project_name, job_name) not in workspace_jobs and known != (None, None):
+                batch_insert.append((project_name, job_name, None, None, execution_date))
+                removed += 1
+        batch_insert.flush()
+        logger.info("%s jobs changed and %s removed out of %s known.", changed, removed, len(known_jobs))
+
+    except Exception as e:
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
+
+
+@job_metrics
 def AUD_301_ALIMELEMENTNODE(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     """
     Perform operations including retrieving JDBC parameters, executing queries,
@@ -20,7 +171,8 @@ def AUD_301_ALIMELEMENTNODE(config: Config, db: Database, parsed_files_data: Lis
     Args:
         config (Config): An instance of the Config class for retrieving configuration parameters.
         db (Database): An instance of the Database class for executing database operations.
-        parsed_files_data (List[Tuple[str, str, dict]]): List of parsed file data containing project names, job names, and parsed data dictionaries.
+        parsed_files_data (List[Tuple[str, str, dict]]): List of parsed file data containing project names, job names, and parsed data dictionaries,
+            or a ParsedWorkspace built with `loop_parse_items(..., columnar=True)`.
     """
     try:
 
@@ -28,7 +180,7 @@ def AUD_301_ALIMELEMENTNODE(config: Config, db: Database, parsed_files_data: Lis
 
         # Step 4: Execute aud_elementnode query
         aud_elementnode_query = config.get_param('queries', 'aud_elementnode')
-        logging.info(f"Executing query: {aud_elementnode_query}")
+        logger.info("Executing query: %s", aud_elementnode_query)
         aud_elementnode_results = db.execute_query(aud_elementnode_query)
         #logging.debug(f"aud_elementnode_results: {aud_elementnode_results}")
 
@@ -49,47 +201,51 @@ def AUD_301_ALIMELEMENTNODE(config: Config, db: Database, parsed_files_data: Lis
 
         # Step 6: Insert parsed data into the aud_elementnode table in batches
         insert_query = config.get_param('insert_queries', 'aud_elementnode')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_elementnode', initial_size=batch_size)
+
+        if isinstance(parsed_files_data, ParsedWorkspace):
+            # Columnar workspace: build the rows straight from the element_parameters columns
+            table = parsed_files_data.element_parameters
+            show = [1 if value == 'true' else 0 if value == 'false' else None for value in table.column('show')]
+            rows = zip(
+                table.column('componentName'), table.column('field'), table.column('name'), show, table.column('value'),
+                table.column('unique_name'), table.column('NameProject'), table.column('NameJob'), repeat(execution_date)
+            )
+            batch_insert.extend(rows)
+            batch_insert.flush()
+            return
 
         for project_name, job_name, version, parsed_data in parsed_files_data:
             for data in parsed_data['nodes']:
                 for elem_param in data['elementParameters']:
                     componentName = data['componentName']
-                    field = elem_param['field']
-                    name = elem_param['name']
-                    show = 1 if elem_param['show'] == 'true' else 0 if elem_param['show'] == 'false' else None
-                    value = elem_param['value']
-
-                    # Adjust the value of Componement_UniqueName as needed
-                    Componement_UniqueName = value if field == 'TEXT' and name == 'UNIQUE_NAME' else Componement_UniqueName
-                    params = (componentName, field, name, show, value, Componement_UniqueName, project_name, job_name, execution_date)
+                    field = elem_param.field
+                    name = elem_param.name
+                    show = 1 if elem_param.show == 'true' else 0 if elem_param.show == 'false' else None
+                    value = elem_param.value
+                    params = (componentName, field, name, show, value, data['uniqueName'], project_name, job_name, execution_date)
                     batch_insert.append(params)
 
-                    if len(batch_insert) == batch_size:
-                        db.insert_data_batch(insert_query, 'aud_elementnode', batch_insert)
-                        # #logging.info(f"Inserted batch of data into aud_elementnode: {len(batch_insert)} rows")
-                        batch_insert.clear()
-
         # Insert remaining data in the batch
-        if batch_insert:
-            db.insert_data_batch(insert_query, 'aud_elementnode', batch_insert)
-            #logging.info(f"Inserted remaining batch of data into aud_elementnode: {len(batch_insert)} rows")
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_302_ALIMCONTEXTJOB(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
 
     
         # Step 4: Execute aud_contextjob query
         aud_contextjob_query = config.get_param('queries', 'aud_contextjob')
-        logging.info(f"Executing query: {aud_contextjob_query}")
+        logger.info("Executing query: %s", aud_contextjob_query)
         aud_contextjob_results = db.execute_query(aud_contextjob_query)
         #logging.debug(f"aud_contextjob_results: {aud_contextjob_results}")
 
@@ -100,11 +256,11 @@ def AUD_302_ALIMCONTEXTJOB(config: Config, db: Database, parsed_files_data: List
         ]
         if aud_contextjob_conditions_batch:
             db.delete_records_batch('aud_contextjob', aud_contextjob_conditions_batch)
-            logging.info(f"Deleted {len(aud_contextjob_conditions_batch)} records from aud_contextjob")
+            logger.info("Deleted %s records from aud_contextjob", len(aud_contextjob_conditions_batch))
 
         # Step 6: Prepare batch insertion for aud_contextjob
-        aud_contextjob_data_batch = []
         insert_query = config.get_param('insert_queries', 'aud_contextjob')
+        aud_contextjob_data_batch = db.batcher(insert_query, 'aud_contextjob', initial_size=batch_size)
 
         for project_name, job_name, version, parsed_data in parsed_files_data:
             for context in parsed_data['contexts']:
@@ -123,32 +279,26 @@ def AUD_302_ALIMCONTEXTJOB(config: Config, db: Database, parsed_files_data: List
                         environementContextName, nameContext, prompt, promptNeeded, typeContext, valueContext, repositoryContextId, project_name, job_name, execution_date
                     ))
 
-
-                    if len(aud_contextjob_data_batch) == batch_size:
-                        db.insert_data_batch(insert_query, 'aud_contextjob', aud_contextjob_data_batch)
-                        # #logging.info(f"Inserted batch of data into aud_elementnode: {len(batch_insert)} rows")
-                        aud_contextjob_data_batch.clear()
-
         # Insert remaining data in the batch
-        if aud_contextjob_data_batch:
-            db.insert_data_batch(insert_query, 'aud_contextjob', aud_contextjob_data_batch)
-            #logging.info(f"Inserted remaining batch of data into aud_elementnode: {len(batch_insert)} rows")
+        aud_contextjob_data_batch.flush()
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
 
 
 
 
 
+@job_metrics
 def AUD_302_ALIMCONTEXTGroupDetail(config: Config, db: Database, parsed_context_data: List[Tuple[str, str, dict]],exec_date : str,batch_size=100 ):
     try:
 
-        aud_contextGroup_data_batch= []
         insert_query = config.get_param('insert_queries', 'aud_contextgroupdetail')
+        aud_contextGroup_data_batch = db.batcher(insert_query, 'aud_contextgroupdetail', initial_size=batch_size)
         for NameProject, context_name, version, parsed_data in parsed_context_data:
             for context in parsed_data['contexts']:
                 for param in context['parameters']:
@@ -161,26 +311,20 @@ def AUD_302_ALIMCONTEXTGroupDetail(config: Config, db: Database, parsed_context_
                         aud_nameContext, aud_commentContext, NameProject, context_name, exec_date
                     ))
 
-
-                    if len(aud_contextGroup_data_batch) == batch_size:
-                        db.insert_data_batch(insert_query, 'aud_contextgroupdetail', aud_contextGroup_data_batch)
-                        # #logging.info(f"Inserted batch of data into aud_elementnode: {len(batch_insert)} rows")
-                        aud_contextGroup_data_batch.clear()
-
         # Insert remaining data in the batch
-        if aud_contextGroup_data_batch:
-            db.insert_data_batch(insert_query, 'aud_contextgroupdetail', aud_contextGroup_data_batch)
-            #logging.info(f"Inserted remaining batch of data into aud_elementnode: {len(batch_insert)} rows")
+        aud_contextGroup_data_batch.flush()
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
 
 
 
 
+@job_metrics
 def AUD_303_ALIMNODE(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
 
@@ -190,7 +334,7 @@ def AUD_303_ALIMNODE(config: Config, db: Database, parsed_files_data: List[Tuple
         
         # Step 4: Execute aud_node query
         aud_node_query = config.get_param('queries', 'aud_node')
-        logging.info(f"Executing query: {aud_node_query}")
+        logger.info("Executing query: %s", aud_node_query)
         aud_node_results = db.execute_query(aud_node_query)
         #logging.debug(f"aud_node_results: {aud_node_results}")
 
@@ -204,7 +348,7 @@ def AUD_303_ALIMNODE(config: Config, db: Database, parsed_files_data: List[Tuple
 
         # Step 6: Prepare data batch for insertion into aud_elementnode
         insert_query = config.get_param('insert_queries', 'aud_node')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_node', initial_size=batch_size)
         for project_name, job_name, version, parsed_data in parsed_files_data:
             for data in parsed_data['nodes']:
                 for elem_param in data['elementParameters']:
@@ -219,46 +363,24 @@ def AUD_303_ALIMNODE(config: Config, db: Database, parsed_files_data: List[Tuple
                     show = elem_param['show']
                     value = elem_param['value']
 
-                    # Adjust the value of Componement_UniqueName as needed
-                    Componement_UniqueName = value if field == 'TEXT' and name == 'UNIQUE_NAME' else Componement_UniqueName
-
                     params = (
                         componentName, componentVersion, offsetLabelX, offsetLabelY, posX, posY,
-                        Componement_UniqueName, project_name, job_name, execution_date
+                        data['uniqueName'], project_name, job_name, execution_date
                     )
 
                     batch_insert.append(params)
 
-                    if len(batch_insert) == batch_size:
-                        db.insert_data_batch(insert_query, 'aud_node', batch_insert)
-                        # #logging.info(f"Inserted batch of data into aud_node: {len(batch_insert)} rows")
-                        batch_insert.clear()
-
         # Insert remaining data in the batch
-        if batch_insert:
-            db.insert_data_batch(insert_query, 'aud_node', batch_insert)
-            #logging.info(f"Inserted remaining batch of data into aud_node: {len(batch_insert)} rows")
-
-        # Step 7: Execute NodeJoinElementnode query
-        NodeJoinElementnode_query = config.get_param('queries', 'NodeJoinElementnode')
-        logging.info(f"Executing query: {NodeJoinElementnode_query}")
-        NodeJoinElementnode_results = db.execute_query(NodeJoinElementnode_query)
-        #logging.debug(f"NodeJoinElementnode_results: {NodeJoinElementnode_results}")
-
-        # Step 8: Delete the output from aud_node based on the query results
-        aud_node_delete_conditions_batch = [
-            {'NameProject': result[0], 'NameJob': result[1], 'aud_componentValue': result[2]}
-            for result in NodeJoinElementnode_results
-        ]
-        if aud_node_delete_conditions_batch:
-            db.delete_records_batch('aud_node', aud_node_delete_conditions_batch)
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
+@job_metrics
 def AUD_303_BIGDATA_PARAMETERS(
     config: Config,
     db: Database,
@@ -282,7 +404,7 @@ def AUD_303_BIGDATA_PARAMETERS(
 
         # Step 4: Execute aud_bigdata query
         aud_bigdata_query = config.get_param('queries', 'aud_bigdata')
-        logging.info(f"Executing query: {aud_bigdata_query}")
+        logger.info("Executing query: %s", aud_bigdata_query)
         aud_bigdata_results = db.execute_query(aud_bigdata_query)
         #logging.debug(f"aud_bigdata_results: {aud_bigdata_results}")
 
@@ -295,8 +417,12 @@ def AUD_303_BIGDATA_PARAMETERS(
             db.delete_records_batch('aud_contextjob', aud_contextjob_conditions_batch)
 
         # Step 6: Prepare batches for insertion into aud_bigdata and aud_bigdata_elementvalue tables
-        aud_bigdata_batch = []
-        aud_bigdata_elementvalue_batch = []
+        aud_bigdata_batch = db.batcher(
+            config.get_param('insert_queries', 'aud_bigdata'), 'aud_bigdata', initial_size=batch_size
+        )
+        aud_bigdata_elementvalue_batch = db.batcher(
+            config.get_param('insert_queries', 'aud_bigdata_elementvalue'), 'aud_bigdata_elementvalue', initial_size=batch_size
+        )
 
         for project_name, job_name, version, parsed_data in parsed_files_data:
             # Prepare aud_bigdata batch
@@ -322,39 +448,23 @@ def AUD_303_BIGDATA_PARAMETERS(
                         execution_date
                     ))
 
-            # Step 7: Insert data in batches
-            if len(aud_bigdata_batch) == batch_size:
-                insert_query = config.get_param('insert_queries', 'aud_bigdata')
-                db.insert_data_batch(insert_query, 'aud_bigdata', aud_bigdata_batch)
-                aud_bigdata_batch.clear()  # Clear the batch after insertion
-
         # Insert remaining data in the batch
-        if aud_bigdata_batch:
-            insert_query = config.get_param('insert_queries', 'aud_bigdata')
-            db.insert_data_batch(insert_query, 'aud_bigdata', aud_bigdata_batch)
-            #logging.info(f"Inserted remaining batch of data into aud_bigdata: {len(aud_bigdata_batch)} rows")
-
-        # Insert data for aud_bigdata_elementvalue
-        if len(aud_bigdata_elementvalue_batch) == batch_size:
-            insert_query = config.get_param('insert_queries', 'aud_bigdata_elementvalue')
-            db.insert_data_batch(insert_query, 'aud_bigdata_elementvalue', aud_bigdata_elementvalue_batch)
-            aud_bigdata_elementvalue_batch.clear()  # Clear the batch after insertion
+        aud_bigdata_batch.flush()
 
         # Insert remaining data in the batch for aud_bigdata_elementvalue
-        if aud_bigdata_elementvalue_batch:
-            insert_query = config.get_param('insert_queries', 'aud_bigdata_elementvalue')
-            db.insert_data_batch(insert_query, 'aud_bigdata_elementvalue', aud_bigdata_elementvalue_batch)
-            #logging.info(f"Inserted remaining batch of data into aud_bigdata_elementvalue: {len(aud_bigdata_elementvalue_batch)} rows")
+        aud_bigdata_elementvalue_batch.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
-            logging.info("Done!")
+            logger.info("Done!")
             # Uncomment to close the database connection if needed
             # db.close()
 
 
+@job_metrics
 def AUD_304_ALIMMETADATA(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     """
     Perform various database operations including retrieving JDBC parameters, 
@@ -372,7 +482,7 @@ def AUD_304_ALIMMETADATA(config: Config, db: Database, parsed_files_data: List[T
 
         # Step 4: Execute aud_metadata query
         aud_metadata_query = config.get_param('queries', 'aud_metadata')
-        logging.info(f"Executing query: {aud_metadata_query}")
+        logger.info("Executing query: %s", aud_metadata_query)
         aud_metadata_results = db.execute_query(aud_metadata_query)
         #logging.debug(f"aud_metadata_results: {aud_metadata_results}")
 
@@ -389,8 +499,8 @@ def AUD_304_ALIMMETADATA(config: Config, db: Database, parsed_files_data: List[T
         # logging.info(f"Deleted records for projects/jobs: {[(d['NameProject'], d['NameJob']) for d in delete_conditions]}")
 
         # Step 6: Collect parsed parameters data into batches
-        data_batch = []
         insert_query = config.get_param('insert_queries', 'aud_metadata')
+        data_batch = db.batcher(insert_query, 'aud_metadata', initial_size=batch_size)
 
         i=0
         for project_name, job_name, version, parsed_data in parsed_files_data:
@@ -399,7 +509,6 @@ def AUD_304_ALIMMETADATA(config: Config, db: Database, parsed_files_data: List[T
                     field = elem_param['field']
                     name = elem_param['name']
                     value = elem_param['value']
-                    Componement_UniqueName = value if field == 'TEXT' and name == 'UNIQUE_NAME' else Componement_UniqueName
                     for meta in node_data['metadata']:
                         for column in meta['columns']:
                             i+=1
@@ -419,7 +528,7 @@ def AUD_304_ALIMMETADATA(config: Config, db: Database, parsed_files_data: List[T
                                 0 if column['usefulColumn'] == 'false' else 1 if column['usefulColumn'] == 'true' else None,
                                 column['originalLength'],
                                 column['defaultValue'],
-                                Componement_UniqueName,
+                                node_data['uniqueName'],
                                 node_data['componentName'],
                                 project_name,
                                 job_name,
@@ -428,46 +537,21 @@ def AUD_304_ALIMMETADATA(config: Config, db: Database, parsed_files_data: List[T
                             
                             data_batch.append(params)
 
-                            # If the batch size is reached, insert the data
-                            if len(data_batch) == batch_size:
-                                db.insert_data_batch(insert_query, 'aud_metadata', data_batch)
-                                # logging.info(f"Inserted batch of data into aud_metadata: {len(data_batch)} rows")
-                                data_batch.clear()
-
         # Insert remaining data in the batch
-        if data_batch:
-            db.insert_data_batch(insert_query, 'aud_metadata', data_batch)
-            logging.info(f"Inserted batch of data into aud_metadata: {len(data_batch)} rows")
-
-        logging.debug(f"i : {i}")
+        data_batch.flush()
 
-
-        # Step 7: Execute MetadataJoinElemntnode query
-        metadata_join_element_node_query = config.get_param('queries', 'MetadataJoinElemntnode')
-        logging.info(f"Executing query: {metadata_join_element_node_query}")
-        metadata_join_element_node_results = db.execute_query(metadata_join_element_node_query)
-        #logging.debug(f"MetadataJoinElemntnode_results: {metadata_join_element_node_results}")
-
-        # Step 8: Delete records based on MetadataJoinElemntnode query results
-        delete_conditions = []
-        for result in metadata_join_element_node_results:
-            project_name, job_name = result
-            # #logging.debug(f"Preparing to delete records for PROJECT_NAME: {project_name}, JOB_NAME: {job_name}")
-            delete_conditions.append({
-                'NameProject': project_name,
-                'NameJob': job_name
-            })
-        db.delete_records_batch('aud_metadata', delete_conditions)
-        # logging.info(f"Deleted records for projects/jobs: {[(d['NameProject'], d['NameJob']) for d in delete_conditions]}")
+        logger.debug("i : %s", i)
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("Database connection closed")
+            logger.info("Database connection closed")
 
 
+@job_metrics
 def AUD_305_ALIMVARTABLE_XML(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     """
     Perform operations including retrieving JDBC parameters, executing queries,
@@ -484,9 +568,9 @@ def AUD_305_ALIMVARTABLE_XML(config: Config, db: Database, parsed_files_data: Li
         
 
         # Step 4: Execute aud_vartable_xml query
-        vartableJoinElemntnode_query = config.get_param('queries', 'aud_vartable_xml')
-        logging.info(f"Executing query: {vartableJoinElemntnode_query}")
-        aud_vartable_xml_results = db.execute_query(vartableJoinElemntnode_query)
+        aud_vartable_xml_query = config.get_param('queries', 'aud_vartable_xml')
+        logger.info("Executing query: %s", aud_vartable_xml_query)
+        aud_vartable_xml_results = db.execute_query(aud_vartable_xml_query)
         #logging.debug(f"aud_vartable_xml_results: {aud_vartable_xml_results}")
 
         # Step 5: Delete records from aud_vartable_xml in batches
@@ -506,86 +590,50 @@ def AUD_305_ALIMVARTABLE_XML(config: Config, db: Database, parsed_files_data: Li
 
         # Step 6: Insert parsed data into the aud_vartable_xml table in batches
         insert_query = config.get_param('insert_queries', 'aud_vartable_xml')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_vartable_xml', initial_size=batch_size)
 
-        for project_name, job_name, version, parsed_data in parsed_files_data:
-            # logging.info(f"Processing project: {project_name}, job: {job_name}")
-            for data in parsed_data['nodes']:
-                componentName = data['componentName']
-                if componentName == 'tXMLMap':
+        for project_name, job_name, data in iter_components(parsed_files_data, 'tXMLMap'):
+            componentName = data['componentName']
+            Componement_UniqueName = data['uniqueName']
 
-                    ##logging.debug(f"Processing component: {componentName}")
+            ##logging.debug(f"Processing component: {componentName}")
 
-                    for elem_param in data['elementParameters']:
-                        field = elem_param['field']
-                        name = elem_param['name']
-                        show = elem_param['show']
-                        value = elem_param['value']
-                        Componement_UniqueName = value if field == 'TEXT' and name == 'UNIQUE_NAME' else Componement_UniqueName
-                        ##logging.debug(f"Element parameter - field: {field}, name: {name}, value: {value}")
-
-                    for nodeData in data['nodeData']:
-                        # Access 'varTables' and its properties
-                        aud_Var = nodeData.get('varTables', {}).get('name', '')
-                        aud_sizeState = nodeData.get('varTables', {}).get('sizeState', '')
-                        # logging.debug(f"Node data - aud_Var: {aud_Var}, aud_sizeState: {aud_sizeState}")
-
-                        # Access 'mapperTableEntries' within 'varTables'
-                        for mapperTableEntry in nodeData.get('varTables', {}).get('mapperTableEntries', []):
-                            aud_nameVar = mapperTableEntry.get('name', '')
-                            aud_expressionVar = mapperTableEntry.get('expression', '')
-                            aud_type = mapperTableEntry.get('type', '')
-                            # logging.debug(f"mapperTableEntries - nameVar: {aud_nameVar}, expressionVar: {aud_expressionVar}, type: {aud_type}")
-
-
-                            params = (
-                                componentName, Componement_UniqueName, aud_Var, aud_sizeState, 
-                                aud_nameVar, aud_expressionVar, aud_type, 
-                                project_name, job_name, execution_date
-                            )
+            for nodeData in data['nodeData']:
+                # Access 'varTables' and its properties
+                aud_Var = nodeData.get('varTables', {}).get('name', '')
+                aud_sizeState = nodeData.get('varTables', {}).get('sizeState', '')
+                # logging.debug(f"Node data - aud_Var: {aud_Var}, aud_sizeState: {aud_sizeState}")
 
-                            batch_insert.append(params)
-
-                            if len(batch_insert) == batch_size:
-                                db.insert_data_batch(insert_query, 'aud_vartable_xml', batch_insert)
-                                # #logging.info(f"Inserted batch of data into aud_vartable_xml: {len(batch_insert)} rows")
-                                batch_insert.clear()
+                # Access 'mapperTableEntries' within 'varTables'
+                for mapperTableEntry in nodeData.get('varTables', {}).get('mapperTableEntries', []):
+                    aud_nameVar = mapperTableEntry.get('name', '')
+                    aud_expressionVar = mapperTableEntry.get('expression', '')
+                    aud_type = mapperTableEntry.get('type', '')
+                    # logging.debug(f"mapperTableEntries - nameVar: {aud_nameVar}, expressionVar: {aud_expressionVar}, type: {aud_type}")
 
-            # Insert remaining data in the batch
-            if batch_insert:
-                db.insert_data_batch(insert_query, 'aud_vartable_xml', batch_insert)
-                #logging.info(f"Inserted remaining batch of data into aud_vartable_xml: {len(batch_insert)} rows")
 
-        # Step 7: Execute vartableJoinElemntnode query
-        vartableJoinElemntnode_query = config.get_param('queries', 'vartableJoinElemntnode')
-        logging.info(f"Executing query: {vartableJoinElemntnode_query}")
-        vartableJoinElemntnode_results = db.execute_query(vartableJoinElemntnode_query)
-        #logging.debug(f"vartableJoinElemntnode_results: {vartableJoinElemntnode_results}")
+                    params = (
+                        componentName, Componement_UniqueName, aud_Var, aud_sizeState, 
+                        aud_nameVar, aud_expressionVar, aud_type, 
+                        project_name, job_name, execution_date
+                    )
 
-        # Step 5: Delete records from aud_vartable_xml in batches
-        batch_delete_conditions = []
-        for result in vartableJoinElemntnode_results:
-            project_name, job_name,componentValue = result
-            batch_delete_conditions.append({'NameProject': project_name, 'NameJob': job_name})
-            if len(batch_delete_conditions) == batch_size:
-                db.delete_records_batch('aud_vartable_xml', batch_delete_conditions)
-                #logging.info(f"Batch deleted records from aud_vartable_xml: {len(batch_delete_conditions)} rows")
-                batch_delete_conditions.clear()
+                    batch_insert.append(params)
 
-        # Delete remaining records
-        if batch_delete_conditions:
-            db.delete_records_batch('aud_vartable_xml', batch_delete_conditions)
-           # logging.info(f"Batch deleted remaining records from aud_vartable_xml: {len(batch_delete_conditions)} rows")
+        # Insert remaining data in the batch
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
             
 
 
+@job_metrics
 def AUD_305_ALIMVARTABLE(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     """
     Perform operations including retrieving JDBC parameters, executing queries,
@@ -602,9 +650,9 @@ def AUD_305_ALIMVARTABLE(config: Config, db: Database, parsed_files_data: List[T
         
 
         # Step 4: Execute aud_vartable query
-        vartableJoinElemntnode_query = config.get_param('queries', 'aud_vartable')
-        logging.info(f"Executing query: {vartableJoinElemntnode_query}")
-        aud_vartable_results = db.execute_query(vartableJoinElemntnode_query)
+        aud_vartable_query = config.get_param('queries', 'aud_vartable')
+        logger.info("Executing query: %s", aud_vartable_query)
+        aud_vartable_results = db.execute_query(aud_vartable_query)
         #logging.debug(f"aud_vartable_results: {aud_vartable_results}")
 
         # Step 5: Delete records from aud_vartable in batches
@@ -624,89 +672,59 @@ def AUD_305_ALIMVARTABLE(config: Config, db: Database, parsed_files_data: List[T
 
         # Step 6: Insert parsed data into the aud_vartable table in batches
         insert_query = config.get_param('insert_queries', 'aud_vartable')
-        batch_insert = []
-        batch_size = batch_size  # Use the provided batch size
+        batch_insert = db.batcher(insert_query, 'aud_vartable', initial_size=batch_size)
+
+        for project_name, job_name, data in iter_components(parsed_files_data, 'tMap'):
+            componentName = data['componentName']
+            Componement_UniqueName = data['uniqueName']
+            # #logging.debug(f"Processing component: {componentName}")
+
+            for elem_param in data['elementParameters']:
+                field = elem_param['field']
+                name = elem_param['name']
+                show = elem_param['show']
+                value = elem_param['value']
+                # #logging.debug(f"Element parameter - field: {field}, name: {name}, value: {value}")
+                for nodeData in data['nodeData']:
+                    # Access 'varTables' and its properties safely
+                    # logging.debug(f"nodeData : {nodeData}")
+                    var_tables = nodeData.get('varTables', {})
+                    aud_Var = var_tables.get('name', '')
+                    aud_sizeState = var_tables.get('sizeState', '')
+                    shellMaximized = nodeData.get('uiPropefties', {}).get('shellMaximized', 0)
+
+                    # logging.debug(f"Node data - aud_Var: {aud_Var}, aud_sizeState: {aud_sizeState}")
+
+                    # Access 'mapperTableEntries' within 'varTables' safely
+                    mapper_table_entries = var_tables.get('mapperTableEntries', [])
+                    # logging.debug(f"mapperTableEntries : {mapper_table_entries}")
+                    for mapperTableEntry in mapper_table_entries:
+                        aud_nameVar = mapperTableEntry.get('name', '')
+                        aud_expressionVar = mapperTableEntry.get('expression', '')
+                        aud_type = mapperTableEntry.get('type', '')
+                        # logging.debug(f"mapperTableEntries - nameVar: {aud_nameVar}, expressionVar: {aud_expressionVar}, type: {aud_type}")
 
-        for project_name, job_name, version, parsed_data in parsed_files_data:
-            # logging.info(f"Processing project: {project_name}, job: {job_name}")
-            for data in parsed_data['nodes']:
-                componentName = data['componentName']
-                # #logging.debug(f"Processing component: {componentName}")
-                if componentName == 'tMap':
-
-                    for elem_param in data['elementParameters']:
-                        field = elem_param['field']
-                        name = elem_param['name']
-                        show = elem_param['show']
-                        value = elem_param['value']
-                        Componement_UniqueName = value if field == 'TEXT' and name == 'UNIQUE_NAME' else Componement_UniqueName
-                        # #logging.debug(f"Element parameter - field: {field}, name: {name}, value: {value}")
-                        for nodeData in data['nodeData']:
-                            # Access 'varTables' and its properties safely
-                            # logging.debug(f"nodeData : {nodeData}")
-                            var_tables = nodeData.get('varTables', {})
-                            aud_Var = var_tables.get('name', '')
-                            aud_sizeState = var_tables.get('sizeState', '')
-                            shellMaximized = nodeData.get('uiPropefties', {}).get('shellMaximized', 0)
-
-                            # logging.debug(f"Node data - aud_Var: {aud_Var}, aud_sizeState: {aud_sizeState}")
-
-                            # Access 'mapperTableEntries' within 'varTables' safely
-                            mapper_table_entries = var_tables.get('mapperTableEntries', [])
-                            # logging.debug(f"mapperTableEntries : {mapper_table_entries}")
-                            for mapperTableEntry in mapper_table_entries:
-                                aud_nameVar = mapperTableEntry.get('name', '')
-                                aud_expressionVar = mapperTableEntry.get('expression', '')
-                                aud_type = mapperTableEntry.get('type', '')
-                                # logging.debug(f"mapperTableEntries - nameVar: {aud_nameVar}, expressionVar: {aud_expressionVar}, type: {aud_type}")
-
-                                params = (
-                                    componentName, Componement_UniqueName, aud_Var, aud_sizeState, 
-                                    aud_nameVar, aud_expressionVar, aud_type, shellMaximized, 
-                                    project_name, job_name, execution_date
-                                )
-
-                                batch_insert.append(params)
-
-                            if len(batch_insert) == batch_size:
-                                db.insert_data_batch(insert_query, 'aud_vartable', batch_insert)
-                                # #logging.info(f"Inserted batch of data into aud_vartable: {len(batch_insert)} rows")
-                                batch_insert.clear()
-
-            # Insert remaining data in the batch
-            if batch_insert:
-                db.insert_data_batch(insert_query, 'aud_vartable', batch_insert)
-                #logging.info(f"Inserted remaining batch of data into aud_vartable: {len(batch_insert)} rows")
-
-        # Step 7: Execute vartableJoinElemntnode query
-        vartableJoinElemntnode_query = config.get_param('queries', 'vartableJoinElemntnode')
-        logging.info(f"Executing query: {vartableJoinElemntnode_query}")
-        vartableJoinElemntnode_results = db.execute_query(vartableJoinElemntnode_query)
-        #logging.debug(f"vartableJoinElemntnode_results: {vartableJoinElemntnode_results}")
+                        params = (
+                            componentName, Componement_UniqueName, aud_Var, aud_sizeState, 
+                            aud_nameVar, aud_expressionVar, aud_type, shellMaximized, 
+                            project_name, job_name, execution_date
+                        )
 
-        # Step 5: Delete records from aud_vartable in batches
-        batch_delete_conditions = []
-        for result in vartableJoinElemntnode_results:
-            project_name, job_name,componentValue = result
-            batch_delete_conditions.append({'NameProject': project_name, 'NameJob': job_name})
-            if len(batch_delete_conditions) == batch_size:
-                db.delete_records_batch('aud_vartable', batch_delete_conditions)
-                #logging.info(f"Batch deleted records from aud_vartable: {len(batch_delete_conditions)} rows")
-                batch_delete_conditions.clear()
+                        batch_insert.append(params)
 
-        # Delete remaining records
-        if batch_delete_conditions:
-            db.delete_records_batch('aud_vartable', batch_delete_conditions)
-           # logging.info(f"Batch deleted remaining records from aud_vartable: {len(batch_delete_conditions)} rows")
+        # Insert remaining data in the batch
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_306_ALIMOUTPUTTABLE(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
        
@@ -733,85 +751,57 @@ def AUD_306_ALIMOUTPUTTABLE(config: Config, db: Database, parsed_files_data: Lis
 
         # Step 6: Insert parsed data into aud_outputtable in batches
         insert_query = config.get_param('insert_queries', 'aud_outputtable')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_outputtable', initial_size=batch_size)
 
-        for project_name, job_name, version, parsed_data in parsed_files_data:
-            # logging.info(f"Processing project: {project_name}, job: {job_name}")
-            for data in parsed_data['nodes']:
-                aud_componentName = data['componentName']
-                if aud_componentName == 'tMap':
-                    for elem_param in data['elementParameters']:
-                        field = elem_param['field']
-                        name = elem_param['name']
-                        value = elem_param['value']
-                        aud_componentValue = value if field == 'TEXT' and name == 'UNIQUE_NAME' else aud_componentValue
+        for project_name, job_name, data in iter_components(parsed_files_data, 'tMap'):
+            aud_componentName = data['componentName']
+            aud_componentValue = data['uniqueName']
 
-                    for nodeData in data.get('nodeData', []):
-                        for output_table in  nodeData.get('outputTables', []) :
+            for nodeData in data.get('nodeData', []):
+                for output_table in  nodeData.get('outputTables', []) :
                         
-                            aud_OutputName = output_table.get('name')
-                            aud_sizeState = output_table.get('sizeState')
-                            aud_activateCondensedTool = 1 if output_table.get('activateCondensedTool') == 'true' else 0 if output_table.get('activateCondensedTool') == 'false' else None
-                            aud_reject = 1 if output_table.get('reject')  == 'true' else 0 if output_table.get('reject')  == 'false' else None
-                            aud_rejectInnerJoin = 1 if output_table.get('rejectInnerJoin') == 'true' else 0 if output_table.get('rejectInnerJoin') == 'false' else None
-                            aud_activateExpressionFilter = 1 if output_table.get('activateExpressionFilter') == 'true' else 0 if output_table.get('activateExpressionFilter') == 'false' else None
-                            aud_expressionFilterOutput = output_table.get('expressionFilter')
-
-                            for mapper_entry in output_table.get('mapperTableEntries', []):
-                                aud_expressionOutput = mapper_entry.get('expression')
-                                aud_nameColumnOutput = mapper_entry.get('name')
-                                aud_type = mapper_entry.get('type')
-                                aud_nullable = 1 if mapper_entry.get('nullable') == 'true' else 0 if mapper_entry.get('nullable') == 'false' else None
+                    aud_OutputName = output_table.get('name')
+                    aud_sizeState = output_table.get('sizeState')
+                    aud_activateCondensedTool = 1 if output_table.get('activateCondensedTool') == 'true' else 0 if output_table.get('activateCondensedTool') == 'false' else None
+                    aud_reject = 1 if output_table.get('reject')  == 'true' else 0 if output_table.get('reject')  == 'false' else None
+                    aud_rejectInnerJoin = 1 if output_table.get('rejectInnerJoin') == 'true' else 0 if output_table.get('rejectInnerJoin') == 'false' else None
+                    aud_activateExpressionFilter = 1 if output_table.get('activateExpressionFilter') == 'true' else 0 if output_table.get('activateExpressionFilter') == 'false' else None
+                    aud_expressionFilterOutput = output_table.get('expressionFilter')
+
+                    for mapper_entry in output_table.get('mapperTableEntries', []):
+                        aud_expressionOutput = mapper_entry.get('expression')
+                        aud_nameColumnOutput = mapper_entry.get('name')
+                        aud_type = mapper_entry.get('type')
+                        aud_nullable = 1 if mapper_entry.get('nullable') == 'true' else 0 if mapper_entry.get('nullable') == 'false' else None
 
                                 
-                                # Check if aud_OutputName exists before adding to the batch
-                                if aud_OutputName:
-                                    params = (
-                                        aud_componentName, aud_OutputName, aud_sizeState, aud_activateCondensedTool, aud_reject, 
-                                        aud_rejectInnerJoin, aud_expressionOutput, aud_nameColumnOutput, aud_type, aud_nullable, 
-                                        aud_activateExpressionFilter, aud_expressionFilterOutput, aud_componentValue, project_name, 
-                                        job_name, execution_date
-                                    )
-                                    # logging.info(f"params: {params} ")
-                                    batch_insert.append(params)
-
-                                    # Insert batch if it reaches batch size
-                                    if len(batch_insert) == batch_size:
-                                        db.insert_data_batch(insert_query, 'aud_outputtable', batch_insert)
-                                        batch_insert.clear()  # Clear batch after insertion
-                                else:
-                                    logging.warning("aud_OutputName is None, skipping this entry.")
-
-                        # Insert any remaining records in the batch
-                        if batch_insert:
-                            db.insert_data_batch(insert_query, 'aud_outputtable', batch_insert)
-                            batch_insert.clear()
-        # Step 7: Execute outputtableJoinElemntnode query and delete records
-        outputtableJoinElemntnode_query = config.get_param('queries', 'outputtableJoinElemntnode')
-        outputtableJoinElemntnode_results = db.execute_query(outputtableJoinElemntnode_query)
-        #logging.debug(f"outputtableJoinElemntnode_results: {outputtableJoinElemntnode_results}")
+                        # Check if aud_OutputName exists before adding to the batch
+                        if aud_OutputName:
+                            params = (
+                                aud_componentName, aud_OutputName, aud_sizeState, aud_activateCondensedTool, aud_reject, 
+                                aud_rejectInnerJoin, aud_expressionOutput, aud_nameColumnOutput, aud_type, aud_nullable, 
+                                aud_activateExpressionFilter, aud_expressionFilterOutput, aud_componentValue, project_name, 
+                                job_name, execution_date
+                            )
+                            # logging.info(f"params: {params} ")
+                            batch_insert.append(params)
 
-        delete_conditions = []
-        for result in outputtableJoinElemntnode_results:
-            project_name, job_name ,__= result
-            delete_conditions.append({'NameProject': project_name, 'NameJob': job_name})
-            if len(delete_conditions) == batch_size:
-                db.delete_records_batch('aud_outputtable', delete_conditions)
-                #logging.info(f"Batch deleted records from aud_outputtable: {len(delete_conditions)} rows")
-                delete_conditions.clear()
+                        else:
+                            logger.warning("aud_OutputName is None, skipping this entry.")
 
-        if delete_conditions:
-            db.delete_records_batch('aud_outputtable', delete_conditions)
-            # #logging.info(f"Deleted remaining records from aud_outputtable: {len(delete_conditions)} rows")
+        # Insert any remaining records in the batch
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_307_ALIMINPUTTABLE_XML(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
 
@@ -837,98 +827,64 @@ def AUD_307_ALIMINPUTTABLE_XML(config: Config, db: Database, parsed_files_data:
 
         # Step 6: Insert parsed data into aud_inputtable_xml in batches
         insert_query = config.get_param('insert_queries', 'aud_inputtable_xml')
-        batch_insert = []
-        batch_size = 100  # Define your batch size
-
-        for NameProject, NameJob, version , parsed_data in parsed_files_data:
-            for data in parsed_data['nodes']:
-                aud_componentName = data['componentName']
-                if aud_componentName == 'tXMLMap':
-
-                    aud_componentValue = None
-
-                    # Extract 'aud_componentValue' from element parameters
-                    for elem_param in data['elementParameters']:
-                        field = elem_param['field']
-                        name = elem_param['name']
-                        value = elem_param['value']
-                        if field == 'TEXT' and name == 'UNIQUE_NAME':
-                            aud_componentValue = value
-
-                    for nodeData in data['nodeData']:
-                        # Parse `inputTrees` for each nodeData
-                        for input_tree in nodeData.get('inputTrees', []):
-                            aud_nameRowInput = input_tree.get('name')
-                            aud_lookupMode = input_tree.get('lookupMode')
-                            aud_matchingMode = input_tree.get('matchingMode')
-                            aud_activateCondensedTool = input_tree.get('activateCondensedTool')
-                            activateExpressionFilter = input_tree.get('activateExpressionFilter')
-                            activateGlobalMap = input_tree.get('activateGlobalMap')
-                            expressionFilter = input_tree.get('expressionFilter')
-                            filterIncomingConnections = input_tree.get('filterIncomingConnections')
-                            lookup = input_tree.get('lookup')
-
-                            # Loop through `nodes` children in each `input_tree`
-                            for node_item in input_tree.get('children', []):
-                                aud_nameColumnInput = node_item.get('name')
-                                aud_type = node_item.get('type')
-                                aud_xpathColumnInput = node_item.get('xpath')
+        batch_insert = db.batcher(insert_query, 'aud_inputtable_xml', initial_size=batch_size)
+
+        for NameProject, NameJob, data in iter_components(parsed_files_data, 'tXMLMap'):
+            aud_componentName = data['componentName']
+            aud_componentValue = data['uniqueName']
+
+            for nodeData in data['nodeData']:
+                # Parse `inputTrees` for each nodeData
+                for input_tree in nodeData.get('inputTrees', []):
+                    aud_nameRowInput = input_tree.get('name')
+                    aud_lookupMode = input_tree.get('lookupMode')
+                    aud_matchingMode = input_tree.get('matchingMode')
+                    aud_activateCondensedTool = input_tree.get('activateCondensedTool')
+                    activateExpressionFilter = input_tree.get('activateExpressionFilter')
+                    activateGlobalMap = input_tree.get('activateGlobalMap')
+                    expressionFilter = input_tree.get('expressionFilter')
+                    filterIncomingConnections = input_tree.get('filterIncomingConnections')
+                    lookup = input_tree.get('lookup')
+
+                    # Loop through the top-level `nodes` rows of each `input_tree`
+                    for node_item in input_tree.get('nodes', []):
+                        if node_item.depth:
+                            continue
+                        aud_nameColumnInput = node_item.get('name')
+                        aud_type = node_item.get('type')
+                        aud_xpathColumnInput = node_item.get('xpath')
                                 
-                                # Define other placeholders only if they are present in the node_item data
-                                filterOutGoingConnections = node_item.get('filterOutGoingConnections')
-                                lookupOutgoingConnections = node_item.get('lookupOutgoingConnections')
-                                outgoingConnections = node_item.get('outgoingConnections')
-                                lookupIncomingConnections = node_item.get('lookupIncomingConnections')
-                                expression = node_item.get('expression')
-
-                                # Prepare the parameters for insertion, only including available values
-                                params = (
-                                    aud_nameColumnInput, aud_type, aud_xpathColumnInput, aud_nameRowInput,
-                                    aud_componentName, aud_componentValue, filterOutGoingConnections,
-                                    lookupOutgoingConnections, outgoingConnections, NameJob, NameProject,
-                                    execution_date, lookupIncomingConnections, expression, aud_lookupMode,
-                                    aud_matchingMode, aud_activateCondensedTool, activateExpressionFilter,
-                                    activateGlobalMap, expressionFilter, filterIncomingConnections, lookup
-                                )
-
-                                batch_insert.append(params)
-
-                                # Insert the batch when the size limit is reached
-                                if len(batch_insert) == batch_size:
-                                    db.insert_data_batch(insert_query, 'aud_inputtable_xml', batch_insert)
-                                    batch_insert.clear()
-
-                        # Insert remaining data after the loop
-                        if batch_insert:
-                            db.insert_data_batch(insert_query, 'aud_inputtable_xml', batch_insert)
-                            # logging.info(f"Inserted remaining batch of data into aud_inputtable_xml: {len(batch_insert)} rows")
-
-
-        # Step 7: Execute inputtableJoinElemntnode query and delete records
-        inputtablexmlJoinElemntnode_query = config.get_param('queries', 'inputtablexmlJoinElemntnode')
-        inputtablexmlJoinElemntnode_results = db.execute_query(inputtablexmlJoinElemntnode_query)
-        #logging.debug(f"inputtableJoinElemntnode_results: {inputtableJoinElemntnode_results}")
+                        # Define other placeholders only if they are present in the node_item data
+                        filterOutGoingConnections = node_item.get('filterOutGoingConnections')
+                        lookupOutgoingConnections = node_item.get('lookupOutgoingConnections')
+                        outgoingConnections = node_item.get('outgoingConnections')
+                        lookupIncomingConnections = node_item.get('lookupIncomingConnections')
+                        expression = node_item.get('expression')
 
-        delete_conditions = []
-        for result in inputtablexmlJoinElemntnode_results:
-            project_name, job_name = result
-            delete_conditions.append({'NameProject': project_name, 'NameJob': job_name})
-            if len(delete_conditions) == batch_size:
-                db.delete_records_batch('inputtablexmlJoinElemntnode_results', delete_conditions)
-                #logging.info(f"Batch deleted records from aud_inputtable_xml: {len(delete_conditions)} rows")
-                delete_conditions.clear()
+                        # Prepare the parameters for insertion, only including available values
+                        params = (
+                            aud_nameColumnInput, aud_type, aud_xpathColumnInput, aud_nameRowInput,
+                            aud_componentName, aud_componentValue, filterOutGoingConnections,
+                            lookupOutgoingConnections, outgoingConnections, NameJob, NameProject,
+                            execution_date, lookupIncomingConnections, expression, aud_lookupMode,
+                            aud_matchingMode, aud_activateCondensedTool, activateExpressionFilter,
+                            activateGlobalMap, expressionFilter, filterIncomingConnections, lookup
+                        )
 
-        if delete_conditions:
-            db.delete_records_batch('inputtablexmlJoinElemntnode_results', delete_conditions)
-            # #logging.info(f"Deleted remaining records from aud_inputtable_xml: {len(delete_conditions)} rows")
+                        batch_insert.append(params)
+
+        # Insert remaining data after the loop
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
+@job_metrics
 def AUD_307_ALIMOUTPUTTABLE_XML(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
 
@@ -955,97 +911,44 @@ def AUD_307_ALIMOUTPUTTABLE_XML(config: Config, db: Database, parsed_files_data:
 
         # Step 6: Insert parsed data into aud_outputtable_xml in batches
         insert_query = config.get_param('insert_queries', 'aud_outputtable_xml')
-        batch_insert = []
-
-        for NameProject, NameJob, version , parsed_data in parsed_files_data:
-            for data in parsed_data['nodes']:
-                aud_componentName = data['componentName']
-                aud_componentValue = None
-                if aud_componentName == 'tXMLMap':
-                    # Extract 'aud_componentValue' from element parameters
-                    for elem_param in data['elementParameters']:
-                        field = elem_param['field']
-                        name = elem_param['name']
-                        value = elem_param['value']
-                        if field == 'TEXT' and name == 'UNIQUE_NAME':
-                            aud_componentValue = value
-
-                    def process_node_item(node_item, aud_nameRowOutput, aud_componentName, aud_componentValue, NameJob, NameProject, execution_date, batch_insert):
-                        # Extract node_item attributes
-                        aud_nameColumnInput = node_item.get('name')
-                        aud_type = node_item.get('type')
-                        aud_xpathColumnInput = node_item.get('xpath')
-                        filterOutGoingConnections = node_item.get('filterOutGoingConnections')
-                        incomingConnections = node_item.get('incomingConnections')
-                        expression = node_item.get('expression')
-
+        batch_insert = db.batcher(insert_query, 'aud_outputtable_xml', initial_size=batch_size)
+
+        for NameProject, NameJob, data in iter_components(parsed_files_data, 'tXMLMap'):
+            aud_componentName = data['componentName']
+            aud_componentValue = data['uniqueName']
+
+            # Main loop to process `nodeData`
+            for nodeData in data['nodeData']:
+                for output_tree in nodeData.get('outputTrees', []):
+                    aud_nameRowOutput = output_tree.get('name')
+                    activateCondensedTool = 1 if output_tree.get('activateCondensedTool') == 'true' else 0
+                    activateExpressionFilter = 1 if output_tree.get('activateExpressionFilter') == 'true' else 0
+                    expressionFilter = output_tree.get('expressionFilter')
+                    filterIncomingConnections = output_tree.get('filterIncomingConnections')
+
+                    # The tree is already flattened: every row, nested children included, is a node_item
+                    for node_item in output_tree.get('nodes', []):
                         # Prepare parameters for insertion, handling only available values
                         params = (
-                            aud_nameColumnInput, aud_type, aud_xpathColumnInput, aud_nameRowOutput, aud_componentName, 
-                            aud_componentValue, filterOutGoingConnections, incomingConnections, NameJob, NameProject, execution_date, 
-                            expression, activateCondensedTool, activateExpressionFilter, expressionFilter, filterIncomingConnections
+                            node_item.name, node_item.type, node_item.xpath, aud_nameRowOutput, aud_componentName,
+                            aud_componentValue, node_item.filterOutGoingConnections, node_item.incomingConnections,
+                            NameJob, NameProject, execution_date, node_item.expression, activateCondensedTool,
+                            activateExpressionFilter, expressionFilter, filterIncomingConnections
                         )
-                        
-                        # Log and add to batch
-                        # logging.debug(f"Prepared params for insertion: {params}")
                         batch_insert.append(params)
 
-                        # Process nested children recursively if present
-                        for child in node_item.get('children', []):
-                            process_node_item(child, aud_nameRowOutput, aud_componentName, aud_componentValue, NameJob, NameProject, execution_date, batch_insert)
-
-
-                    # Main loop to process `nodeData`
-                    for nodeData in data['nodeData']:
-                        for output_tree in nodeData.get('outputTrees', []):
-                            aud_nameRowOutput = output_tree.get('name')
-                            activateCondensedTool = 1 if output_tree.get('activateCondensedTool') == 'true' else 0
-                            activateExpressionFilter = 1 if output_tree.get('activateExpressionFilter') == 'true' else 0
-                            expressionFilter = output_tree.get('expressionFilter')
-                            filterIncomingConnections = output_tree.get('filterIncomingConnections')
-
-                            # Process each node_item and nested children in the output_tree
-                            for node_item in output_tree.get('children', []):
-                                process_node_item(
-                                    node_item, aud_nameRowOutput, aud_componentName, aud_componentValue, 
-                                    NameJob, NameProject, execution_date, batch_insert
-                                )
-
-                                # Insert batch when the limit is reached
-                                if len(batch_insert) == batch_size:
-                                    db.insert_data_batch(insert_query, 'aud_outputtable_xml', batch_insert)
-                                    batch_insert.clear()
-
-                        # Insert any remaining data after processing all outputTrees
-                        if batch_insert:
-                            db.insert_data_batch(insert_query, 'aud_outputtable_xml', batch_insert)
-                            batch_insert.clear()
-
-        # Step 7: Execute outputtablexmlJoinElemntnode query and delete records
-        outputtablexmlJoinElemntnode_query = config.get_param('queries', 'outputtablexmlJoinElemntnode')
-        outputtablexmlJoinElemntnode_results = db.execute_query(outputtablexmlJoinElemntnode_query)
-        #logging.debug(f"outputtableJoinElemntnode_results: {outputtableJoinElemntnode_results}")
-
-        delete_conditions = []
-        for result in outputtablexmlJoinElemntnode_results:
-            project_name, job_name = result
-            delete_conditions.append({'NameProject': project_name, 'NameJob': job_name})
-            if len(delete_conditions) == batch_size:
-                db.delete_records_batch('outputtablexmlJoinElemntnode_results', delete_conditions)
-                #logging.info(f"Batch deleted records from aud_outputtable_xml: {len(delete_conditions)} rows")
-                delete_conditions.clear()
-
-        if delete_conditions:
-            db.delete_records_batch('outputtablexmlJoinElemntnode_results', delete_conditions)
-            # #logging.info(f"Deleted remaining records from aud_outputtable_xml: {len(delete_conditions)} rows")
+        # Insert any remaining data after processing all outputTrees
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
+@job_metrics
 def AUD_307_ALIMINPUTTABLE(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
 
@@ -1072,100 +975,65 @@ def AUD_307_ALIMINPUTTABLE(config: Config, db: Database, parsed_files_data: List
 
         # Step 6: Insert parsed data into aud_inputtable in batches
         insert_query = config.get_param('insert_queries', 'aud_inputtable')
-        batch_insert = []
-
-        for NameProject, NameJob, version , parsed_data in parsed_files_data:
-            # logging.info(f"Processing project: {NameProject}, job: {NameJob}")
-            for data in parsed_data['nodes']:
-                aud_componentName = data['componentName']
-                if aud_componentName == 'tMap':
-
-                    # Extract 'aud_componentValue' based on element parameters
-                    # aud_componentValue = None
-                    for elem_param in data['elementParameters']:
-                        field = elem_param['field']
-                        name = elem_param['name']
-                        value = elem_param['value']
-                        aud_componentValue = value if field == 'TEXT' and name == 'UNIQUE_NAME' else aud_componentValue
-                            
-                    
-                    # Process node data
-                    for node_data in data.get('nodeData', []):
-                        # Loop through each inputTable in the current nodeData
-                        for input_table in node_data.get('inputTables', []):
-                            aud_lookupMode = input_table.get('lookupMode')
-                            aud_matchingMode = input_table.get('matchingMode')
-                            aud_nameRowInput = input_table.get('name')
-                            aud_sizeState = input_table.get('sizeState')
-                            aud_activateExpressionFilterInput = 1 if input_table.get('activateExpressionFilterInput') == 'true' else 0 if input_table.get('activateExpressionFilterInput') == 'false' else None
-                            aud_expressionFilterInput = input_table.get('expressionFilter')
-                            aud_activateCondensedTool = 1 if input_table.get('activateCondensedTool') == 'true' else 0 if input_table.get('activateCondensedTool') == 'false' else None
-                            aud_innerJoin = 1 if input_table.get('innerJoin') == 'true' else 0 if input_table.get('innerJoin') == 'false' else None
-                            persistent = input_table.get('persistent')
-
-                            # Extract mapper table entries within each inputTable
-                            for mapper_entry in input_table.get('mapperTableEntries', []):
-                                aud_expressionJoin = mapper_entry.get('expression')
-                                aud_nameColumnInput = mapper_entry.get('name')
-                                aud_type = mapper_entry.get('type')
-                                aud_nullable = 1 if mapper_entry.get('nullable') == 'true' else 0 if mapper_entry.get('nullable') == 'false' else None
-                                aud_operator = mapper_entry.get('operator')
+        batch_insert = db.batcher(insert_query, 'aud_inputtable', initial_size=batch_size)
+
+        for NameProject, NameJob, data in iter_components(parsed_files_data, 'tMap'):
+            aud_componentName = data['componentName']
+            aud_componentValue = data['uniqueName']
+
+            # Process node data
+            for node_data in data.get('nodeData', []):
+                # Loop through each inputTable in the current nodeData
+                for input_table in node_data.get('inputTables', []):
+                    aud_lookupMode = input_table.get('lookupMode')
+                    aud_matchingMode = input_table.get('matchingMode')
+                    aud_nameRowInput = input_table.get('name')
+                    aud_sizeState = input_table.get('sizeState')
+                    aud_activateExpressionFilterInput = 1 if input_table.get('activateExpressionFilterInput') == 'true' else 0 if input_table.get('activateExpressionFilterInput') == 'false' else None
+                    aud_expressionFilterInput = input_table.get('expressionFilter')
+                    aud_activateCondensedTool = 1 if input_table.get('activateCondensedTool') == 'true' else 0 if input_table.get('activateCondensedTool') == 'false' else None
+                    aud_innerJoin = 1 if input_table.get('innerJoin') == 'true' else 0 if input_table.get('innerJoin') == 'false' else None
+                    persistent = input_table.get('persistent')
+
+                    # Extract mapper table entries within each inputTable
+                    for mapper_entry in input_table.get('mapperTableEntries', []):
+                        aud_expressionJoin = mapper_entry.get('expression')
+                        aud_nameColumnInput = mapper_entry.get('name')
+                        aud_type = mapper_entry.get('type')
+                        aud_nullable = 1 if mapper_entry.get('nullable') == 'true' else 0 if mapper_entry.get('nullable') == 'false' else None
+                        aud_operator = mapper_entry.get('operator')
 
    
-                                # Prepare the parameters for insertion
-                                params = (
-                                    aud_componentName, aud_lookupMode, aud_matchingMode, aud_nameRowInput, aud_sizeState,
-                                    aud_nameColumnInput, aud_type, aud_nullable, aud_expressionJoin, aud_operator,
-                                    aud_activateExpressionFilterInput, aud_expressionFilterInput, aud_componentValue,
-                                    aud_activateCondensedTool, aud_innerJoin, persistent, NameProject, NameJob, execution_date
-                                )
-                                # logging.debug(f"Inserted batch of data into aud_inputtable: {params}")
-                                batch_insert.append(params)
-
-                            # Insert the batch when the size limit is reached
-                            if len(batch_insert) == batch_size:
-                                db.insert_data_batch(insert_query, 'aud_inputtable', batch_insert)
-                                # #logging.info(f"Inserted batch of data into aud_inputtable: {len(batch_insert)} rows")
-                                batch_insert.clear()
-
-                        # # Log a warning if aud_nameColumnInput & aud_nameRowInput is still None after default value assignment
-                        # if aud_nameColumnInput == 'DEFAULT_COLUMN_VALUE':
-                        #     logging.warning("aud_nameColumnInput was None and has been set to 'DEFAULT_COLUMN_VALUE'.")
-                        # if aud_nameRowInput == 'DEFAULT_COLUMN_VALUE':
-                        #     logging.warning("aud_nameRowInput was None and has been set to 'DEFAULT_COLUMN_VALUE'.")
-                        
-
-            # Insert remaining data after the loop
-            if batch_insert:
-                db.insert_data_batch(insert_query, 'aud_inputtable', batch_insert)
-                #logging.info(f"Inserted remaining batch of data into aud_inputtable: {len(batch_insert)} rows")
-
-        # Step 7: Execute inputtableJoinElemntnode query and delete records
-        inputtableJoinElemntnode_query = config.get_param('queries', 'inputtableJoinElemntnode')
-        inputtableJoinElemntnode_results = db.execute_query(inputtableJoinElemntnode_query)
-        #logging.debug(f"inputtableJoinElemntnode_results: {inputtableJoinElemntnode_results}")
+                        # Prepare the parameters for insertion
+                        params = (
+                            aud_componentName, aud_lookupMode, aud_matchingMode, aud_nameRowInput, aud_sizeState,
+                            aud_nameColumnInput, aud_type, aud_nullable, aud_expressionJoin, aud_operator,
+                            aud_activateExpressionFilterInput, aud_expressionFilterInput, aud_componentValue,
+                            aud_activateCondensedTool, aud_innerJoin, persistent, NameProject, NameJob, execution_date
+                        )
+                        # logging.debug(f"Inserted batch of data into aud_inputtable: {params}")
+                        batch_insert.append(params)
 
-        delete_conditions = []
-        for result in inputtableJoinElemntnode_results:
-            project_name, job_name,aud_ComponementValue = result
-            delete_conditions.append({'NameProject': project_name, 'NameJob': job_name , 'aud_componentValue':aud_ComponementValue})
-            if len(delete_conditions) == batch_size:
-                db.delete_records_batch('aud_inputtable_xml', delete_conditions)
-                #logging.info(f"Batch deleted records from aud_inputtable: {len(delete_conditions)} rows")
-                delete_conditions.clear()
+                # # Log a warning if aud_nameColumnInput & aud_nameRowInput is still None after default value assignment
+                # if aud_nameColumnInput == 'DEFAULT_COLUMN_VALUE':
+                #     logging.warning("aud_nameColumnInput was None and has been set to 'DEFAULT_COLUMN_VALUE'.")
+                # if aud_nameRowInput == 'DEFAULT_COLUMN_VALUE':
+                #     logging.warning("aud_nameRowInput was None and has been set to 'DEFAULT_COLUMN_VALUE'.")
+                        
 
-        if delete_conditions:
-            db.delete_records_batch('aud_inputtable_xml', delete_conditions)
-            # #logging.info(f"Deleted remaining records from aud_inputtable: {len(delete_conditions)} rows")
+        # Insert remaining data after the loop
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_308_ALIMCONNECTIONCOMPONENT(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]], execution_date: str, batch_size=100):
     """
     Inserts unique data into `aud_connectioncomponent` table in batches.
@@ -1173,7 +1041,8 @@ def AUD_308_ALIMCONNECTIONCOMPONENT(config: Config, db: Database, parsed_files_d
     Args:
         config (Config): Config instance for configuration management.
         db (Database): Database instance for database operations.
-        parsed_files_data (List[Tuple[str, str, dict]]): Parsed files data.
+        parsed_files_data (List[Tuple[str, str, dict]]): Parsed files data, or a ParsedWorkspace built with
+            `loop_parse_items(..., columnar=True)`.
         execution_date (str): Execution timestamp.
         batch_size (int): Batch size for database operations.
     """
@@ -1196,11 +1065,25 @@ def AUD_308_ALIMCONNECTIONCOMPONENT(config: Config, db: Database, parsed_files_d
 
         # Step 6: Insert unique parsed data into aud_connectioncomponent in batches
         insert_query = config.get_param('insert_queries', 'aud_connectioncomponent')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_connectioncomponent', initial_size=batch_size)
 
         # Set to track unique rows
         unique_rows = set()
 
+        if isinstance(parsed_files_data, ParsedWorkspace):
+            # Columnar workspace: one row per connection elementParameter already
+            table = parsed_files_data.connections
+            for row in table.rows(
+                'connectorName', 'label', 'lineStyle', 'metaname', 'offsetLabelX', 'offsetLabelY', 'source', 'target',
+                'outputId', 'field', 'name', 'value', 'show', 'NameProject', 'NameJob'
+            ):
+                params = (*row[:12], 1 if row[12] == 'true' else 0, *row[13:], execution_date)
+                if params not in unique_rows:
+                    unique_rows.add(params)
+                    batch_insert.append(params)
+            batch_insert.flush()
+            return
+
         for project_name, job_name, version, parsed_data in parsed_files_data:
             for connection in parsed_data.get('connections', []):
                 aud_connectorName = connection.get('connectorName')
@@ -1232,30 +1115,18 @@ def AUD_308_ALIMCONNECTIONCOMPONENT(config: Config, db: Database, parsed_files_d
                         unique_rows.add(params)
                         batch_insert.append(params)
 
-                        # Insert batch when it reaches the batch size
-                        if len(batch_insert) == batch_size:
-                            try:
-                                db.insert_data_batch(insert_query, 'aud_connectioncomponent', batch_insert)
-                            except Exception as insert_error:
-                                logging.error(f"Error during batch insert: {insert_error}", exc_info=True)
-                            finally:
-                                batch_insert.clear()
-
         # Insert any remaining rows
-        if batch_insert:
-            try:
-                logging.info("Inserting remaining batch into database.")
-                db.insert_data_batch(insert_query, 'aud_connectioncomponent', batch_insert)
-            except Exception as insert_error:
-                logging.error(f"Error during final batch insert: {insert_error}", exc_info=True)
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_309_ALIMELEMENTPARAMETER(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]], execution_date: str, batch_size=100):
     """
     Inserts unique data into `aud_elementparameter` table in batches.
@@ -1285,7 +1156,7 @@ def AUD_309_ALIMELEMENTPARAMETER(config: Config, db: Database, parsed_files_data
 
         # Step 6: Prepare unique data for insertion
         insert_query = config.get_param('insert_queries', 'aud_elementparameter')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_elementparameter', initial_size=batch_size)
         unique_rows = set()  # Set to track unique rows
 
         for NameProject, NameJob, version, parsed_data in parsed_files_data:
@@ -1301,33 +1172,20 @@ def AUD_309_ALIMELEMENTPARAMETER(config: Config, db: Database, parsed_files_data
                 if aud_name in {"JOB_RUN_VM_ARGUMENTS", "JOB_RUN_VM_ARGUMENTS_OPTION", "SCREEN_OFFSET_Y", "SCREEN_OFFSET_X"}:
                     if params not in unique_rows:
                         unique_rows.add(params)
-                        logging.debug(f"Adding unique params: {params}")
+                        logger.debug("Adding unique params: %s", params)
                         batch_insert.append(params)
 
-                        # Execute batch insert when the size is reached
-                        if len(batch_insert) == batch_size:
-                            try:
-                                db.insert_data_batch(insert_query, 'aud_elementparameter', batch_insert)
-                                logging.info(f"Inserted a batch of {len(batch_insert)} rows.")
-                            except Exception as insert_error:
-                                logging.error(f"Error during batch insert: {insert_error}", exc_info=True)
-                            finally:
-                                batch_insert.clear()
-
         # Insert any remaining rows
-        if batch_insert:
-            try:
-                db.insert_data_batch(insert_query, 'aud_elementparameter', batch_insert)
-                logging.info(f"Inserted the remaining {len(batch_insert)} rows.")
-            except Exception as insert_error:
-                logging.error(f"Error during final batch insert: {insert_error}", exc_info=True)
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
-        logging.info("Function AUD_309_ALIMELEMENTPARAMETER completed.")
+        logger.info("Function AUD_309_ALIMELEMENTPARAMETER completed.")
 
 
+@job_metrics
 def AUD_309_ALIMROUTINES(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
        
@@ -1355,7 +1213,7 @@ def AUD_309_ALIMROUTINES(config: Config, db: Database, parsed_files_data: List[T
         # Step 6: Insert parsed data into aud_routines in batches
         insert_query = config.get_param('insert_queries', 'aud_routines')
         #logging.debug(f"Insert Query: {insert_query}")
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_routines', initial_size=batch_size)
 
         for project_name, job_name, version, parsed_data in parsed_files_data:
             # logging.info(f"Processing project: {project_name}, job: {job_name}")
@@ -1367,32 +1225,18 @@ def AUD_309_ALIMROUTINES(config: Config, db: Database, parsed_files_data: List[T
                     params = (aud_idRoutine, aud_nameRoutine, project_name, job_name, execution_date)
                     batch_insert.append(params)
 
-
-                    if len(batch_insert) == batch_size:
-                        try:
-                            db.insert_data_batch(insert_query, 'aud_routines', batch_insert)
-                            # #logging.info(f"Inserted batch of data into aud_routines: {len(batch_insert)} rows")
-                        except Exception as insert_error:
-                            logging.error(f"Error during batch insert: {insert_error}", exc_info=True)
-                        finally:
-                            batch_insert.clear()
-
-        if batch_insert:
-            try:
-                logging.info("Inserting remaining batch into database.")
-                db.insert_data_batch(insert_query, 'aud_routines', batch_insert)
-                #logging.info(f"Inserted remaining batch of data into aud_routines: {len(batch_insert)} rows")
-            except Exception as insert_error:
-                logging.error(f"Error during final batch insert: {insert_error}", exc_info=True)
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_310_ALIMLIBRARY(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     try:
        
@@ -1420,18 +1264,16 @@ def AUD_310_ALIMLIBRARY(config: Config, db: Database, parsed_files_data: List[Tu
         # Step 6: Insert parsed data into aud_library in batches
         insert_query = config.get_param('insert_queries', 'aud_library')
         #logging.debug(f"Insert Query: {insert_query}")
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_library', initial_size=batch_size)
         for project_name, job_name, version, parsed_data in parsed_files_data:
             for data in parsed_data['nodes']:
+                # The component is identified by its UNIQUE_NAME
+                componentName = data['uniqueName']
                 for elem_param in data['elementParameters']:
-                    # Assign componentName based on specific condition
                     field = elem_param['field']
                     name = elem_param['name']
                     value = elem_param['value']
 
-                    if field == 'TEXT' and name == 'UNIQUE_NAME':
-                        componentName = value
-
                     # Check if conditions for componentName and elem_param value are met
                     if (componentName is not None and 
                         ("Java" in componentName or "tLibraryLoad" in componentName) and 
@@ -1449,25 +1291,19 @@ def AUD_310_ALIMLIBRARY(config: Config, db: Database, parsed_files_data: List[Tu
                             params = (componentName, aud_typeInput, aud_libraryImport, project_name, job_name, execution_date)
                             batch_insert.append(params)
 
-                            # Insert in batches
-                            if len(batch_insert) == batch_size:
-                                db.insert_data_batch(insert_query, 'aud_library', batch_insert)
-                                # #logging.info(f"Inserted batch of data into aud_library: {len(batch_insert)} rows")
-                                batch_insert.clear()
-
         # Insert any remaining data
-        if batch_insert:
-            db.insert_data_batch(insert_query, 'aud_library', batch_insert)
-            #logging.info(f"Inserted remaining batch of data into aud_library: {len(batch_insert)} rows")
+        batch_insert.flush()
 
 
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
+@job_metrics
 def AUD_311_ALIMELEMENTVALUENODE(
     config: Config,
     db: Database,
@@ -1480,7 +1316,7 @@ def AUD_311_ALIMELEMENTVALUENODE(
 
         # Step 2: Execute aud_elementvaluenode query
         aud_elementvaluenode_query = config.get_param('queries', 'aud_elementvaluenode')
-        logging.info(f"Executing query: {aud_elementvaluenode_query}")
+        logger.info("Executing query: %s", aud_elementvaluenode_query)
         aud_elementvaluenode_results = db.execute_query(aud_elementvaluenode_query)
 
         # Step 3: Delete records from aud_contextjob based on query results
@@ -1493,28 +1329,25 @@ def AUD_311_ALIMELEMENTVALUENODE(
 
         # Step 4: Prepare data for insertion into aud_elementvaluenode
         insert_query = config.get_param('insert_queries', 'aud_elementvaluenode')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_elementvaluenode', initial_size=batch_size)
 
         for NameProject, NameJob, version, parsed_data in parsed_files_data:
             cmpt = 1
             for data in parsed_data['nodes']:
-                
+                aud_componentValue = data['uniqueName']
                 for elem_param in data['elementParameters']:
                     aud_componentName = data['componentName']
                     aud_posX = data['posX']
                     aud_posY = data['posY']
-                    field = elem_param['field']
-                    aud_typeField = elem_param['name']
-                    value = elem_param['value']
+                    field = elem_param.field
+                    aud_typeField = elem_param.name
+                    value = elem_param.value
 
-                    # Adjust aud_componentValue
-                    aud_componentValue =  value if field == 'TEXT' and aud_typeField == 'UNIQUE_NAME' else aud_componentValue
-                    
                     if field == "TABLE" and aud_typeField != "TRIM_COLUMN":
                         context = {"colonne": "", "value": "" }
-                        for elemValue in elem_param['elementValue']:
-                            aud_elementRef = elemValue['elementRef']
-                            aud_valueElementRef = elemValue['value'].replace("\"", "")
+                        for elemValue in elem_param.elementValues:
+                            aud_elementRef = elemValue.elementRef
+                            aud_valueElementRef = elemValue.value.replace("\"", "")
 
                             # Context handling for colonne and value
                             if context["colonne"] == "":
@@ -1535,36 +1368,102 @@ def AUD_311_ALIMELEMENTVALUENODE(
 
                             batch_insert.append(params)
 
-                            # Insert data in batches
-                            if len(batch_insert) >= batch_size:
-                                db.insert_data_batch(insert_query, 'aud_elementvaluenode', batch_insert)
-                                batch_insert.clear()
-
         # Insert remaining data
-        if batch_insert:
-            db.insert_data_batch(insert_query, 'aud_elementvaluenode', batch_insert)
-
-        # Step 5: Execute elementvaluenodeJoinelementnode query
-        elementvaluenodeJoinelementnode_query = config.get_param('queries', 'elementvaluenodeJoinelementnode')
-        logging.info(f"Executing query: {elementvaluenodeJoinelementnode_query}")
-        elementvaluenodeJoinelementnode_results = db.execute_query(elementvaluenodeJoinelementnode_query)
-
-        # Step 6: Delete records from aud_elementvaluenode based on query results
-        aud_elementvaluenode_delete_conditions_batch = [
-            {'NameProject': result[0], 'NameJob': result[1], 'aud_componentValue': result[2]}
-            for result in elementvaluenodeJoinelementnode_results
-        ]
-        if aud_elementvaluenode_delete_conditions_batch:
-            db.delete_records_batch('aud_elementvaluenode', aud_elementvaluenode_delete_conditions_batch)
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
-            logging.info("done!")
+            logger.info("done!")
+
+
+
+# Prefix of the components whose GROUPBYS/OPERATIONS tables feed aud_agg_aggregate (tAggregateRow,
+# tAggregateSortedRow...), the `aud_componentName LIKE` pattern of AUD_404_AGG_TAGGREGATE in Brut_to_agg
+AGGREGATE_COMPONENT_PREFIX = 'tAggregate'
 
 
+def iter_table_rows(elem_param):
+    """
+    Yield the rows of a TABLE element parameter.
+
+    A row starts whenever the first elementRef of the table comes back, the rule AUD_311 uses to
+    number the rows (aud_id) of aud_elementvaluenode.
+
+    Args:
+        elem_param (ElementParameter): A parameter whose field is "TABLE".
 
+    Returns:
+        iterator of dict: elementRef -> value (double quotes removed) for every row of the table.
+    """
+    first_ref = None
+    row = {}
+    for elem_value in elem_param.elementValues:
+        if first_ref is None:
+            first_ref = elem_value.elementRef
+        elif elem_value.elementRef == first_ref:
+            yield row
+            row = {}
+        row[elem_value.elementRef] = elem_value.value.replace("\"", "")
+    if row:
+        yield row
+
+
+@job_metrics
+def AUD_311_ALIMAGGREGATE(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]], execution_date: str, batch_size=100):
+    """
+    Load aud_agg_aggregate straight from the tAggregate components of the parsed `.item` files.
+
+    Every GROUPBYS row gives an (input column, output column, 'GROUPBY') entry and every OPERATIONS
+    row an (input column, output column, function) entry, the rows AUD_404_AGG_TAGGREGATE builds
+    from aud_elementvaluenode in Brut_to_agg. The rows of the parsed jobs are replaced.
+
+    Args:
+        config (Config): An instance of the Config class for retrieving configuration parameters.
+        db (Database): An instance of the Database class for executing database operations.
+        parsed_files_data (List[Tuple[str, str, dict]]): List of parsed file data containing project names, job names, and parsed data dictionaries.
+        execution_date (str): Execution timestamp.
+        batch_size (int, optional): Number of rows to insert in each batch. Defaults to 100.
+    """
+    try:
+        # Step 1: Delete the rows of the parsed jobs
+        delete_conditions = [
+            {'NameProject': project_name, 'NameJob': job_name}
+            for project_name, job_name, version, parsed_data in parsed_files_data
+        ]
+        for start in range(0, len(delete_conditions), batch_size):
+            db.delete_records_batch('aud_agg_aggregate', delete_conditions[start:start + batch_size])
+
+        # Step 2: Pair the input column, output column and function of every table row
+        insert_query = config.get_param('insert_queries', 'aud_agg_aggregate')
+        batch_insert = db.batcher(insert_query, 'aud_agg_aggregate', initial_size=batch_size)
+
+        for project_name, job_name, data in iter_components(parsed_files_data, prefix=AGGREGATE_COMPONENT_PREFIX):
+            for elem_param in data['elementParameters']:
+                if elem_param.field != "TABLE" or elem_param.name not in ("GROUPBYS", "OPERATIONS"):
+                    continue
+                for row in iter_table_rows(elem_param):
+                    function = "GROUPBY" if elem_param.name == "GROUPBYS" else row.get("FUNCTION")
+                    if "INPUT_COLUMN" not in row or "OUTPUT_COLUMN" not in row or function is None:
+                        continue
+                    batch_insert.append((
+                        project_name, job_name, data['uniqueName'], row["INPUT_COLUMN"], row["OUTPUT_COLUMN"], function
+                    ))
+
+        # Insert remaining data
+        batch_insert.flush()
+
+    except Exception as e:
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
+    finally:
+        if db:
+            logger.info("done!")
+
+
+@job_metrics
 def AUD_312_ALIMJOBFILS(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100):
     """
     Perform operations including retrieving JDBC parameters, executing queries,
@@ -1579,7 +1478,7 @@ def AUD_312_ALIMJOBFILS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 2: Execute audit_jobs_delta
         audit_jobs_delta = config.get_param('queries', 'audit_jobs_delta')
-        logging.info(f"Executing query: {audit_jobs_delta}")
+        logger.info("Executing query: %s", audit_jobs_delta)
         audit_jobs_delta_results = db.execute_query(audit_jobs_delta)
         #logging.debug(f"audit_jobs_delta_results: {audit_jobs_delta_results}")
 
@@ -1602,7 +1501,7 @@ def AUD_312_ALIMJOBFILS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 4: Execute aud_job_fils query
         aud_job_fils_query = config.get_param('queries', 'aud_job_fils')
-        logging.info(f"Executing query: {aud_job_fils_query}")
+        logger.info("Executing query: %s", aud_job_fils_query)
         aud_job_fils_results = db.execute_query(aud_job_fils_query)
         #logging.debug(f"aud_job_fils_results: {aud_job_fils_results}")
 
@@ -1623,36 +1522,24 @@ def AUD_312_ALIMJOBFILS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 6: Insert parsed data into the aud_job_fils table in batches
         insert_query = config.get_param('insert_queries', 'aud_job_fils')
-        batch_insert = []
-
-
-        for project_name, job_name, version, parsed_data in parsed_files_data:
-            for data in parsed_data['nodes']:
-                for elem_param in data['elementParameters']:
-                    if data['componentName'] == "tRunJob":
-                        componentName = data['componentName']
-                        field = elem_param['field']
-                        name = elem_param['name']
-                        show = 0 if elem_param['show'] == 'false' else 1 if elem_param['show'] == 'true' else None
-                        value = elem_param['value']
+        batch_insert = db.batcher(insert_query, 'aud_job_fils', initial_size=batch_size)
 
-                        # Adjust the value of Componement_UniqueName as needed
-                        Componement_UniqueName = value if field == 'TEXT' and name == 'UNIQUE_NAME' else Componement_UniqueName
-                        params = ( project_name, job_name, componentName,Componement_UniqueName, field, name, show, value,  execution_date)
-                        batch_insert.append(params)
 
-                        if len(batch_insert) == batch_size:
-                            db.insert_data_batch(insert_query, 'aud_job_fils', batch_insert)
-                            # #logging.info(f"Inserted batch of data into aud_job_fils: {len(batch_insert)} rows")
-                            batch_insert.clear()
+        for project_name, job_name, data in iter_components(parsed_files_data, 'tRunJob'):
+            for elem_param in data['elementParameters']:
+                componentName = data['componentName']
+                field = elem_param['field']
+                name = elem_param['name']
+                show = 0 if elem_param['show'] == 'false' else 1 if elem_param['show'] == 'true' else None
+                value = elem_param['value']
+                params = ( project_name, job_name, componentName, data['uniqueName'], field, name, show, value,  execution_date)
+                batch_insert.append(params)
 
-            # Insert remaining data in the batch
-            if batch_insert:
-                db.insert_data_batch(insert_query, 'aud_job_fils', batch_insert)
-                #logging.info(f"Inserted remaining batch of data into aud_job_fils: {len(batch_insert)} rows")
+        # Insert remaining data in the batch
+        batch_insert.flush()
         # Step 7: Execute Update_job_fils query
         Update_job_fils_query = config.get_param('queries', 'Update_job_fils')
-        logging.info(f"Executing query: {Update_job_fils_query}")
+        logger.info("Executing query: %s", Update_job_fils_query)
         Update_job_fils_results = db.execute_query(Update_job_fils_query)
         #logging.debug(f"Update_job_fils_results: {Update_job_fils_results}")
 
@@ -1663,13 +1550,15 @@ def AUD_312_ALIMJOBFILS(config: Config, db: Database, parsed_files_data: List[Tu
 
     
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_313_ALIMJOBLETS(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100):
     """
     Perform operations including retrieving JDBC parameters, executing queries,
@@ -1684,7 +1573,7 @@ def AUD_313_ALIMJOBLETS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 2: Execute audit_jobs_delta
         audit_jobs_delta = config.get_param('queries', 'audit_jobs_delta')
-        logging.info(f"Executing query: {audit_jobs_delta}")
+        logger.info("Executing query: %s", audit_jobs_delta)
         audit_jobs_delta_results = db.execute_query(audit_jobs_delta)
         #logging.debug(f"audit_jobs_delta_results: {audit_jobs_delta_results}")
 
@@ -1707,7 +1596,7 @@ def AUD_313_ALIMJOBLETS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 4: Execute aud_joblets query
         aud_joblets_query = config.get_param('queries', 'aud_joblets')
-        logging.info(f"Executing query: {aud_joblets_query}")
+        logger.info("Executing query: %s", aud_joblets_query)
         aud_joblets_results = db.execute_query(aud_joblets_query)
         #logging.debug(f"aud_joblets_results: {aud_joblets_results}")
 
@@ -1728,7 +1617,7 @@ def AUD_313_ALIMJOBLETS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 6: Insert parsed data into the aud_joblets table in batches
         insert_query = config.get_param('insert_queries', 'aud_joblets')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_joblets', initial_size=batch_size)
 
 
         for project_name, job_name, version, parsed_data in parsed_files_data:
@@ -1740,50 +1629,22 @@ def AUD_313_ALIMJOBLETS(config: Config, db: Database, parsed_files_data: List[Tu
                         name = elem_param['name']
                         show = elem_param['show']
                         value = elem_param['value']
-
-                        # Adjust the value of Componement_UniqueName as needed
-                        Componement_UniqueName = value if field == 'TEXT' and name == 'UNIQUE_NAME' else Componement_UniqueName
-                        params = ( project_name, job_name, componentName, field, name, show, value,Componement_UniqueName,  execution_date)
+                        params = ( project_name, job_name, componentName, field, name, show, value, data['uniqueName'],  execution_date)
                         batch_insert.append(params)
 
-                        if len(batch_insert) == batch_size:
-                            db.insert_data_batch(insert_query, 'aud_joblets', batch_insert)
-                            batch_insert.clear()
-
-            # Insert remaining data in the batch
-            if batch_insert:
-                db.insert_data_batch(insert_query, 'aud_joblets', batch_insert)
-                #logging.info(f"Inserted remaining batch of data into aud_joblets: {len(batch_insert)} rows")
-                
-         # Step 7: Execute jobletsJoinelementnode query and delete records
-        jobletsJoinelementnode_query = config.get_param('queries', 'jobletsJoinelementnode')
-        jobletsJoinelementnode_results = db.execute_query(jobletsJoinelementnode_query)
-        #logging.debug(f"jobletsJoinelementnode_results: {jobletsJoinelementnode_results}")
-
-        delete_conditions = []
-        for result in jobletsJoinelementnode_results:
-            project_name, job_name = result
-            delete_conditions.append({'NameProject': project_name, 'NameJob': job_name})
-            if len(delete_conditions) == batch_size:
-                db.delete_records_batch('jobletsJoinelementnode_results', delete_conditions)
-                #logging.info(f"Batch deleted records from aud_inputtable: {len(delete_conditions)} rows")
-                delete_conditions.clear()
-
-        if delete_conditions:
-            db.delete_records_batch('jobletsJoinelementnode_results', delete_conditions)
-            #logging.info(f"Deleted remaining records from aud_inputtable: {len(delete_conditions)} rows")
-
-
+        # Insert remaining data in the batch
+        batch_insert.flush()
 
-    
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             # #db.close()  # Ensure the database connection is closed
-            logging.info("Done.")
+            logger.info("Done.")
 
 
+@job_metrics
 def AUD_314_ALIMSUBJOBS_OPT(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],execution_date : str,batch_size=100 ):
     """
     Perform operations including retrieving JDBC parameters, executing queries,
@@ -1802,7 +1663,7 @@ def AUD_314_ALIMSUBJOBS_OPT(config: Config, db: Database, parsed_files_data: Lis
         
         # Step 4: Execute aud_subjobs query
         aud_subjobs_query = config.get_param('queries', 'aud_subjobs')
-        logging.info(f"Executing query: {aud_subjobs_query}")
+        logger.info("Executing query: %s", aud_subjobs_query)
         aud_subjobs_results = db.execute_query(aud_subjobs_query)
         #logging.debug(f"aud_subjobs_results: {aud_subjobs_results}")
 
@@ -1824,7 +1685,7 @@ def AUD_314_ALIMSUBJOBS_OPT(config: Config, db: Database, parsed_files_data: Lis
 
         # Step 6: Insert parsed data into the aud_subjobs table in batches
         insert_query = config.get_param('insert_queries', 'aud_subjobs')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_subjobs', initial_size=batch_size)
 
         for project_name, job_name, version, parsed_data in parsed_files_data:
             for data in parsed_data['subjobs']:
@@ -1837,24 +1698,19 @@ def AUD_314_ALIMSUBJOBS_OPT(config: Config, db: Database, parsed_files_data: Lis
                         params = (project_name, job_name, execution_date, name, value)
                         batch_insert.append(params)
 
-                        if len(batch_insert) == batch_size:
-                            db.insert_data_batch(insert_query, 'aud_subjobs', batch_insert)
-                            # #logging.info(f"Inserted batch of data into aud_subjobs: {len(batch_insert)} rows")
-                            batch_insert.clear()
-
         # Insert remaining data in the batch
-        if batch_insert:
-            db.insert_data_batch(insert_query, 'aud_subjobs', batch_insert)
-            #logging.info(f"Inserted remaining batch of data into aud_subjobs: {len(batch_insert)} rows")
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_315_DELETEINACTIFNODES(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]],  batch_size: int = 100):
     """
     Deletes inactive nodes from 'aud_job_fils' and 'aud_elementnode' tables based on ActiveNodes queries.
@@ -1869,7 +1725,7 @@ def AUD_315_DELETEINACTIFNODES(config: Config, db: Database, parsed_files_data:
     try:
         # Step 1: Retrieve and execute query to get active nodes for 'job_fils'
         active_nodes_job_fils_query = config.get_param('queries', 'ActiveNodes_job_fils')
-        logging.info(f"Executing query: {active_nodes_job_fils_query}")
+        logger.info("Executing query: %s", active_nodes_job_fils_query)
         active_nodes_job_fils_results = db.execute_query(active_nodes_job_fils_query)
         #logging.debug(f"ActiveNodes_job_fils_results: {active_nodes_job_fils_results}")
 
@@ -1886,17 +1742,17 @@ def AUD_315_DELETEINACTIFNODES(config: Config, db: Database, parsed_files_data:
             # If batch size is reached, delete records in batch
             if len(batch_delete_conditions) == batch_size:
                 db.delete_records_batch('aud_job_fils', batch_delete_conditions)
-                logging.info(f"Batch deleted {len(batch_delete_conditions)} records from aud_job_fils")
+                logger.info("Batch deleted %s records from aud_job_fils", len(batch_delete_conditions))
                 batch_delete_conditions.clear()
 
         # Delete any remaining records
         if batch_delete_conditions:
             db.delete_records_batch('aud_job_fils', batch_delete_conditions)
-            logging.info(f"Batch deleted remaining {len(batch_delete_conditions)} records from aud_job_fils")
+            logger.info("Batch deleted remaining %s records from aud_job_fils", len(batch_delete_conditions))
 
         # Step 3: Retrieve and execute query to get active nodes for 'elementnode'
         active_nodes_elementnode_query = config.get_param('queries', 'ActiveNodes_elementnode')
-        logging.info(f"Executing query: {active_nodes_elementnode_query}")
+        logger.info("Executing query: %s", active_nodes_elementnode_query)
         active_nodes_elementnode_results = db.execute_query(active_nodes_elementnode_query)
         #logging.debug(f"ActiveNodes_elementnode_results: {active_nodes_elementnode_results}")
 
@@ -1913,24 +1769,26 @@ def AUD_315_DELETEINACTIFNODES(config: Config, db: Database, parsed_files_data:
             # If batch size is reached, delete records in batch
             if len(batch_delete_conditions) == batch_size:
                 db.delete_records_batch('aud_elementnode', batch_delete_conditions)
-                logging.info(f"Batch deleted {len(batch_delete_conditions)} records from aud_elementnode")
+                logger.info("Batch deleted %s records from aud_elementnode", len(batch_delete_conditions))
                 batch_delete_conditions.clear()
 
         # Delete any remaining records
         if batch_delete_conditions:
             db.delete_records_batch('aud_elementnode', batch_delete_conditions)
-            logging.info(f"Batch deleted remaining {len(batch_delete_conditions)} records from aud_elementnode")
+            logger.info("Batch deleted remaining %s records from aud_elementnode", len(batch_delete_conditions))
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         # Ensure the database connection is always closed
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
 
 
+@job_metrics
 def AUD_317_ALIMJOBSERVERPROPRETY(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]], file_path: str, batch_size: int = 100):
     """
     Inserts data into the 'aud_talendjobserver_properties' table from a CSV file in batches.
@@ -1946,19 +1804,21 @@ def AUD_317_ALIMJOBSERVERPROPRETY(config: Config, db: Database, parsed_files_dat
         # Insert data into 'aud_talendjobserver_properties' from the CSV file in batches
         table_name = 'aud_talendjobserver_properties'
         db.insert_from_csv_batch(file_path, table_name, batch_size)
-        logging.info(f"Inserted data from {file_path} into {table_name} in batches of {batch_size}")
+        logger.info("Inserted data from %s into %s in batches of %s", file_path, table_name, batch_size)
 
     except Exception as e:
         # Log any errors that occur during the process
-        logging.error(f"An error occurred during data insertion: {e}", exc_info=True)
+        logger.error("An error occurred during data insertion: %s", e, exc_info=True)
+        raise
 
     finally:
         # Ensure the database connection is always closed
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_318_ALIMCONFQUARTZ(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]], file_path: str, batch_size: int = 100):
     """
     Inserts data into the 'aud_tac_conf_quartz' table from a CSV file in batches.
@@ -1974,22 +1834,24 @@ def AUD_318_ALIMCONFQUARTZ(config: Config, db: Database, parsed_files_data: List
         # Insert data into 'aud_tac_conf_quartz' from the CSV file in batches
         table_name = 'aud_tac_conf_quartz'
         db.insert_from_csv_batch(file_path, table_name, batch_size)
-        logging.info(f"Inserted data from {file_path} into {table_name} in batches of {batch_size}")
+        logger.info("Inserted data from %s into %s in batches of %s", file_path, table_name, batch_size)
 
     except Exception as e:
         # Log any errors that occur during the process
-        logging.error(f"An error occurred during data insertion: {e}", exc_info=True)
+        logger.error("An error occurred during data insertion: %s", e, exc_info=True)
+        raise
 
     finally:
         # Ensure the database connection is always closed
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
 
+@job_metrics
 def AUD_319_ALIMDOCCONTEXTGROUP(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]], batch_size: int = 100):
     """
-    Inserts parsed context group data into the 'aud_doccontextgroup' table in batches after truncating the table.
+    Reloads the 'aud_doccontextgroup' table with the parsed context group data, inserted in batches.
 
     Args:
         config (Config): An instance of the Config class for retrieving query parameters.
@@ -1998,60 +1860,50 @@ def AUD_319_ALIMDOCCONTEXTGROUP(config: Config, db: Database, parsed_files_data:
         batch_size (int): The number of rows to process in each batch operation. Default is 100.
     """
     try:
-        # Step 1: Truncate the 'aud_doccontextgroup' table before inserting new data
-        logging.info("Truncating table 'aud_doccontextgroup'.")
-        db.truncate_table('aud_doccontextgroup')
-        logging.info("Table 'aud_doccontextgroup' truncated successfully.")
-
-        # Step 2: Prepare the insert query for 'aud_doccontextgroup'
-        insert_query = config.get_param('insert_queries', 'aud_doccontextgroup')
-        batch_insert = []
-
-        # Step 3: Iterate over parsed files and insert context group data
-        logging.info(f"Starting to process {len(parsed_files_data)} files.")
-        for nameproject, job_name,version, parsed_data in parsed_files_data:
-            # #logging.debug(f"Processing project: {nameproject}, job: {job_name}")
-            for prop in parsed_data['contexts']:
-                    # Extract values from properties
-                    namecontextgroup = prop['label']
-                    purpose = prop['purpose']
-                    description = prop['description']
-                    version = prop['version']
-                    statusCode = prop['statusCode']
-                    item = prop['item']
-                    displayName = prop['display_name']
-                    id= prop ['property_id']
-
-                    # Create the tuple of values to insert
-                    params = (namecontextgroup, nameproject, purpose, description, version, statusCode, item, displayName, id)
-                    # #logging.debug(f"Preparing to insert row: {params}")
-                    batch_insert.append(params)
-
-                    # Insert data in batches if the batch size is reached
-                    if len(batch_insert) == batch_size:
-                        logging.info(f"Inserting batch of {len(batch_insert)} rows into 'aud_doccontextgroup'.")
-                        db.insert_data_batch(insert_query, 'aud_doccontextgroup', batch_insert)
-                        logging.info(f"Inserted batch of {len(batch_insert)} rows into 'aud_doccontextgroup'.")
-                        batch_insert.clear()
+        # Step 1: Reload 'aud_doccontextgroup' through a staging table swapped in once loaded
+        staging = config.get_param('Transactions', 'staging_load')
+        with db.reload_table('aud_doccontextgroup', staging=staging) as target_table:
+            # Step 2: Prepare the insert query for 'aud_doccontextgroup'
+            insert_query = config.get_param('insert_queries', 'aud_doccontextgroup').replace('aud_doccontextgroup', target_table, 1)
+            batch_insert = db.batcher(insert_query, target_table, initial_size=batch_size)
+
+            # Step 3: Iterate over parsed files and insert context group data
+            logger.info("Starting to process %s files.", len(parsed_files_data))
+            for nameproject, job_name,version, parsed_data in parsed_files_data:
+                # #logging.debug(f"Processing project: {nameproject}, job: {job_name}")
+                for prop in parsed_data['contexts']:
+                        # Extract values from properties
+                        namecontextgroup = prop['label']
+                        purpose = prop['purpose']
+                        description = prop['description']
+                        version = prop['version']
+                        statusCode = prop['statusCode']
+                        item = prop['item']
+                        displayName = prop['display_name']
+                        id= prop ['property_id']
+
+                        # Create the tuple of values to insert
+                        params = (namecontextgroup, nameproject, purpose, description, version, statusCode, item, displayName, id)
+                        # #logging.debug(f"Preparing to insert row: {params}")
+                        batch_insert.append(params)
 
-        # Step 4: Insert any remaining data that didn't fill a full batch
-        if batch_insert:
-            logging.info(f"Inserting remaining {len(batch_insert)} rows into 'aud_doccontextgroup'.")
-            db.insert_data_batch(insert_query, 'aud_doccontextgroup', batch_insert)
-            logging.info(f"Inserted remaining {len(batch_insert)} rows into 'aud_doccontextgroup'.")
+            # Step 4: Insert any remaining data that didn't fill a full batch
+            batch_insert.flush()
 
     except Exception as e:
         # Log any errors encountered during the process
-        logging.error(f"An error occurred during the batch insert operation: {e}", exc_info=True)
+        logger.error("An error occurred during the batch insert operation: %s", e, exc_info=True)
+        raise
 
     finally:
         # Ensure the database connection is properly closed
         if db:
             #db.close()
-            logging.info("done!")
+            logger.info("done!")
 
 
 
+@job_metrics
 def AUD_320_ALIMDOCJOBS(config: Config, db: Database, parsed_files_data: List[Tuple[str, str, dict]], batch_size: int = 100):
     """
     Perform operations including retrieving JDBC parameters, executing queries,
@@ -2071,7 +1923,7 @@ def AUD_320_ALIMDOCJOBS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 4: Execute aud_subjobs query
         aud_subjobs_query = config.get_param('queries', 'aud_subjobs')
-        logging.info(f"Executing query: {aud_subjobs_query}")
+        logger.info("Executing query: %s", aud_subjobs_query)
         aud_subjobs_results = db.execute_query(aud_subjobs_query)
         #logging.debug(f"aud_subjobs_results: {aud_subjobs_results}")
 
@@ -2093,10 +1945,10 @@ def AUD_320_ALIMDOCJOBS(config: Config, db: Database, parsed_files_data: List[Tu
 
         # Step 6: Insert parsed data into the aud_subjobs table in batches
         insert_query = config.get_param('insert_queries', 'aud_docjobs')
-        batch_insert = []
+        batch_insert = db.batcher(insert_query, 'aud_docjobs', initial_size=batch_size)
 
         # Step 3: Iterate over parsed files and insert context group data
-        logging.info(f"Starting to process {len(parsed_files_data)} files.")
+        logger.info("Starting to process %s files.", len(parsed_files_data))
         for nameproject, namejob, version, parsed_data in parsed_files_data:
             # #logging.debug(f"Processing project: {nameproject}, job: {job_name}")
             for data in parsed_data['TalendProperties']:
@@ -2115,26 +1967,18 @@ def AUD_320_ALIMDOCJOBS(config: Config, db: Database, parsed_files_data: List[Tu
                     ## logging.debug(f"Preparing to insert row: {params}")
                     batch_insert.append(params)
 
-                    # Insert data in batches if the batch size is reached
-                    if len(batch_insert) == batch_size:
-                        # logging.info(f"Inserting batch of {len(batch_insert)} rows into 'aud_docjobs'.")
-                        db.insert_data_batch(insert_query, 'aud_docjobs', batch_insert)
-                        # logging.info(f"Inserted batch of {len(batch_insert)} rows into 'aud_docjobs'.")
-                        batch_insert.clear()
-
         # Step 4: Insert any remaining data that didn't fill a full batch
-        if batch_insert:
-            # logging.info(f"Inserting remaining {len(batch_insert)} rows into 'aud_docjobs'.")
-            db.insert_data_batch(insert_query, 'aud_docjobs', batch_insert)
-            # logging.info(f"Inserted remaining {len(batch_insert)} rows into 'aud_docjobs'.")
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             #db.close()  # Ensure the database connection is closed
-            logging.info("done!")
+            logger.info("done!")
 
+@job_metrics
 def AUD_323_ALIMELEMENTNODEFILTER(
     config: Config, 
     db: Database, 
@@ -2153,54 +1997,46 @@ def AUD_323_ALIMELEMENTNODEFILTER(
         batch_size (int): The number of rows to process in each batch operation. Default is 100.
     """
     try:
-        #Truncate the 'aud_elementnode_filter' table before inserting new data
-        logging.info("Truncating table 'aud_elementnode_filter'.")
-        db.truncate_table('aud_elementnode_filter')
-        logging.info("Table 'aud_elementnode_filter' truncated successfully.")
-
-        # Step 1: Execute aud_elementnode_filter
-        aud_elementnode_filter_query = config.get_param('queries', 'aud_elementnode_filter')
-        logging.info(f"Executing query: {aud_elementnode_filter_query}")
-        aud_elementnode_filter_query_results = db.execute_query(aud_elementnode_filter_query)
-        # #logging.debug(f"aud_elementnode_filter_query_results: {aud_elementnode_filter_query_results}")
-
-        # Step 2: Insert data into aud_elementnode_filter in batches
-        batch_insert = []
-        insert_query = config.get_param('insert_queries', 'aud_elementnode_filter')
+        # Reload 'aud_elementnode_filter' through a staging table swapped in once loaded
+        staging = config.get_param('Transactions', 'staging_load')
+        with db.reload_table('aud_elementnode_filter', staging=staging) as target_table:
+            # Step 1: Execute aud_elementnode_filter
+            aud_elementnode_filter_query = config.get_param('queries', 'aud_elementnode_filter')
+            logger.info("Executing query: %s", aud_elementnode_filter_query)
+
+            # Step 2: Insert data into aud_elementnode_filter in batches
+            insert_query = config.get_param('insert_queries', 'aud_elementnode_filter').replace('aud_elementnode_filter', target_table, 1)
+            batch_insert = db.batcher(insert_query, target_table, initial_size=batch_size)
         
-        for result in aud_elementnode_filter_query_results:
-            # Unpack result tuple
-            ( aud_componentName, aud_field, aud_nameElementNode, aud_show,aud_valueElementNode, aud_ComponementValue, NameProject, NameJob, execution_date) = result
+            # The results are streamed in chunks instead of being fetched whole
+            for result in chain.from_iterable(db.stream_query(aud_elementnode_filter_query)):
+                # Unpack result tuple
+                ( aud_componentName, aud_field, aud_nameElementNode, aud_show,aud_valueElementNode, aud_ComponementValue, NameProject, NameJob, execution_date) = result
 
-            # Check if aud_valueElementNode is None, then handle it appropriately
-            if aud_valueElementNode is not None:
-                # Chain multiple replace calls
-                aud_valueElementNode = aud_valueElementNode.replace('\"', '').replace('+', ' ').replace('`', '') 
+                # Check if aud_valueElementNode is None, then handle it appropriately
+                if aud_valueElementNode is not None:
+                    # Chain multiple replace calls
+                    aud_valueElementNode = aud_valueElementNode.replace('\"', '').replace('+', ' ').replace('`', '') 
 
-            aud_show = 0 if aud_show == 'false' else 1 if aud_show == 'true' else None
-
-            cleaned_result = ( aud_componentName, aud_field, aud_nameElementNode, aud_show,   aud_valueElementNode, aud_ComponementValue, NameProject, NameJob, execution_date)       
-            # Add result to batch insert list
-            batch_insert.append(cleaned_result)
+                aud_show = 0 if aud_show == 'false' else 1 if aud_show == 'true' else None
 
-            if len(batch_insert) == batch_size:
-                db.insert_data_batch(insert_query,'aud_elementnode_filter',  batch_insert)
-                # #logging.info(f"Inserted batch of data into aud_elementnode_filter: {len(batch_insert)} rows")
-                batch_insert.clear()
+                cleaned_result = ( aud_componentName, aud_field, aud_nameElementNode, aud_show,   aud_valueElementNode, aud_ComponementValue, NameProject, NameJob, execution_date)       
+                # Add result to batch insert list
+                batch_insert.append(cleaned_result)
 
-        # Insert remaining data in the batch
-        if batch_insert:
-            db.insert_data_batch(insert_query,'aud_elementnode_filter',  batch_insert)
-            #logging.info(f"Inserted remaining batch of data into aud_elementnode_filter: {len(batch_insert)} rows")
+            # Insert remaining data in the batch
+            batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
-            logging.info("done!")
+            logger.info("done!")
 
 
 
+@job_metrics
 def AUD_324_ALIMMETADATAFILTER(
     config: Config, 
     db: Database, 
@@ -2221,15 +2057,14 @@ def AUD_324_ALIMMETADATAFILTER(
     try:
         # Step 1: Execute aud_metadata_filter
         aud_metadata_filter_query = config.get_param('queries', 'aud_metadata_filter')
-        logging.info(f"Executing query: {aud_metadata_filter_query}")
-        aud_metadata_filter_query_results = db.execute_query(aud_metadata_filter_query)
-        #logging.debug(f"aud_metadata_filter_query_results: {aud_metadata_filter_query_results}")
+        logger.info("Executing query: %s", aud_metadata_filter_query)
 
         # Step 2: Insert data into aud_metadata_filter in batches
-        batch_insert = []
         insert_query = config.get_param('insert_queries', 'aud_metadata_filter')
+        batch_insert = db.batcher(insert_query, 'aud_metadata_filter', initial_size=batch_size)
 
-        for result in aud_metadata_filter_query_results:
+        # The results are streamed in chunks instead of being fetched whole
+        for result in chain.from_iterable(db.stream_query(aud_metadata_filter_query)):
             # Unpack the result
             # (
             #     aud_connector, aud_labelConnector, aud_nameComponentView, aud_comment, 
@@ -2242,25 +2077,20 @@ def AUD_324_ALIMMETADATAFILTER(
             # Add result to batch insert list
             batch_insert.append(result)
 
-            if len(batch_insert) == batch_size:
-                db.insert_data_batch(insert_query,'aud_metadata_filter', batch_insert)
-                #logging.info(f"Inserted batch of data into aud_metadata_filter: {len(batch_insert)} rows")
-                batch_insert.clear()
-
         # Insert remaining data in the batch
-        if batch_insert:
-            db.insert_data_batch(insert_query,'aud_metadata_filter', batch_insert)
-            #logging.info(f"Inserted remaining batch of data into aud_metadata_filter: {len(batch_insert)} rows")
+        batch_insert.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {e}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
         if db:
             # Ensure the database connection is closed
             # db.close()
-            logging.info("Database operations completed successfully!")
+            logger.info("Database operations completed successfully!")
 
 
+@job_metrics
 def AUD_701_CONVERTSCREENSHOT(
     config: Config,
     db: Database,
@@ -2284,7 +2114,7 @@ def AUD_701_CONVERTSCREENSHOT(
 
         # Step 2: Execute 'aud_screenshot' query and retrieve results
         aud_screenshot_query = config.get_param('queries', 'aud_screenshot')
-        logging.info(f"Executing query: {aud_screenshot_query}")
+        logger.info("Executing query: %s", aud_screenshot_query)
         aud_screenshot_results = db.execute_query(aud_screenshot_query)
 
         # Step 3: Delete records from 'aud_contextjob' based on 'aud_screenshot' query results
@@ -2293,11 +2123,12 @@ def AUD_701_CONVERTSCREENSHOT(
             for result in aud_screenshot_results
         ]
         if aud_contextjob_conditions_batch:
-            logging.info(f"Deleting records from aud_contextjob: {len(aud_contextjob_conditions_batch)} items.")
+            logger.info("Deleting records from aud_contextjob: %s items.", len(aud_contextjob_conditions_batch))
             db.delete_records_batch('aud_contextjob', aud_contextjob_conditions_batch)
 
         # Step 4: Prepare batch data for insertion into 'aud_screenshot'
-        aud_screenshot_batch = []
+        insert_query = config.get_param('insert_queries', 'aud_screenshot')
+        aud_screenshot_batch = db.batcher(insert_query, 'aud_screenshot', initial_size=batch_size)
 
         for nameproject, namejob,version, parsed_data in parsed_files_data:
             for screenshot in parsed_data.get('screenshots', []):
@@ -2311,23 +2142,14 @@ def AUD_701_CONVERTSCREENSHOT(
                     params = (namejob, nameproject, screenshot_value, cle, execution_date, width, height)
                     aud_screenshot_batch.append(params)
 
-                # Step 5: Insert data in batches if batch size is met
-                if len(aud_screenshot_batch) == batch_size:
-                    insert_query = config.get_param('insert_queries', 'aud_screenshot')
-                    logging.info(f"Inserting batch of {batch_size} rows into aud_screenshot.")
-                    db.insert_data_batch(insert_query, 'aud_screenshot', aud_screenshot_batch)
-                    aud_screenshot_batch.clear()  # Clear the batch after insertion
-
         # Step 6: Insert any remaining data in the batch
-        if aud_screenshot_batch:
-            insert_query = config.get_param('insert_queries', 'aud_screenshot')
-            db.insert_data_batch(insert_query, 'aud_screenshot', aud_screenshot_batch)
-            logging.info(f"Inserted remaining {len(aud_screenshot_batch)} rows into aud_screenshot.")
+        aud_screenshot_batch.flush()
 
     except Exception as e:
-        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        logger.error("An error occurred: %s", e, exc_info=True)
+        raise
     finally:
-        logging.info("Operation completed!")
+        logger.info("Operation completed!")
         # Uncomment to close the database connection if needed
         # if db:
         #     db.close()
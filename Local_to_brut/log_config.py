@@ -0,0 +1,64 @@
+import logging
+import os
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Defaults of the `Logging` section of config.yaml
+DEFAULT_SETTINGS = {
+    'file': 'database_operations.log',
+    'filemode': 'w',  # Ensure the file is overwritten each time for clean logs
+    'level': 'INFO',
+    'levels': {},
+}
+
+_handler = None  # File handler installed by configure_logging
+
+
+def configure_logging(settings=None):
+    """
+    Configure the logging of every module: one log file, a default level and a level per module.
+
+    Each module logs through `logging.getLogger(__name__)`, so a level set for a module name (e.g.
+    `XML_parse`, `database`, `jobs`) applies to the messages of that module only. The file handler
+    is installed by the first call; later calls only replace it when another file or mode is given.
+
+    Args:
+        settings (dict, optional): The `Logging` section of config.yaml, see `DEFAULT_SETTINGS`:
+            file (str): The log file.
+            filemode (str): 'w' to start a new file, 'a' to append to it.
+            level (str): Level of the modules without a level of their own.
+            levels (dict): Module name -> level.
+    """
+    global _handler
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    root = logging.getLogger()
+
+    filename = os.path.abspath(settings['file'])
+    if _handler is not None and (_handler.baseFilename, _handler.mode) != (filename, settings['filemode']):
+        root.removeHandler(_handler)
+        _handler.close()
+        _handler = None
+    if _handler is None:
+        # The file is only opened by the first record, so a later call can still change it
+        _handler = logging.FileHandler(filename, mode=settings['filemode'], encoding='utf-8', delay=True)
+        _handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(_handler)
+
+    root.setLevel(settings['level'])
+    for name, level in (settings['levels'] or {}).items():
+        logging.getLogger(name).setLevel(level)
+
+
+class Preview:
+    """
+    Preview of the first rows of a DataFrame, rendered only if the log record using it is emitted:
+    `logger.debug("Sample of joined DataFrame:\\n%s", Preview(joined_df))`.
+    """
+    __slots__ = ('df', 'rows')
+
+    def __init__(self, df, rows=5):
+        self.df = df
+        self.rows = rows
+
+    def __str__(self):
+        return str(self.df.head(self.rows))
@@ -0,0 +1,313 @@
+import ctypes
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from profiling import profile
+
+try:
+    import psutil  # Optional: current and peak RSS on every platform
+except ImportError:
+    psutil = None
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Defaults of the `Metrics` section of config.yaml
+DEFAULT_SETTINGS = {
+    'file': None,  # No report unless a file is configured
+    'format': 'json',  # json or prometheus
+}
+
+# Work done outside of any job (e.g. the execution date query of main) is reported under this name
+RUN = 'run'
+
+# Job values reported as Prometheus gauges; the other values are counters
+GAUGES = ('rss_start_bytes', 'rss_end_bytes', 'peak_rss_bytes', 'process_peak_rss_bytes')
+
+# Seconds between two reads of the RSS while a job runs, see `RssSampler`
+RSS_INTERVAL = 0.1
+
+_lock = threading.Lock()
+_settings = dict(DEFAULT_SETTINGS)
+_jobs = {}
+_current = None  # Job being run; stage threads started by a job report to it as well
+
+
+def configure_metrics(settings=None):
+    """
+    Configure where the metrics report is written.
+
+    Args:
+        settings (dict, optional): The `Metrics` section of config.yaml, see `DEFAULT_SETTINGS`:
+            file (str): The report file, None to write no report.
+            format (str): 'json', or 'prometheus' for the Prometheus text exposition format.
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    if settings['format'] not in ('json', 'prometheus'):
+        raise ValueError(f"Unknown metrics format: {settings['format']}")
+    _settings.update(settings)
+
+
+def _job_entry(job_name):
+    """Return the counters of a job, created on first use. The lock must be held."""
+    entry = _jobs.get(job_name)
+    if entry is None:
+        entry = _jobs[job_name] = {
+            'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rss_start_bytes': None, 'rss_end_bytes': None,
+            'peak_rss_bytes': None, 'process_peak_rss_bytes': None, 'counters': {}, 'tables': {}
+        }
+    return entry
+
+
+def record(table_name=None, **counters):
+    """
+    Add to the counters of the running job.
+
+    Args:
+        table_name (str, optional): Table the counters are about. Defaults to None (job counters,
+            e.g. commits or query time).
+        **counters: Counter name -> amount, e.g. `rows_inserted=100, insert_seconds=0.2`.
+    """
+    with _lock:
+        entry = _job_entry(_current or RUN)
+        totals = entry['counters'] if table_name is None else entry['tables'].setdefault(table_name, {})
+        for name, amount in counters.items():
+            totals[name] = totals.get(name, 0) + amount
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    """PROCESS_MEMORY_COUNTERS of the Windows GetProcessMemoryInfo function."""
+    _fields_ = [
+        ('cb', ctypes.c_ulong), ('PageFaultCount', ctypes.c_ulong),
+        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t),
+    ]
+
+
+def _windows_memory():
+    """Return the (working set, peak working set) of the process on Windows."""
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(
+        ctypes.c_void_p(kernel32.GetCurrentProcess()), ctypes.byref(counters), counters.cb
+    ):
+        return None, None
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+
+def memory_usage():
+    """
+    Return the current and peak resident set size (working set on Windows) of the process.
+
+    psutil is used when installed; otherwise GetProcessMemoryInfo on Windows, /proc/self/statm and
+    `resource` on Linux, `resource` alone (peak only) elsewhere.
+
+    Returns:
+        tuple: (current bytes, peak bytes since the process started), each None when unknown.
+    """
+    if sys.platform == 'win32':
+        if psutil is not None:
+            info = psutil.Process().memory_info()
+            return info.rss, info.peak_wset
+        return _windows_memory()
+
+    if psutil is not None:
+        current = psutil.Process().memory_info().rss
+    else:
+        try:
+            with open('/proc/self/statm') as statm:
+                current = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            current = None
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        peak = peak if sys.platform == 'darwin' else peak * 1024
+    return current, peak
+
+
+class RssSampler(threading.Thread):
+    """
+    Reads the RSS of the process every `RSS_INTERVAL` seconds while a job runs, to get the peak
+    of the job itself rather than the peak of the whole process so far.
+    """
+
+    def __init__(self):
+        super().__init__(name="RssSampler", daemon=True)
+        self.start_rss = self.peak_rss = memory_usage()[0]
+        self._stopped = threading.Event()
+
+    def _sample(self):
+        current = memory_usage()[0]
+        if current is not None and (self.peak_rss is None or current > self.peak_rss):
+            self.peak_rss = current
+        return current
+
+    def run(self):
+        while not self._stopped.wait(RSS_INTERVAL):
+            self._sample()
+
+    def stop(self):
+        """Stop sampling; returns the RSS at the end of the job."""
+        self._stopped.set()
+        self.join()
+        return self._sample()
+
+
+@contextmanager
+def job(job_name):
+    """
+    Report the work done in the block to a job and time it.
+
+    The wall-clock time, the CPU time of the process (every thread), the RSS at the start and at the
+    end of the block and its peak in between (sampled every `RSS_INTERVAL` seconds), along with the
+    peak RSS of the whole process so far, are recorded. The report is written when the block exits, so a run stopped halfway still
+    leaves the metrics of the jobs already done. When a profile directory is configured, the block
+    is profiled as well, see `profiling.profile`.
+
+    Args:
+        job_name (str): Name of the job, e.g. AUD_301_ALIMELEMENTNODE.
+    """
+    global _current
+    previous, _current = _current, job_name
+    rss_sampler = RssSampler()
+    rss_sampler.start()
+    start_time, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        with profile(job_name):
+            yield
+    finally:
+        wall_seconds, cpu_seconds = time.perf_counter() - start_time, time.process_time() - start_cpu
+        end_rss = rss_sampler.stop()
+        with _lock:
+            entry = _job_entry(job_name)
+            entry['runs'] += 1
+            entry['wall_seconds'] += wall_seconds
+            entry['cpu_seconds'] += cpu_seconds
+            entry['rss_start_bytes'], entry['rss_end_bytes'] = rss_sampler.start_rss, end_rss
+            if rss_sampler.peak_rss is not None:
+                entry['peak_rss_bytes'] = max(entry['peak_rss_bytes'] or 0, rss_sampler.peak_rss)
+            entry['process_peak_rss_bytes'] = memory_usage()[1]
+        _current = previous
+        write_report()
+
+
+def job_metrics(func):
+    """Decorator reporting the work of an AUD job function to the job of the same name, see `job`."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with job(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def timer(counter, table_name=None, **counters):
+    """
+    Add the time spent in the block to a counter of the running job, see `record`.
+
+    Args:
+        counter (str): Name of the counter receiving the seconds, e.g. 'query_seconds'.
+        table_name (str, optional): Table the counters are about. Defaults to None.
+        **counters: Other counters added along with the time.
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(table_name, **{counter: time.perf_counter() - start_time}, **counters)
+
+
+def snapshot():
+    """
+    Return a copy of the metrics recorded so far.
+
+    Returns:
+        dict: Job name -> runs, wall_seconds, cpu_seconds, rss_start_bytes, rss_end_bytes,
+        peak_rss_bytes (peak of the job, over its runs), process_peak_rss_bytes, counters (job
+        counters) and tables (table name -> counters).
+    """
+    with _lock:
+        return {
+            job_name: {
+                **entry,
+                'counters': dict(entry['counters']),
+                'tables': {table_name: dict(totals) for table_name, totals in entry['tables'].items()},
+            }
+            for job_name, entry in _jobs.items()
+        }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(jobs):
+    """
+    Render metrics in the Prometheus text exposition format.
+
+    Args:
+        jobs (dict): Metrics as returned by `snapshot`.
+
+    Returns:
+        str: One `sqops_job_<name>_total{job=...}` sample per job counter, one `sqops_job_<name>`
+        gauge per job memory value and one `sqops_table_<name>_total{job=...,table=...}` sample per
+        table counter.
+    """
+    samples = {}
+    for job_name, entry in jobs.items():
+        labels = f'job="{_label(job_name)}"'
+        values = {name: entry[name] for name in ('runs', 'wall_seconds', 'cpu_seconds', *GAUGES)}
+        for name, value in {**values, **entry['counters']}.items():
+            if value is not None:
+                samples.setdefault(f"sqops_job_{name}", []).append((labels, value))
+        for table_name, totals in entry['tables'].items():
+            for name, value in totals.items():
+                samples.setdefault(f"sqops_table_{name}", []).append((f'{labels},table="{_label(table_name)}"', value))
+
+    lines = []
+    for metric, metric_samples in samples.items():
+        if metric.removeprefix('sqops_job_') in GAUGES:
+            lines.append(f"# TYPE {metric} gauge")
+        else:
+            metric = f"{metric}_total"
+            lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{{{labels}}} {value}" for labels, value in metric_samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_report(file=None, format=None):
+    """
+    Write the metrics recorded so far, replacing the previous report.
+
+    Args:
+        file (str, optional): The report file. Defaults to the configured file; nothing is written
+            when there is none.
+        format (str, optional): 'json' or 'prometheus'. Defaults to the configured format.
+    """
+    file = file or _settings['file']
+    if not file:
+        return
+    jobs = snapshot()
+    try:
+        with open(file, 'w', encoding='utf-8') as report:
+            if (format or _settings['format']) == 'prometheus':
+                report.write(prometheus_text(jobs))
+            else:
+                json.dump({'jobs': jobs}, report, indent=2)
+    except OSError as e:
+        logger.error("Error writing the metrics report to %s: %s", file, e)
@@ -0,0 +1,167 @@
+import cProfile
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Defaults of the `Profiling` section of config.yaml
+DEFAULT_SETTINGS = {
+    'directory': None,  # No profiling unless a directory is configured (or given with main.py --profile)
+    'interval': 0.01,  # Seconds between two samples of the thread stacks
+    'memory': True,  # Trace the allocations with tracemalloc (slows the jobs down noticeably)
+    'top': 25,  # Number of allocation sites listed in the memory reports
+}
+
+# Merged samples of every profiled job, see `StackSampler`
+FOLDED_FILE = 'profile.folded'
+
+_settings = dict(DEFAULT_SETTINGS)
+_stacks = Counter()
+_marks = None  # Memory marks of the job being profiled, see `mark`
+
+
+def configure_profiling(settings=None):
+    """
+    Configure the profiling of the jobs.
+
+    Args:
+        settings (dict, optional): The `Profiling` section of config.yaml, see `DEFAULT_SETTINGS`:
+            directory (str): Directory receiving the profile files, None to profile nothing.
+            interval (float): Seconds between two samples of the thread stacks.
+            memory (bool): Whether to trace the allocations with tracemalloc.
+            top (int): Number of allocation sites listed in the memory reports.
+    """
+    _settings.update({**DEFAULT_SETTINGS, **(settings or {})})
+
+
+def _frame_name(code):
+    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name.replace(';', ':')  # ';' separates the frames of a folded stack
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stacks of every thread of the process at a fixed interval, stage threads included,
+    and counts them as folded stacks (`job;thread;outer frame;...;inner frame`), the input format
+    of flamegraph.pl, speedscope and most flame graph viewers.
+
+    Args:
+        job_name (str): Name of the job, root frame of the stacks.
+        interval (float): Seconds between two samples.
+    """
+
+    def __init__(self, job_name, interval):
+        super().__init__(name=f"StackSampler-{job_name}", daemon=True)
+        self.job_name = job_name
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                frames.append(threads.get(ident, str(ident)).replace(';', ':'))
+                frames.append(self.job_name)
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def mark(label):
+    """
+    Record the memory traced so far under a label (e.g. the end of a stage) in the memory report of
+    the job being profiled. Does nothing when no job is profiled with memory tracing.
+
+    Args:
+        label (str): What the mark stands for, e.g. 'stage tmap_input'.
+    """
+    if _marks is not None and tracemalloc.is_tracing():
+        _marks.append((label, *tracemalloc.get_traced_memory()))
+
+
+def _write_memory_report(path, job_name, before, after, marks):
+    """Write the allocation sites that grew the most during a job and its memory marks."""
+    current, peak = tracemalloc.get_traced_memory()
+    with open(path, 'w', encoding='utf-8') as report:
+        report.write(f"{job_name}: {current / 2**20:.1f} MiB traced at the end, peak {peak / 2**20:.1f} MiB\n")
+        for label, mark_current, mark_peak in marks:
+            report.write(f"{label}: {mark_current / 2**20:.1f} MiB traced, peak {mark_peak / 2**20:.1f} MiB\n")
+        report.write(f"\nTop {_settings['top']} allocation sites by growth:\n")
+        # Leave out the allocations of the profilers themselves
+        ignored = [tracemalloc.Filter(False, filename) for filename in (__file__, cProfile.__file__, tracemalloc.__file__)]
+        for stat in after.filter_traces(ignored).compare_to(before.filter_traces(ignored), 'lineno')[:_settings['top']]:
+            report.write(f"{stat}\n")
+
+
+@contextmanager
+def profile(job_name):
+    """
+    Profile the block when a profile directory is configured, otherwise just run it.
+
+    Writes to the profile directory:
+    - `<job_name>.prof`: cProfile statistics of the thread running the job (`python -m pstats`,
+      snakeviz...). Stage threads do not show in it, they do in the sampled stacks.
+    - `<job_name>.memory.txt`: with `memory`, the traced memory at the end of the job, at each
+      `mark` and the allocation sites that grew the most between the tracemalloc snapshots taken
+      at the start and at the end of the job.
+    - `profile.folded`: the sampled stacks of every profiled job so far, merged, see `StackSampler`.
+
+    A job run inside a profiled job is profiled as part of the enclosing one.
+
+    Args:
+        job_name (str): Name of the job, used for the file names.
+    """
+    global _marks
+    directory = _settings['directory']
+    if not directory or _marks is not None:
+        yield
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    base_path = os.path.join(directory, job_name)
+    memory = _settings['memory']
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+
+    _marks = []
+    sampler = StackSampler(job_name, _settings['interval'])
+    sampler.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        marks, _marks = _marks, None
+        try:
+            profiler.dump_stats(f"{base_path}.prof")
+            if memory:
+                _write_memory_report(f"{base_path}.memory.txt", job_name, before, tracemalloc.take_snapshot(), marks)
+            _stacks.update(sampler.stacks)
+            with open(os.path.join(directory, FOLDED_FILE), 'w', encoding='utf-8') as folded:
+                folded.writelines(f"{stack} {count}\n" for stack, count in _stacks.items())
+            logger.info("Profile of %s written to %s.", job_name, directory)
+        except OSError as e:
+            logger.error("Error writing the profile of %s to %s: %s", job_name, directory, e)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
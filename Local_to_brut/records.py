@@ -0,0 +1,154 @@
+import sys
+
+
+def intern_value(value):
+    """Intern a repeated attribute value, leaving None untouched."""
+    return sys.intern(value) if value is not None else None
+
+
+class Record:
+    """
+    Base class for the compact records built by XMLParser.
+
+    Records use `__slots__` instead of a per-instance dict and expose both attribute access
+    (`param.field`) and the dict-style access the AUD jobs were written against
+    (`param['field']`, `param.get('field')`).
+    """
+    __slots__ = ()
+    _attributes = ()  # XML attributes copied as-is, in slot order
+    _interned = frozenset()  # attributes whose values repeat across the workspace
+    _children = ()  # slots filled by the parser rather than from XML attributes
+
+    @classmethod
+    def from_element(cls, element, **children):
+        """
+        Build a record from an XML element.
+
+        Args:
+            element (Element): The XML element to read the attributes from.
+            **children: Values for the slots listed in `_children` (nested records, lists...).
+
+        Returns:
+            Record: The populated record.
+        """
+        record = cls.__new__(cls)
+        get = element.get
+        interned = cls._interned
+        for attribute in cls._attributes:
+            value = get(attribute)
+            if value is not None and attribute in interned:
+                value = sys.intern(value)
+            setattr(record, attribute, value)
+        for child in cls._children:
+            setattr(record, child, children.get(child, ()))
+        return record
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+    def keys(self):
+        return self._attributes + self._children
+
+    def _asdict(self):
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.keys())
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._asdict()!r})"
+
+
+class ElementValue(Record):
+    """An `elementValue` entry of a TABLE-typed elementParameter."""
+    __slots__ = ('elementRef', 'value')
+    _attributes = ('elementRef', 'value')
+    _interned = frozenset({'elementRef'})
+
+
+class ElementParameter(Record):
+    """An `elementParameter` of a node, connection or subjob."""
+    __slots__ = ('field', 'name', 'show', 'value', 'elementValues')
+    _attributes = ('field', 'name', 'show', 'value')
+    _interned = frozenset({'field', 'name', 'show'})
+    _children = ('elementValues',)
+
+    @property
+    def elementValue(self):
+        """Node parameters were historically exposed under the singular key."""
+        return self.elementValues
+
+
+class JobParameter(ElementParameter):
+    """An `elementParameter` of the job-level `parameters` element."""
+    __slots__ = ('routinesParameters',)
+    _children = ('elementValues', 'routinesParameters')
+
+
+class MetadataColumn(Record):
+    """A `column` of a node `metadata` element."""
+    __slots__ = (
+        'comment', 'key', 'length', 'name', 'nullable', 'pattern', 'precision', 'sourceType',
+        'type', 'usefulColumn', 'originalLength', 'defaultValue', 'additionalField', 'additionalProperties'
+    )
+    _attributes = (
+        'comment', 'key', 'length', 'name', 'nullable', 'pattern', 'precision', 'sourceType',
+        'type', 'usefulColumn', 'originalLength', 'defaultValue'
+    )
+    _interned = frozenset({'key', 'nullable', 'sourceType', 'type', 'usefulColumn'})
+    _children = ('additionalField', 'additionalProperties')
+
+
+class MapperTableEntry(Record):
+    """A `mapperTableEntries` entry of a tMap var, input or output table."""
+    __slots__ = ('name', 'expression', 'type', 'nullable', 'operator')
+    _attributes = ('name', 'expression', 'type', 'nullable', 'operator')
+    _interned = frozenset({'type', 'nullable', 'operator'})
+
+
+class Connection(Record):
+    """A `connection` between two components, with its elementParameters."""
+    __slots__ = (
+        'connectorName', 'label', 'lineStyle', 'metaname', 'offsetLabelX', 'offsetLabelY',
+        'source', 'target', 'outputId', 'elementParameters'
+    )
+    _attributes = (
+        'connectorName', 'label', 'lineStyle', 'metaname', 'offsetLabelX', 'offsetLabelY',
+        'source', 'target', 'outputId'
+    )
+    _interned = frozenset({'connectorName', 'lineStyle', 'metaname'})
+    _children = ('elementParameters',)
+
+
+class TreeNode(Record):
+    """
+    A `nodes`/`children` entry of a tXMLMap input or output tree, flattened into a row.
+
+    `id` is the position of the row in the flat list of its tree, `parent_id` the `id` of the
+    enclosing node (None for the top-level `nodes`) and `depth` its nesting level (0 at the top).
+    """
+    __slots__ = (
+        'name', 'type', 'xpath', 'nodeType', 'main', 'defaultValue', 'expression',
+        'filterOutGoingConnections', 'lookupOutgoingConnections', 'outgoingConnections',
+        'incomingConnections', 'lookupIncomingConnections', 'id', 'parent_id', 'depth'
+    )
+    _attributes = (
+        'name', 'type', 'xpath', 'nodeType', 'main', 'defaultValue', 'expression',
+        'filterOutGoingConnections', 'lookupOutgoingConnections', 'outgoingConnections',
+        'incomingConnections', 'lookupIncomingConnections'
+    )
+    _interned = frozenset({'type', 'nodeType', 'main'})
+    _children = ('id', 'parent_id', 'depth')
@@ -0,0 +1,14 @@
+-- Tables written by Local_to_brut that are not part of the original audit schema (MySQL).
+-- Run once against the audit database, e.g. mysql sqops_dataraise < tables.sql
+
+-- AUD_300_ALIMJOBCHANGE: version and content hash of the newest .item file of each job, exec_date
+-- being the run that last saw it change (read by the Incremental.changed_jobs query of Brut_to_agg)
+CREATE TABLE IF NOT EXISTS aud_jobchange (
+    NameProject VARCHAR(255) NOT NULL,
+    NameJob VARCHAR(255) NOT NULL,
+    version VARCHAR(50) NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    exec_date DATETIME NOT NULL,
+    PRIMARY KEY (NameProject, NameJob),
+    INDEX idx_jobchange_exec_date (exec_date)
+);
@@ -0,0 +1,318 @@
+import pytest
+
+import database
+from database import Database, InsertBatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingDatabase:
+    """Receives the batches of an InsertBatcher; each insert takes `latency` seconds of the fake clock."""
+
+    def __init__(self, clock, latency=0.0):
+        self.clock = clock
+        self.latency = latency
+        self.batches = []
+
+    def insert_data_batch(self, insert_query, table_name, data_batch):
+        self.batches.append(list(data_batch))
+        self.clock.now += self.latency
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(database.time, 'monotonic', clock)
+    return clock
+
+
+def batch_sizes(db):
+    return [len(batch) for batch in db.batches]
+
+
+def test_batcher_flushes_at_the_batch_size_and_on_flush(clock):
+    db = RecordingDatabase(clock, latency=0.4)  # Between half the target latency and the target: size kept
+    batcher = InsertBatcher(db, 'INSERT', 'aud_test', initial_size=3)
+
+    for row in range(7):
+        batcher.append((row,))
+    assert batch_sizes(db) == [3, 3] and len(batcher) == 1
+    batcher.flush()
+
+    assert batch_sizes(db) == [3, 3, 1]
+    assert [row for batch in db.batches for row in batch] == [(row,) for row in range(7)]
+    assert batcher.metrics['rows'] == 7 and batcher.metrics['batches'] == 3
+
+
+def test_batcher_extend_flushes_at_the_same_rows_as_append(clock):
+    rows = [('x' * (row % 7),) for row in range(50)]
+    batches = []
+    for add in ('append', 'extend'):
+        db = RecordingDatabase(clock, latency=0.4)
+        batcher = InsertBatcher(db, 'INSERT', 'aud_test', initial_size=4, max_bytes=20)
+        if add == 'append':
+            for row in rows:
+                batcher.append(row)
+        else:
+            batcher.extend(rows)
+        batcher.flush()
+        batches.append(db.batches)
+
+    assert batches[0] == batches[1]
+    assert max(map(len, batches[0])) <= 4
+
+
+def test_batcher_flushes_once_the_byte_limit_is_reached(clock):
+    db = RecordingDatabase(clock, latency=0.4)
+    batcher = InsertBatcher(db, 'INSERT', 'aud_test', initial_size=100, max_bytes=10)
+
+    batcher.extend([('abcd',), ('efgh',), ('ijkl',), ('m',)])
+
+    # The third row brings the batch to 12 bytes
+    assert batch_sizes(db) == [3] and len(batcher) == 1
+
+
+def test_batcher_flushes_the_rows_that_waited_too_long(clock):
+    db = RecordingDatabase(clock, latency=0.4)
+    batcher = InsertBatcher(db, 'INSERT', 'aud_test', initial_size=100, max_wait=5.0)
+
+    batcher.append((1,))
+    clock.now += 6.0
+    batcher.append((2,))
+
+    assert batch_sizes(db) == [2]
+
+
+def test_batcher_doubles_the_size_of_fast_batches_up_to_max_size(clock):
+    db = RecordingDatabase(clock, latency=0.1)
+    batcher = InsertBatcher(db, 'INSERT', 'aud_test', initial_size=10, max_size=40)
+
+    batcher.extend([(row,) for row in range(200)])
+    batcher.flush()
+
+    assert batch_sizes(db) == [10, 20, 40, 40, 40, 40, 10]
+    assert batcher.size == 40
+    assert (batcher.metrics['min_size_used'], batcher.metrics['max_size_used']) == (10, 40)
+
+
+def test_batcher_halves_the_size_of_slow_batches_down_to_min_size(clock):
+    db = RecordingDatabase(clock, latency=2.0)
+    batcher = InsertBatcher(db, 'INSERT', 'aud_test', initial_size=40, min_size=10)
+
+    batcher.extend([(row,) for row in range(100)])
+
+    assert batch_sizes(db) == [40, 20, 10, 10, 10, 10]
+    assert batcher.size == 10
+
+
+def test_batcher_keeps_the_size_after_a_partial_batch(clock):
+    db = RecordingDatabase(clock, latency=0.0)
+    batcher = InsertBatcher(db, 'INSERT', 'aud_test', initial_size=10)
+
+    batcher.extend([(row,) for row in range(5)])
+    batcher.flush()
+
+    assert batcher.size == 10 and batcher.metrics['last_size'] == 10
+
+
+class FakeIndexCursor:
+    """Cursor answering SHOW INDEX with the given rows."""
+    COLUMNS = ('Table', 'Non_unique', 'Key_name', 'Seq_in_index', 'Column_name', 'Collation', 'Sub_part', 'Index_type')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = [(column,) for column in self.COLUMNS]
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def fetchall(self):
+        return [('aud_test', *row) for row in self.rows]
+
+
+def test_secondary_indexes_reads_the_non_unique_indexes():
+    cursor = FakeIndexCursor([
+        (0, 'PRIMARY', 1, 'id', 'A', None, 'BTREE'),
+        (0, 'uq_name', 1, 'name', 'A', None, 'BTREE'),
+        # Key parts listed out of order, with a prefix length and a descending part
+        (1, 'idx_job', 2, 'NameJob', 'D', None, 'BTREE'),
+        (1, 'idx_job', 1, 'NameProject', 'A', 10, 'BTREE'),
+        (1, 'ft_value', 1, 'value', None, None, 'FULLTEXT'),
+        # Functional key part: kept on the table
+        (1, 'idx_expr', 1, None, 'A', None, 'BTREE'),
+        (1, 'idx_expr', 2, 'name', 'A', None, 'BTREE'),
+    ])
+
+    indexes = Database._secondary_indexes(cursor, 'aud_test')
+
+    assert cursor.statements == ['SHOW INDEX FROM aud_test']
+    assert indexes == {
+        'idx_job': 'INDEX `idx_job` (`NameProject`(10), `NameJob` DESC)',
+        'ft_value': 'FULLTEXT INDEX `ft_value` (`value`)',
+    }
+
+
+class FakeJConnection:
+    """The JDBC side of a FakeConnection: savepoints are positions in the written rows."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.savepoints = []  # Savepoints not released yet
+
+    def setSavepoint(self):
+        savepoint = len(self.connection.pending)
+        self.savepoints.append(savepoint)
+        self.max_savepoints = max(getattr(self, 'max_savepoints', 0), len(self.savepoints))
+        self.connection.calls.append(('savepoint', savepoint))
+        return savepoint
+
+    def rollback(self, savepoint):
+        del self.connection.pending[savepoint:]
+        self.connection.calls.append(('rollback_to', savepoint))
+
+    def releaseSavepoint(self, savepoint):
+        self.savepoints.remove(savepoint)
+        self.connection.calls.append(('release', savepoint))
+
+
+class FakeCursor:
+    """Writes the rows of an insert one by one, failing on the rows holding 'bad'."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, statement, row=()):
+        if 'bad' in row or 'bad' in statement:
+            raise ValueError(f"bad row {row}")
+        self.connection.pending.append(row)
+
+    def executemany(self, statement, rows):
+        for row in rows:
+            self.execute(statement, row)
+
+
+class FakeConnection:
+    """Connection keeping the written rows apart until they are committed."""
+
+    def __init__(self):
+        self.pending = []
+        self.committed = []
+        self.calls = []
+        self.jconn = FakeJConnection(self)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending.clear()
+        self.jconn.savepoints.clear()
+        self.calls.append(('commit',))
+
+    def rollback(self):
+        self.pending.clear()
+        self.jconn.savepoints.clear()
+        self.calls.append(('rollback',))
+
+
+def connected_database():
+    db = Database({})
+    db.connection = FakeConnection()
+    return db
+
+
+def test_insert_data_batch_rejects_the_bad_rows_and_inserts_the_others(tmp_path):
+    db = connected_database()
+    db.reject_file = str(tmp_path / 'rejected_rows.csv')
+    rows = [(f'row{index}', 'bad' if index in (3, 11) else 'good') for index in range(16)]
+
+    db.insert_data_batch('INSERT', 'aud_test', rows)
+
+    assert db.connection.committed == [row for row in rows if 'bad' not in row]
+    assert db.connection.jconn.savepoints == []  # Every savepoint of the bisection is released
+    with open(db.reject_file, encoding='utf-8') as reject_file:
+        assert reject_file.read().splitlines() == [
+            "aud_test,\"bad row ('row3', 'bad')\",row3,bad",
+            "aud_test,\"bad row ('row11', 'bad')\",row11,bad",
+        ]
+
+
+def test_insert_data_batch_logs_the_rejected_rows_without_reject_file(caplog):
+    db = connected_database()
+
+    db.insert_data_batch('INSERT', 'aud_test', [('a', 'good'), ('b', 'bad')])
+
+    assert db.connection.committed == [('a', 'good')]
+    assert "row data: ('b', 'bad')" in caplog.text
+
+
+def test_transaction_commits_the_work_of_the_block_once():
+    db = connected_database()
+
+    with db.transaction():
+        db.insert_data_batch('INSERT', 'aud_test', [('a',), ('b',)])
+        db.delete_records_batch('aud_test', [{'NameJob': 'J'}])
+        db.insert_data_batch('INSERT', 'aud_test', [('c',)])
+        assert db.connection.committed == []
+
+    assert db.connection.committed == [('a',), ('b',), (), ('c',)]  # () is the delete
+    assert db.connection.calls.count(('commit',)) == 1
+
+
+def test_transaction_rolls_back_and_reraises_when_the_block_fails():
+    db = connected_database()
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.insert_data_batch('INSERT', 'aud_test', [('a',)])
+            raise RuntimeError("job failed")
+
+    assert db.connection.committed == [] and db.connection.pending == []
+    assert ('commit',) not in db.connection.calls
+    # Outside of a transaction the batches commit again
+    db.insert_data_batch('INSERT', 'aud_test', [('b',)])
+    assert db.connection.committed == [('b',)]
+
+
+def test_transaction_without_savepoints_aborts_on_a_failed_batch():
+    db = connected_database()
+
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.insert_data_batch('INSERT', 'aud_test', [('a',)])
+            db.delete_records_batch('aud_test', [{'NameJob': 'bad'}])
+
+    assert db.connection.committed == []
+
+
+def test_savepoints_keep_the_rows_written_before_a_failed_batch_and_are_released():
+    db = connected_database()
+    jconn = db.connection.jconn
+
+    with db.transaction(savepoint_rows=4):
+        for batch in range(4):
+            db.insert_data_batch('INSERT', 'aud_test', [(batch, row) for row in range(3)])
+        # 12 rows written: savepoints after the 6th and the 12th rows, each releasing the previous one
+        db.insert_data_batch('INSERT', 'aud_test', [(4, 0)])
+        db.delete_records_batch('aud_test', [{'NameJob': 'bad'}])  # Rolls back to the last savepoint
+        db.insert_data_batch('INSERT', 'aud_test', [(5, 0)])
+
+    assert db.connection.committed == [(batch, row) for batch in range(4) for row in range(3)] + [(5, 0)]
+    assert ('rollback_to', 12) in db.connection.calls
+    # The transaction savepoint and the one of the current batch, never the earlier savepoints
+    assert jconn.max_savepoints == 2
+    assert jconn.savepoints == []
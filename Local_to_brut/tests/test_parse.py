@@ -0,0 +1,270 @@
+import importlib.util
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import jobs
+from columnar import ParsedFiles, ParsedWorkspace
+from database import Database
+from XML_parse import XMLParser, flatten_tree
+
+ITEMS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'items')
+BRUT_TO_AGG_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Brut_to_agg')
+
+# Jobs reading the parsed `.item` files, see jobs.JOB_REQUIREMENTS
+ITEM_JOBS = sorted(job_name for job_name, required in jobs.JOB_REQUIREMENTS.items() if required)
+
+
+class FakeConfig:
+    def get_param(self, section, key):
+        return f"{section}:{key}"
+
+
+class FakeDatabase(Database):
+    """Database without connection recording the inserted rows; every query returns no row."""
+
+    def __init__(self):
+        super().__init__({})
+        self.inserted = []
+
+    def execute_query(self, query, params=None):
+        return []
+
+    def stream_query(self, query, params=None, chunk_size=None):
+        return iter(())
+
+    def delete_records_batch(self, table_name, conditions_batch):
+        pass
+
+    def truncate_table(self, table_name):
+        pass
+
+    def insert_data_batch(self, insert_query, table_name, data_batch):
+        self.inserted.extend((table_name, tuple(row)) for row in data_batch)
+
+
+def run_job(job_name, parsed_files_data):
+    db = FakeDatabase()
+    getattr(jobs, job_name)(FakeConfig(), db, parsed_files_data, '2024-11-05 15:10:03')
+    return db.inserted
+
+
+def node_names(parsed_files_data):
+    return [node['uniqueName'] for *_, parsed_data in parsed_files_data for node in parsed_data['nodes']]
+
+
+def test_loop_parse_items_keeps_the_newest_version_of_each_job():
+    parsed_files_data = XMLParser().loop_parse_items(ITEMS_DIRECTORY)
+
+    assert isinstance(parsed_files_data, ParsedFiles)
+    assert sorted((project, job, version) for project, job, version, _ in parsed_files_data) == [
+        ('PROJ', 'myjob', '0.2'), ('PROJ', 'other_job', '1.0')
+    ]
+    assert 'tJava_old' not in node_names(parsed_files_data)
+    assert [job for _, job, _ in parsed_files_data.components('tMap', 'tXMLMap')] == ['myjob', 'myjob']
+
+
+def test_inactive_nodes_are_dropped_whatever_the_parameter_order():
+    # tJava_1 has ACTIVATE after UNIQUE_NAME, tJava_2 before it
+    assert not {'tJava_1', 'tJava_2'} & set(node_names(XMLParser().loop_parse_items(ITEMS_DIRECTORY)))
+
+    kept = XMLParser(drop_inactive=False).loop_parse_items(ITEMS_DIRECTORY)
+    active = {node['uniqueName']: node['active'] for *_, parsed_data in kept for node in parsed_data['nodes']}
+    assert active['tJava_1'] is False and active['tJava_2'] is False
+    assert active['tMap_1'] is True and active['tFileInputDelimited_1'] is True
+
+
+@pytest.mark.parametrize('job_name', ITEM_JOBS)
+def test_required_sections_give_the_rows_of_a_full_parse(job_name):
+    full = XMLParser().loop_parse_items(ITEMS_DIRECTORY)
+    pushed_down = XMLParser(required=jobs.required_sections([job_name])).loop_parse_items(ITEMS_DIRECTORY)
+
+    assert run_job(job_name, pushed_down) == run_job(job_name, full)
+
+
+def test_required_sections_skip_the_other_sections():
+    parsed_files_data = XMLParser(required={'subjobs'}).loop_parse_items(ITEMS_DIRECTORY)
+
+    for *_, parsed_data in parsed_files_data:
+        assert parsed_data['nodes'] == [] and parsed_data['connections'] == []
+    assert any(parsed_data['subjobs'] for *_, parsed_data in parsed_files_data)
+
+
+@pytest.mark.parametrize('drop_inactive', [True, False])
+def test_columnar_workspace_holds_the_rows_of_the_nested_parse(drop_inactive):
+    nested = XMLParser(drop_inactive=drop_inactive).loop_parse_items(ITEMS_DIRECTORY)
+    workspace = XMLParser(drop_inactive=drop_inactive).loop_parse_items(ITEMS_DIRECTORY, columnar=True)
+
+    assert isinstance(workspace, ParsedWorkspace)
+    assert workspace.versions == {('PROJ', 'myjob'): '0.2', ('PROJ', 'other_job'): '1.0'}
+    assert list(workspace.element_parameters.rows()) == [
+        (project, job, node['uniqueName'], node['componentName'], param.field, param.name, param.show, param.value)
+        for project, job, _, parsed_data in nested
+        for node in parsed_data['nodes']
+        for param in node['elementParameters']
+    ]
+    assert list(workspace.connections.rows()) == [
+        (project, job, connection.connectorName, connection.label, connection.lineStyle, connection.metaname,
+         connection.offsetLabelX, connection.offsetLabelY, connection.source, connection.target,
+         connection.outputId, param.field, param.name, param.value, param.show)
+        for project, job, _, parsed_data in nested
+        for connection in parsed_data['connections']
+        for param in connection.elementParameters
+    ]
+
+
+@pytest.mark.parametrize('job_name', sorted(jobs.COLUMNAR_JOBS))
+def test_columnar_jobs_insert_the_rows_of_the_nested_parse(job_name):
+    parser = XMLParser(required=jobs.required_sections([job_name]))
+    nested = parser.loop_parse_items(ITEMS_DIRECTORY)
+    workspace = parser.loop_parse_items(ITEMS_DIRECTORY, columnar=True)
+
+    rows = run_job(job_name, workspace)
+    assert rows and rows == run_job(job_name, nested)
+
+
+def recursive_flatten(tree):
+    """Reference walk of a tXMLMap tree: (name, xpath, parent_id, depth) in document order."""
+    rows = []
+
+    def walk(element, parent_id, depth):
+        node_id = len(rows)
+        rows.append((element.get('name'), element.get('xpath'), parent_id, depth))
+        for child in element.findall('./children'):
+            walk(child, node_id, depth + 1)
+
+    for node in tree.findall('./nodes'):
+        walk(node, None, 0)
+    return rows
+
+
+def test_flatten_tree_matches_a_recursive_walk():
+    root = ET.parse(os.path.join(ITEMS_DIRECTORY, 'PROJ.myjob_0.2.item')).getroot()
+    trees = root.findall('.//inputTrees') + root.findall('.//outputTrees')
+
+    assert trees
+    for tree in trees:
+        rows = flatten_tree(tree)
+        assert [(row.name, row.xpath, row.parent_id, row.depth) for row in rows] == recursive_flatten(tree)
+        assert [row.id for row in rows] == list(range(len(rows)))
+
+
+def test_flatten_tree_handles_trees_deeper_than_the_recursion_limit():
+    tree = ET.Element('inputTrees')
+    element = ET.SubElement(tree, 'nodes', name='level0')
+    for level in range(1, 5000):
+        element = ET.SubElement(element, 'children', name=f'level{level}')
+
+    rows = flatten_tree(tree)
+
+    assert len(rows) == 5000
+    assert (rows[-1].name, rows[-1].parent_id, rows[-1].depth) == ('level4999', 4998, 4999)
+
+
+def test_unknown_xml_backend_is_rejected():
+    with pytest.raises(ValueError, match='Unknown XML backend'):
+        XMLParser(backend='lmxl')
+
+
+@pytest.mark.parametrize('backend', ['lxml', 'elementtree'])
+def test_xml_backends_parse_the_same_rows(backend):
+    assert XMLParser(backend=backend).loop_parse_items(ITEMS_DIRECTORY) == XMLParser().loop_parse_items(ITEMS_DIRECTORY)
+
+
+def load_aggjobs(monkeypatch):
+    """Import AGGjobs of Brut_to_agg; its config, database and metrics modules are the ones of this package."""
+    monkeypatch.syspath_prepend(BRUT_TO_AGG_DIRECTORY)
+    spec = importlib.util.spec_from_file_location('AGGjobs', os.path.join(BRUT_TO_AGG_DIRECTORY, 'AGGjobs.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class NullConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class ElementValueDatabase(FakeDatabase):
+    """Database answering the aud_agg query of Brut_to_agg from aud_elementvaluenode rows."""
+
+    def __init__(self, elementvaluenode_rows):
+        super().__init__()
+        self.elementvaluenode_rows = elementvaluenode_rows
+        self.connection = NullConnection()  # AUD_404 replaces the rows in a transaction
+
+    def stream_query(self, query, params=None, chunk_size=None):
+        # aud_componentName LIKE ? AND aud_typeField IN (...) AND aud_elementRef IN (...) of the query
+        pattern, = params
+        rows = [
+            (project, job, component_value, type_field, aud_id, element_ref, value)
+            for (component_name, pos_x, pos_y, type_field, element_ref, value, aud_id, column_name,
+                 component_value, project, job, exec_date) in self.elementvaluenode_rows
+            if component_name.startswith(pattern.rstrip('%')) and type_field in ('GROUPBYS', 'OPERATIONS')
+            and element_ref in ('INPUT_COLUMN', 'OUTPUT_COLUMN', 'FUNCTION')
+        ]
+        if rows:
+            yield rows
+
+
+class LineageConfig(FakeConfig):
+    def __init__(self, aggregate_from_xml):
+        self.aggregate_from_xml = aggregate_from_xml
+
+    def get_param(self, section, key):
+        if section == 'Lineage':
+            return self.aggregate_from_xml
+        if section == 'Incremental':
+            return None
+        return super().get_param(section, key)
+
+
+def test_aud_311_alimaggregate_gives_the_rows_of_aud_404(monkeypatch):
+    aggjobs = load_aggjobs(monkeypatch)
+    assert aggjobs.AGGREGATE_COMPONENT_PREFIX == jobs.AGGREGATE_COMPONENT_PREFIX
+    parsed_files_data = XMLParser().loop_parse_items(ITEMS_DIRECTORY)
+    db = ElementValueDatabase([row for table, row in run_job('AUD_311_ALIMELEMENTVALUENODE', parsed_files_data)])
+
+    aggjobs.AUD_404_AGG_TAGGREGATE(LineageConfig(aggregate_from_xml=False), db, '2024-11-05 15:10:03')
+
+    from_xml = sorted(row for table, row in run_job('AUD_311_ALIMAGGREGATE', parsed_files_data))
+    assert from_xml == [
+        ('PROJ', 'myjob', 'tAggregateRow_1', 'amount', 'total', 'sum'),
+        ('PROJ', 'myjob', 'tAggregateRow_1', 'city', 'city_out', 'GROUPBY'),
+        ('PROJ', 'myjob', 'tAggregateRow_1', 'id', 'n', 'count'),
+        ('PROJ', 'myjob', 'tAggregateSortedRow_1', 'qty', 'max_qty', 'max'),
+    ]
+    assert sorted(row for table, row in db.inserted) == from_xml
+
+
+def test_aud_404_leaves_aud_agg_aggregate_to_aud_311_alimaggregate(monkeypatch):
+    aggjobs = load_aggjobs(monkeypatch)
+    parsed_files_data = XMLParser().loop_parse_items(ITEMS_DIRECTORY)
+    db = ElementValueDatabase([row for table, row in run_job('AUD_311_ALIMELEMENTVALUENODE', parsed_files_data)])
+
+    aggjobs.AUD_404_AGG_TAGGREGATE(LineageConfig(aggregate_from_xml=True), db, '2024-11-05 15:10:03')
+
+    assert db.inserted == []
+
+
+class JobChangeDatabase(FakeDatabase):
+    """Database whose aud_jobchange holds two jobs no longer in the workspace."""
+
+    def execute_query(self, query, params=None):
+        return [('PROJ', 'gone', '1.0', 'abc'), ('PROJ', 'gone_before', None, None)]
+
+
+def test_aud_300_records_the_removed_jobs_once():
+    db = JobChangeDatabase()
+
+    jobs.AUD_300_ALIMJOBCHANGE(FakeConfig(), db, ITEMS_DIRECTORY, '2024-11-05 15:10:03')
+
+    recorded = {row[:2]: row[2:] for table, row in db.inserted}
+    assert sorted(recorded) == [('PROJ', 'gone'), ('PROJ', 'myjob'), ('PROJ', 'other_job')]
+    assert recorded[('PROJ', 'gone')] == (None, None, '2024-11-05 15:10:03')
+    assert recorded[('PROJ', 'myjob')][0] == '0.2'
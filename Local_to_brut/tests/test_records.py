@@ -0,0 +1,35 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from records import ElementParameter, ElementValue
+
+
+def test_records_read_the_element_attributes_and_children():
+    element = ET.fromstring('<elementParameter field="TABLE" name="GROUPBYS" show="false"/>')
+    values = [ElementValue.from_element(ET.fromstring('<elementValue elementRef="INPUT_COLUMN" value="city"/>'))]
+
+    param = ElementParameter.from_element(element, elementValues=values)
+
+    assert (param.field, param.name, param.show, param.value) == ('TABLE', 'GROUPBYS', 'false', None)
+    # The dict-style access the jobs were written against
+    assert param['name'] == 'GROUPBYS'
+    assert param.get('value') is None and param.get('missing', 'default') == 'default'
+    assert 'field' in param and 'missing' not in param
+    assert param.elementValue is param.elementValues
+    assert param['elementValues'][0]['value'] == 'city'
+    with pytest.raises(KeyError):
+        param['missing']
+    assert not hasattr(param, '__dict__')
+
+
+def test_records_compare_by_value_and_intern_the_repeated_attributes():
+    xml = '<elementParameter field="TEXT" name="UNIQUE_NAME" value="tMap_1"/>'
+
+    # Two parses give distinct string objects
+    first, second = (ElementParameter.from_element(ET.fromstring(xml)) for _ in range(2))
+
+    assert first == second
+    assert first._asdict() == {'field': 'TEXT', 'name': 'UNIQUE_NAME', 'show': None, 'value': 'tMap_1', 'elementValues': ()}
+    assert first.name is second.name
+    assert first.value is not second.value
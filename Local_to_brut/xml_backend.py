@@ -0,0 +1,99 @@
+import logging
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+try:
+    from lxml import etree as lxml_etree  # Optional: faster C parser and compiled XPath
+except ImportError:
+    lxml_etree = None
+
+# Namespaces used by the Talend workspace files
+NAMESPACES = {
+    'xmi': "http://www.omg.org/XMI",
+    'talendfile': "platform:/resource/org.talend.model/model/TalendFile.xsd",
+    'TalendProperties': "http://www.talend.org/properties",
+}
+
+
+class ElementTreeBackend:
+    """XML backend based on the standard library `xml.etree.ElementTree`."""
+    name = 'elementtree'
+    ParseError = ET.ParseError
+
+    def parse(self, file_path):
+        return ET.parse(file_path)
+
+    def context_types(self, root):
+        return root.findall(".//talendfile:ContextType", NAMESPACES)
+
+    def properties(self, root):
+        return root.findall(".//TalendProperties:Property", NAMESPACES)
+
+    def additional_properties(self, prop):
+        return prop.findall(".//TalendProperties:additionalProperties", NAMESPACES)
+
+    def screenshots(self, root):
+        return root.findall("talendfile:ScreenshotsMap", NAMESPACES)
+
+
+class LxmlBackend:
+    """
+    XML backend based on lxml.
+
+    The namespaced lookups are compiled once into XPath/ETXPath objects instead of being
+    re-evaluated from path strings on every call.
+    """
+    name = 'lxml'
+
+    def __init__(self):
+        if lxml_etree is None:
+            raise ImportError("lxml is not installed")
+        self.ParseError = lxml_etree.XMLSyntaxError
+        # huge_tree: screenshot files carry base64 images in attributes larger than libxml2's default limit
+        self._parser = lxml_etree.XMLParser(remove_comments=True, huge_tree=True)
+        self._context_types = lxml_etree.XPath(".//talendfile:ContextType", namespaces=NAMESPACES)
+        self._properties = lxml_etree.ETXPath(f".//{{{NAMESPACES['TalendProperties']}}}Property")
+        self._additional_properties = lxml_etree.ETXPath(f".//{{{NAMESPACES['TalendProperties']}}}additionalProperties")
+        self._screenshots = lxml_etree.XPath("talendfile:ScreenshotsMap", namespaces=NAMESPACES)
+
+    def parse(self, file_path):
+        return lxml_etree.parse(file_path, self._parser)
+
+    def context_types(self, root):
+        return self._context_types(root)
+
+    def properties(self, root):
+        return self._properties(root)
+
+    def additional_properties(self, prop):
+        return self._additional_properties(prop)
+
+    def screenshots(self, root):
+        return self._screenshots(root)
+
+
+def get_backend(name=None):
+    """
+    Return an XML backend instance.
+
+    Args:
+        name (str, optional): 'lxml' or 'elementtree'. Defaults to None, which picks lxml when it is
+            installed and falls back to ElementTree otherwise.
+
+    Returns:
+        ElementTreeBackend or LxmlBackend: The backend to parse the workspace files with.
+
+    Raises:
+        ValueError: If `name` is not a known backend.
+        ImportError: If 'lxml' is requested and lxml is not installed.
+    """
+    if name is None:
+        if lxml_etree is not None:
+            return LxmlBackend()
+        logger.info("lxml is not available, using the ElementTree XML backend.")
+        return ElementTreeBackend()
+    backends = {backend.name: backend for backend in (LxmlBackend, ElementTreeBackend)}
+    if name not in backends:
+        raise ValueError(f"Unknown XML backend: {name!r}, expected one of {sorted(backends)}")
+    return backends[name]()